@@ -0,0 +1,209 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a command line tool that groups every course section in a
+directory using the same survey and grouper:
+
+    python batch.py SECTIONS_DIR SURVEY_FILE OUTPUT_DIR --grouper greedy \
+        --group-size 4 --workers 8
+
+Every *.json file in SECTIONS_DIR is read as a course (see loader.py for the
+file formats). Sections are spread across worker processes. For each section
+a file with the same name is written to OUTPUT_DIR containing its groups and
+their score, and a timing summary of all sections is printed. A section that
+cannot be grouped is reported in the summary and does not stop the others.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+from loader import GROUPERS, load_course, load_survey, make_grouper, \
+    grouping_to_record, check_answers
+
+
+def list_sections(sections_dir: str) -> List[str]:
+    """
+    Return the paths of all course files in <sections_dir>, sorted by name.
+    """
+    paths = []
+    for name in sorted(os.listdir(sections_dir)):
+        if name.endswith('.json'):
+            paths.append(os.path.join(sections_dir, name))
+    return paths
+
+
+def group_section(section_path: str, survey_path: str, grouper_name: str,
+                  group_size: int, out_dir: str) -> Dict[str, Any]:
+    """
+    Group the course in <section_path> using the survey in <survey_path> and
+    a grouper named <grouper_name>, write the result to a file with the same
+    name in <out_dir> and return a summary of the run.
+
+    The summary has the keys 'section', 'students', 'missing' (the number
+    of answers that are invalid), 'groups', 'score', 'seconds' (the time
+    spent making the grouping) and 'output'.
+
+    Raise loader.MissingAnswersError, listing the missing answers, if any
+    student has no answer to a question of the survey.
+    """
+    survey = load_survey(survey_path)
+    course = load_course(section_path, survey)
+    grouper = make_grouper(grouper_name, group_size)
+    missing = check_answers(course, survey)
+
+    start = time.perf_counter()
+    grouping = grouper.make_grouping(course, survey)
+    seconds = time.perf_counter() - start
+    score = survey.score_grouping(grouping)
+
+    output = os.path.join(out_dir, os.path.basename(section_path))
+    with open(output, 'w') as file:
+        json.dump({'course': course.name,
+                   'grouper': grouper_name,
+                   'score': score,
+                   'groups': grouping_to_record(grouping)}, file)
+
+    return {'section': os.path.basename(section_path),
+            'students': len(course.students),
+            'missing': len(missing),
+            'groups': len(grouping),
+            'score': score,
+            'seconds': seconds,
+            'output': output}
+
+
+def run_batch(sections_dir: str, survey_path: str, out_dir: str,
+              grouper_name: str, group_size: int,
+              workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Group every section in <sections_dir> and return the summaries of all
+    runs in the order of the section file names.
+
+    Sections are grouped in <workers> processes; if <workers> is 1 they are
+    grouped one after another in this process instead. The summary of a
+    section that raised an error has only the keys 'section' and 'error'
+    (the message of the error).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    sections = list_sections(sections_dir)
+
+    results = []
+    if workers == 1:
+        for section in sections:
+            try:
+                results.append(group_section(section, survey_path,
+                                             grouper_name, group_size,
+                                             out_dir))
+            except Exception as error:  # report it with the other sections
+                results.append(_failure(section, error))
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for section in sections:
+            futures.append(pool.submit(group_section, section, survey_path,
+                                       grouper_name, group_size, out_dir))
+        for section, future in zip(sections, futures):
+            try:
+                results.append(future.result())
+            except Exception as error:  # report it with the other sections
+                results.append(_failure(section, error))
+    return results
+
+
+def _failure(section_path: str, error: Exception) -> Dict[str, Any]:
+    """
+    Return the summary of the run on <section_path> that raised <error>.
+    """
+    return {'section': os.path.basename(section_path), 'error': str(error)}
+
+
+def format_summary(results: List[Dict[str, Any]]) -> str:
+    """
+    Return a multi-line table with one row per run in <results> followed by
+    a row with the totals of the runs that succeeded. A run that failed has
+    its error in its row, and the number of failed runs follows the table.
+    """
+    lines = [f'{"section":<30}{"students":>10}{"missing":>9}{"groups":>8}'
+             f'{"score":>10}{"seconds":>12}']
+    students = 0
+    missing = 0
+    groups = 0
+    seconds = 0.0
+    failed = 0
+    for result in results:
+        if 'error' in result:
+            lines.append(f'{result["section"]:<30}  failed: '
+                         f'{result["error"]}')
+            failed += 1
+            continue
+        lines.append(f'{result["section"]:<30}{result["students"]:>10}'
+                     f'{result["missing"]:>9}{result["groups"]:>8}'
+                     f'{result["score"]:>10.4f}{result["seconds"]:>12.4f}')
+        students += result['students']
+        missing += result['missing']
+        groups += result['groups']
+        seconds += result['seconds']
+    lines.append(f'{"total":<30}{students:>10}{missing:>9}{groups:>8}'
+                 f'{"":>10}{seconds:>12.4f}')
+    if failed > 0:
+        lines.append(f'{failed} of {len(results)} sections failed')
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the command line tool with the arguments <argv> (or the arguments
+    given to this program if <argv> is None) and return the exit status,
+    which is 1 if any section failed.
+    """
+    parser = argparse.ArgumentParser(
+        description='Group every course section in a directory.')
+    parser.add_argument('sections_dir')
+    parser.add_argument('survey')
+    parser.add_argument('out_dir')
+    parser.add_argument('--grouper', choices=sorted(GROUPERS),
+                        default='greedy')
+    parser.add_argument('--group-size', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes '
+                             '(default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    if args.group_size < 2:
+        parser.error('--group-size must be at least 2')
+
+    start = time.perf_counter()
+    results = run_batch(args.sections_dir, args.survey, args.out_dir,
+                        args.grouper, args.group_size, args.workers)
+    print(format_summary(results))
+    print(f'wall time: {time.perf_counter() - start:.4f} seconds')
+    if any('error' in result for result in results):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
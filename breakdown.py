@@ -0,0 +1,167 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a class that holds the score of every group of a grouping
+for every question of a survey, as computed by Survey.score_breakdown, with
+summary statistics used to find out why a grouping scored badly.
+"""
+from __future__ import annotations
+from typing import Dict, List
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Return the <p>th percentile of <values> using the nearest rank method,
+    or 0.0 if <values> is empty.
+
+    >>> percentile([4.0, 1.0, 3.0, 2.0], 50)
+    2.0
+    >>> percentile([4.0, 1.0, 3.0, 2.0], 100)
+    4.0
+    """
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """
+    Return the 'min', 'p10', 'median', 'p90', 'max', 'mean' and 'variance'
+    (population variance) of <values>, all 0.0 if <values> is empty.
+
+    >>> summarize([1.0, 2.0, 3.0, 4.0])['variance']
+    1.25
+    """
+    if len(values) == 0:
+        return {'min': 0.0, 'p10': 0.0, 'median': 0.0, 'p90': 0.0,
+                'max': 0.0, 'mean': 0.0, 'variance': 0.0}
+    mean = sum(values) / len(values)
+    variance = 0.0
+    for value in values:
+        variance += (value - mean) ** 2
+    return {'min': min(values),
+            'p10': percentile(values, 10),
+            'median': percentile(values, 50),
+            'p90': percentile(values, 90),
+            'max': max(values),
+            'mean': mean,
+            'variance': variance / len(values)}
+
+
+class ScoreBreakdown:
+    """
+    The scores of the groups of a grouping for each question of a survey.
+
+    === Public Attributes ===
+    question_ids: the id of each question, in the order of
+                  Survey.get_questions
+    weights: weights[q] is the weight of question q
+    unweighted: unweighted[g][q] is the score that the criterion of question
+                q gives to the answers of group g, or 0.0 if one of them is
+                invalid
+    weighted: weighted[g][q] is unweighted[g][q] times weights[q]
+    group_scores: group_scores[g] is the score of group g, equal to
+                  Survey.score_students for its members
+    invalid: the indices of the groups with an invalid answer, whose group
+             score is 0.0
+
+    === Representation Invariants ===
+    len(weights) == len(question_ids)
+    Every row of unweighted and weighted has len(question_ids) scores
+    len(unweighted) == len(weighted) == len(group_scores)
+    """
+
+    question_ids: List[int]
+    weights: List[int]
+    unweighted: List[List[float]]
+    weighted: List[List[float]]
+    group_scores: List[float]
+    invalid: List[int]
+
+    def __init__(self, question_ids: List[int], weights: List[int]) -> None:
+        """
+        Initialize a breakdown of no groups for the questions with ids
+        <question_ids> and weights <weights>.
+        """
+        self.question_ids = question_ids
+        self.weights = weights
+        self.unweighted = []
+        self.weighted = []
+        self.group_scores = []
+        self.invalid = []
+
+    def add_group(self, scores: List[float], valid: bool) -> None:
+        """
+        Add a group whose unweighted score for each question is in <scores>.
+        If <valid> is False, one of its answers is invalid.
+        """
+        weighted = [score * weight
+                    for score, weight in zip(scores, self.weights)]
+        if not valid:
+            self.invalid.append(len(self.group_scores))
+            self.group_scores.append(0.0)
+        elif len(weighted) == 0:
+            self.group_scores.append(0.0)
+        else:
+            self.group_scores.append(sum(weighted) / len(weighted))
+        self.unweighted.append(scores)
+        self.weighted.append(weighted)
+
+    def score(self) -> float:
+        """
+        Return the average group score, equal to Survey.score_grouping for
+        the same grouping.
+        """
+        if len(self.group_scores) == 0:
+            return 0.0
+        return sum(self.group_scores) / len(self.group_scores)
+
+    def group_summary(self) -> Dict[str, float]:
+        """ Return summary statistics of the group scores """
+        return summarize(self.group_scores)
+
+    def question_summary(self) -> Dict[int, Dict[str, float]]:
+        """
+        Return summary statistics of the unweighted scores of the groups for
+        each question, keyed by question id.
+        """
+        summary = {}
+        for q, id_ in enumerate(self.question_ids):
+            summary[id_] = summarize([row[q] for row in self.unweighted])
+        return summary
+
+    def worst_groups(self, count: int) -> List[int]:
+        """
+        Return the indices of the <count> groups with the lowest scores,
+        lowest first, with ties in order of index.
+        """
+        order = sorted(range(len(self.group_scores)),
+                       key=lambda g: (self.group_scores[g], g))
+        return order[:count]
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['typing']})
@@ -0,0 +1,186 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a class that saves the state of a grouper to a file while
+it makes a grouping, so that a run that is killed can resume from the last
+saved state instead of starting over (see Grouper.set_checkpoint).
+
+A grouper only saves its state at safe points, such as after a group has been
+formed, and saves everything it needs to carry on exactly as if it had never
+stopped, so a resumed run gives the same grouping as an uninterrupted one.
+The state is saved under a key that identifies the grouper and its
+constraints, the students and their answers, and the survey, so a checkpoint
+of a different run is never resumed.
+
+Checkpoints are pickled, so only resume from files you trust.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import pickle
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from constraints import Constraints
+
+if TYPE_CHECKING:
+    from course import Student
+    from grouper import Grouper
+    from survey import Survey
+
+# the attributes of a grouper that change how a run is watched or where it
+# runs, but not the grouping it makes
+_HANDLERS = ('_checkpoint', '_progress', '_coordinator')
+
+
+class Checkpoint:
+    """
+    A file where a grouper saves its state at most once every interval
+    seconds.
+
+    === Public Attributes ===
+    path: the path of the checkpoint file
+    interval: the smallest number of seconds between two saves; if it is 0.0
+              the state is saved at every safe point
+
+    === Private Attributes ===
+    _last: the time.monotonic() time of the last save, or of the creation of
+           this checkpoint if there has been none
+
+    === Representation Invariants ===
+    interval >= 0.0
+    """
+
+    path: str
+    interval: float
+    _last: float
+
+    def __init__(self, path: str, interval: float = 60.0) -> None:
+        """
+        Initialize a checkpoint that saves to <path> at most once every
+        <interval> seconds.
+
+        === Precondition ===
+        interval >= 0.0
+        """
+        self.path = path
+        self.interval = interval
+        self._last = time.monotonic()
+
+    def due(self) -> bool:
+        """ Return True iff it is time to save the state again """
+        return time.monotonic() - self._last >= self.interval
+
+    def save(self, key: str, state: Dict[str, Any]) -> None:
+        """
+        Save <state> under <key>, replacing whatever was saved before.
+
+        The file is replaced in one step, so it always holds a complete
+        state even if the process is killed while saving.
+        """
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as file:
+            pickle.dump({'key': key, 'state': state}, file)
+        os.replace(temporary, self.path)
+        self._last = time.monotonic()
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the state saved under <key>, or None if there is no saved
+        state or it was saved under another key.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as file:
+            saved = pickle.load(file)
+        if saved['key'] != key:
+            return None
+        return saved['state']
+
+    def clear(self) -> None:
+        """ Delete the saved state, if there is one """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run_key(grouper: Grouper, students: List[Student], survey: Survey) -> str:
+    """
+    Return a key that identifies a run of <grouper> on <students> with
+    <survey>: the type and settings of the grouper, including its
+    constraints, the ids of the students in order with their answers to the
+    questions of the survey, and the questions of the survey with their
+    criteria and weights.
+
+    The attributes in _HANDLERS are left out, since they do not change the
+    grouping that a run makes.
+    """
+    questions = survey.get_scoring()
+    scoring = [(_describe(question), type(criterion).__name__, weight)
+               for question, criterion, weight in questions]
+    answers = []
+    for student in students:
+        contents = []
+        for question, _, _ in questions:
+            answer = student.get_answer(question)
+            contents.append(None if answer is None else repr(answer.content))
+        answers.append((student.id, contents))
+    run = (_describe(grouper), answers, scoring)
+    return hashlib.sha256(repr(run).encode('utf-8')).hexdigest()
+
+
+def _describe(value: Any) -> Any:
+    """
+    Return a description of <value> made of scalars, strings, lists and
+    tuples, that is equal for values that are equal in content. Objects are
+    described by their type and attributes, except for the attributes in
+    _HANDLERS.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Constraints):
+        return value.canonical()
+    if isinstance(value, (list, tuple)):
+        return [_describe(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(repr(_describe(item)) for item in value)
+    if isinstance(value, dict):
+        return sorted((repr(key), _describe(item))
+                      for key, item in value.items())
+    if hasattr(value, '__dict__'):
+        return (type(value).__name__,
+                [(name, _describe(item))
+                 for name, item in sorted(vars(value).items())
+                 if name not in _HANDLERS])
+    return repr(value)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['hashlib',
+                                                  'os',
+                                                  'pickle',
+                                                  'time',
+                                                  'typing',
+                                                  'constraints',
+                                                  'course',
+                                                  'grouper',
+                                                  'survey']})
@@ -0,0 +1,284 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a class that records which students must be in the same
+group (must-pair constraints, such as project partners) and which students
+must not be (cannot-pair constraints, such as conflicts).
+
+Students joined by must-pair constraints, directly or through other students,
+form a block that is always placed together. Cannot-pair constraints are kept
+between blocks, so checking whether two students may share a group is a
+constant time lookup.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Collection, Dict, List, Optional, Set, \
+    Tuple
+
+if TYPE_CHECKING:
+    from course import Student
+    from grouper import Grouping
+
+
+class Constraints:
+    """
+    Must-pair and cannot-pair constraints between students, by id.
+
+    === Private Attributes ===
+    _parent: maps the id of a student in a must-pair constraint to the id of
+             another student in its block; following it leads to the block's
+             root, which maps to itself
+    _blocks: maps the root of each block to the ids of the students in it,
+             in increasing order
+    _apart: maps the root of each block to the roots of the blocks it cannot
+            share a group with
+
+    === Representation Invariants ===
+    No root is in its own set in _apart
+    r2 in _apart[r1] iff r1 in _apart[r2]
+    """
+
+    _parent: Dict[int, int]
+    _blocks: Dict[int, List[int]]
+    _apart: Dict[int, Set[int]]
+
+    def __init__(self) -> None:
+        """ Initialize an empty set of constraints """
+        self._parent = {}
+        self._blocks = {}
+        self._apart = {}
+
+    def __len__(self) -> int:
+        """
+        Return the number of students in at least one constraint.
+        """
+        return len(self._parent)
+
+    def must_pair(self, id1: int, id2: int) -> None:
+        """
+        Require the students with ids <id1> and <id2> to be in the same
+        group.
+
+        Raise ValueError if they cannot be in the same group.
+
+        >>> constraints = Constraints()
+        >>> constraints.must_pair(1, 2)
+        >>> constraints.must_pair(3, 2)
+        >>> constraints.partners(1)
+        [1, 2, 3]
+        """
+        root1 = self._root(id1)
+        root2 = self._root(id2)
+        if root1 == root2:
+            return
+        if root2 in self._apart[root1]:
+            raise ValueError(f'students {id1} and {id2} cannot be paired')
+        if len(self._blocks[root1]) < len(self._blocks[root2]):
+            root1, root2 = root2, root1
+        self._parent[root2] = root1
+        self._blocks[root1] = sorted(self._blocks[root1] +
+                                     self._blocks.pop(root2))
+        for other in self._apart.pop(root2):
+            self._apart[other].discard(root2)
+            self._apart[other].add(root1)
+            self._apart[root1].add(other)
+
+    def cannot_pair(self, id1: int, id2: int) -> None:
+        """
+        Require the students with ids <id1> and <id2> to be in different
+        groups.
+
+        Raise ValueError if they must be in the same group.
+
+        >>> constraints = Constraints()
+        >>> constraints.must_pair(1, 2)
+        >>> constraints.cannot_pair(2, 3)
+        >>> constraints.conflict(1, 3)
+        True
+        """
+        root1 = self._root(id1)
+        root2 = self._root(id2)
+        if root1 == root2:
+            raise ValueError(f'students {id1} and {id2} must be paired')
+        self._apart[root1].add(root2)
+        self._apart[root2].add(root1)
+
+    def partners(self, id_: int) -> List[int]:
+        """
+        Return the ids of the students that must be in the same group as the
+        student with id <id_>, including <id_>, in increasing order.
+        """
+        if id_ not in self._parent:
+            return [id_]
+        return list(self._blocks[self._find(id_)])
+
+    def block(self, id_: int) -> int:
+        """
+        Return the id that identifies the block of the student with id
+        <id_>: the same for all students that must be in the same group.
+        """
+        if id_ not in self._parent:
+            return id_
+        return self._find(id_)
+
+    def conflict(self, id1: int, id2: int) -> bool:
+        """
+        Return True iff the students with ids <id1> and <id2> cannot be in
+        the same group.
+        """
+        root1 = self.block(id1)
+        return root1 in self._apart and self.block(id2) in self._apart[root1]
+
+    def fits(self, id_: int, blocks: Set[int]) -> bool:
+        """
+        Return True iff the student with id <id_> can join a group whose
+        members are in the blocks <blocks>, as returned by block.
+        """
+        root = self.block(id_)
+        return root not in self._apart or self._apart[root].isdisjoint(blocks)
+
+    def allows(self, ids: Collection[int],
+               present: Optional[Set[int]] = None) -> bool:
+        """
+        Return True iff the students with ids <ids> may form a group: no two
+        of them conflict, and every student that must be with one of them is
+        among them. Students whose ids are not in <present> are ignored as
+        partners, unless <present> is None.
+        """
+        members = set(ids)
+        blocks = set()
+        for id_ in members:
+            root = self.block(id_)
+            if root in blocks:
+                continue
+            if not self.fits(id_, blocks):
+                return False
+            blocks.add(root)
+            for partner in self.partners(id_):
+                if partner not in members and (present is None or
+                                               partner in present):
+                    return False
+        return True
+
+    def largest_block(self) -> int:
+        """ Return the size of the largest block, or 1 if there is none """
+        largest = 1
+        for ids in self._blocks.values():
+            largest = max(largest, len(ids))
+        return largest
+
+    def canonical(self) -> Tuple[List[List[int]], List[Tuple[int, int]]]:
+        """
+        Return the blocks of these constraints, each as a sorted list of ids,
+        and a pair (id1, id2) with id1 < id2 of the smallest ids of every two
+        blocks that cannot share a group, both sorted. Equal constraints give
+        the same result whatever order they were added in.
+
+        >>> c1 = Constraints()
+        >>> c1.must_pair(2, 1)
+        >>> c1.cannot_pair(3, 2)
+        >>> c2 = Constraints()
+        >>> c2.cannot_pair(1, 3)
+        >>> c2.must_pair(1, 2)
+        >>> c1.canonical() == c2.canonical()
+        True
+        >>> c1.canonical()
+        ([[1, 2], [3]], [(1, 3)])
+        """
+        blocks = sorted(sorted(ids) for ids in self._blocks.values())
+        apart = set()
+        for root, others in self._apart.items():
+            for other in others:
+                first = min(self._blocks[root])
+                second = min(self._blocks[other])
+                apart.add((min(first, second), max(first, second)))
+        return blocks, sorted(apart)
+
+    def violations(self, grouping: Grouping) -> List[Tuple[int, int, str]]:
+        """
+        Return a tuple (id1, id2, kind) with id1 < id2 for every constraint
+        broken by <grouping>, where kind is 'must' or 'cannot'. Constraints on
+        students who are not in <grouping> are ignored.
+        """
+        group_of = {}
+        for g, group in enumerate(grouping.groups_view()):
+            for member in group.members_view():
+                group_of[member.id] = g
+
+        broken = []
+        for ids in self._blocks.values():
+            present = [id_ for id_ in ids if id_ in group_of]
+            for id_ in present[1:]:
+                if group_of[id_] != group_of[present[0]]:
+                    broken.append((present[0], id_, 'must'))
+        for group in grouping.groups_view():
+            members = [member.id for member in group.members_view()]
+            for i, id1 in enumerate(members):
+                for id2 in members[i + 1:]:
+                    if self.conflict(id1, id2):
+                        broken.append((min(id1, id2), max(id1, id2),
+                                       'cannot'))
+        return sorted(broken)
+
+    def units(self, students: List[Student]) -> List[List[Student]]:
+        """
+        Return the students in <students> split into their blocks, in order
+        of the first student of each block in <students>. The students in
+        each block keep their order in <students>.
+        """
+        units: Dict[int, List[Student]] = {}
+        for student in students:
+            units.setdefault(self.block(student.id), []).append(student)
+        return list(units.values())
+
+    def _root(self, id_: int) -> int:
+        """
+        Return the root of the block of the student with id <id_>, adding
+        a block for it if it has none.
+        """
+        if id_ not in self._parent:
+            self._parent[id_] = id_
+            self._blocks[id_] = [id_]
+            self._apart[id_] = set()
+        return self._find(id_)
+
+    def _find(self, id_: int) -> int:
+        """
+        Return the root of the block of the student with id <id_>, pointing
+        every student on the way directly at it.
+
+        === Precondition ===
+        id_ is in self._parent
+        """
+        root = id_
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[id_] != root:
+            self._parent[id_], id_ = root, self._parent[id_]
+        return root
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'course',
+                                                  'grouper']})
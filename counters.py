@@ -0,0 +1,103 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a registry of counters that the hot paths of the survey
+and criterion classes update while it is active. Use the counting context
+manager to count the work done by a single run of a grouper:
+
+    with counting() as work:
+        grouper.make_grouping(course, survey)
+    print(work.as_dict())
+
+When no registry is active each hot path only pays for one None check.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+class WorkCounters:
+    """
+    Counts of the algorithmic work done while this registry is active.
+
+    === Public Attributes ===
+    similarity: the number of Question.get_similarity calls
+    score_answers: the number of Criterion.score_answers calls
+    score_students: the number of Survey.score_students calls
+    validate_answer: the number of Question.validate_answer calls made
+                     through Answer.is_valid
+
+    === Representation Invariants ===
+    All counts are >= 0
+    """
+
+    similarity: int
+    score_answers: int
+    score_students: int
+    validate_answer: int
+
+    def __init__(self) -> None:
+        """ Initialize a registry with all counts set to zero """
+        self.similarity = 0
+        self.score_answers = 0
+        self.score_students = 0
+        self.validate_answer = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        """
+        Return a dictionary mapping the name of each counter to its count.
+
+        >>> WorkCounters().as_dict()['similarity']
+        0
+        """
+        return {'similarity': self.similarity,
+                'score_answers': self.score_answers,
+                'score_students': self.score_students,
+                'validate_answer': self.validate_answer}
+
+
+# the registry that hot paths update, or None if nothing is being counted
+ACTIVE: Optional[WorkCounters] = None
+
+
+@contextmanager
+def counting() -> Iterator[WorkCounters]:
+    """
+    Make a new WorkCounters the active registry for the duration of a with
+    block and yield it.
+
+    The registry that was active before the block is restored afterwards, so
+    blocks can be nested; work is only counted in the innermost registry.
+    """
+    global ACTIVE
+    previous = ACTIVE
+    ACTIVE = WorkCounters()
+    try:
+        yield ACTIVE
+    finally:
+        ACTIVE = previous
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['typing', 'contextlib']})
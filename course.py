@@ -23,7 +23,9 @@ This file contains classes that describe a university course and the students
 who are enrolled in these courses.
 """
 from __future__ import annotations
+from operator import attrgetter
 from typing import TYPE_CHECKING, List, Tuple, Optional, Dict
+from encoding import AnswerEncoding, MISSING
 
 if TYPE_CHECKING:
     from survey import Answer, Survey, Question
@@ -44,7 +46,7 @@ def sort_students(lst: List[Student], attribute: str) -> List[Student]:
     >>> sort_students([s1, s2, s3], 'name') == [s2, s3, s1]
     True
     """
-    return sorted(lst, key=lambda s: getattr(s, attribute))
+    return sorted(lst, key=attrgetter(attribute))
 
 
 class Student:
@@ -110,6 +112,15 @@ class Course:
     name: the name of the course
     students: a list of students enrolled in the course
 
+    === Private Attributes ===
+    _by_id: the students sorted by id, or None if not sorted since the last
+            enrollment
+    _by_name: the students sorted by name, with ties in order of id, or None
+              if not sorted since the last enrollment
+    _sorted_size: the number of students when _by_id and _by_name were
+                  sorted, so that students added to <students> directly are
+                  noticed too
+
     === Representation Invariants ===
     - No two students in this course have the same id
     - name is not the empty string
@@ -117,6 +128,9 @@ class Course:
 
     name: str
     students: List[Student]
+    _by_id: Optional[Tuple[Student, ...]]
+    _by_name: Optional[Tuple[Student, ...]]
+    _sorted_size: int
 
     def __init__(self, name: str) -> None:
         """
@@ -124,6 +138,9 @@ class Course:
         """
         self.name = name
         self.students = []
+        self._by_id = None
+        self._by_name = None
+        self._sorted_size = 0
 
     def enroll_students(self, students: List[Student]) -> None:
         """
@@ -133,10 +150,12 @@ class Course:
         do not add any of the students in <students> to the course.
         """
         # collect all the id of students in the course
-        ids = []
+        ids = set()
         for student in self.students:
-            ids.append(student.id)
+            ids.add(student.id)
 
+        # the first student in <students> with each id
+        new: Dict[int, Student] = {}
         for student in students:
 
             # no name is empty string
@@ -148,11 +167,13 @@ class Course:
                 return None
 
             # if there are duplicate students
-            for student2 in students:
-                if student != student2 and student.id == student2.id:
-                    return None
+            if student.id in new and new[student.id] is not student:
+                return None
+            new[student.id] = student
 
         self.students.extend(students)
+        self._by_id = None
+        self._by_name = None
         return None
 
     def all_answered(self, survey: Survey) -> bool:
@@ -160,11 +181,44 @@ class Course:
         Return True iff all the students enrolled in this course have a valid
         answer for every question in <survey>.
         """
-        for student in self.students:
-            for question in survey.get_questions():
-                if not student.has_answer(question):
-                    return False
-        return True
+        return len(self.missing_answers(survey)) == 0
+
+    def missing_answers(self, survey: Survey) -> List[Tuple[int, int, str]]:
+        """
+        Return a tuple (student id, question id, reason) for every question in
+        <survey> that a student enrolled in this course has no valid answer
+        to, where reason is 'missing' if the student has no answer to it and
+        'invalid' otherwise.
+
+        The tuples are in order of student id, then in the order of
+        <survey>.get_questions(). Each distinct answer to a question is only
+        validated once.
+
+        >>> from survey import Survey, YesNoQuestion, Answer
+        >>> q = YesNoQuestion(7, 'Yes?')
+        >>> s1 = Student(1, 'Misha')
+        >>> s2 = Student(2, 'Diane')
+        >>> s2.set_answer(q, Answer('maybe'))
+        >>> course = Course('CSC148')
+        >>> course.enroll_students([s2, s1])
+        >>> course.missing_answers(Survey([q]))
+        [(1, 7, 'missing'), (2, 7, 'invalid')]
+        """
+        students = self.get_students()
+        encoding = AnswerEncoding(list(students), survey)
+        missing = []
+        for i, codes in enumerate(encoding.codes):
+            # most students answered everything, so check the row first
+            if MISSING not in codes:
+                continue
+            for q, code in enumerate(codes):
+                if code == MISSING:
+                    question = encoding.scoring[q][0]
+                    reason = 'invalid'
+                    if students[i].get_answer(question) is None:
+                        reason = 'missing'
+                    missing.append((students[i].id, question.id, reason))
+        return missing
 
     def get_students(self) -> Tuple[Student, ...]:
         """
@@ -175,10 +229,25 @@ class Course:
 
         Hint: the sort_students function might be useful
         """
-        return tuple(sort_students(self.students, 'id'))
+        if self._by_id is None or self._sorted_size != len(self.students):
+            self._by_id = tuple(sort_students(self.students, 'id'))
+            self._by_name = None
+            self._sorted_size = len(self.students)
+        return self._by_id
+
+    def get_students_by_name(self) -> Tuple[Student, ...]:
+        """
+        Return a tuple of all students enrolled in this course in order of
+        their names, with students with the same name in order of id.
+        """
+        by_id = self.get_students()
+        if self._by_name is None:
+            self._by_name = tuple(sort_students(list(by_id), 'name'))
+        return self._by_name
 
 
 if __name__ == '__main__':
     import python_ta
 
-    python_ta.check_all(config={'extra-imports': ['typing', 'survey']})
+    python_ta.check_all(config={'extra-imports': ['operator', 'typing',
+                                                  'encoding', 'survey']})
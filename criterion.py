@@ -24,6 +24,7 @@ evaluate a group of answers to a survey question.
 """
 from __future__ import annotations
 from typing import TYPE_CHECKING, List
+import counters
 
 if TYPE_CHECKING:
     from survey import Question, Answer
@@ -81,29 +82,8 @@ class HomogeneousCriterion(Criterion):
         === Precondition ===
         len(answers) > 0
         """
-        # if there is at least one invalid answer in answers
-        for answer in answers:
-            if not answer.is_valid(question):
-                raise InvalidAnswerError
-
-        # if there is only one valid answer in answers
-        if len(answers) == 1 and answers[0].is_valid(question):
-            return 1.0
-
-        combinations = []
-        i = 0
-        while i < len(answers):
-            j = i + 1
-            while j < len(answers):
-                combinations.append([answers[i], answers[j]])
-                j += 1
-            i += 1
-
-        score = []
-        for comb in combinations:  # comb: abbreviation for combination
-            score.append(question.get_similarity(comb[0], comb[1]))
-
-        return sum(score) / len(combinations)
+        _count_score()
+        return _mean_similarity(question, answers)
 
 
 class HeterogeneousCriterion(HomogeneousCriterion):
@@ -131,6 +111,7 @@ class HeterogeneousCriterion(HomogeneousCriterion):
         === Precondition ===
         len(answers) > 0
         """
+        _count_score()
         # if there is at least one invalid answer in answers
         for answer in answers:
             if not answer.is_valid(question):
@@ -141,8 +122,7 @@ class HeterogeneousCriterion(HomogeneousCriterion):
         if len(answers) == 1 and answers[0].is_valid:
             return 0.0
 
-        return 1.0 - HomogeneousCriterion.score_answers(
-            self, question, answers)
+        return 1.0 - _mean_similarity(question, answers)
 
 
 class LonelyMemberCriterion(Criterion):
@@ -169,20 +149,69 @@ class LonelyMemberCriterion(Criterion):
         === Precondition ===
         len(answers) > 0
         """
+        _count_score()
         for a1 in answers:  # a1: abbreviation for answer1 to shorten the code
             count = 0
             for a2 in answers:  # a2: abbreviation for answer2
                 if not (a1.is_valid(question) and a2.is_valid(question)):
                     raise InvalidAnswerError
-                if a1.content != a2.content:
+                # shared answers (see survey.AnswerPool) are compared by
+                # identity first
+                if a1 is not a2 and a1.content != a2.content:
                     count += 1
                 if count == len(answers) - 1:
                     return 0
         return 1.0
 
 
+def _count_score() -> None:
+    """ Count one score_answers call in the active work counters, if any """
+    if counters.ACTIVE is not None:
+        counters.ACTIVE.score_answers += 1
+
+
+def _mean_similarity(question: Question, answers: List[Answer]) -> float:
+    """
+    Return the average similarity of every combination of two answers in
+    <answers> to <question>, or 1.0 if there is only one answer.
+
+    Raise InvalidAnswerError if any answer in <answers> is not a valid
+    answer to <question>.
+
+    === Precondition ===
+    len(answers) > 0
+    """
+    # if there is at least one invalid answer in answers
+    for answer in answers:
+        if not answer.is_valid(question):
+            raise InvalidAnswerError
+
+    # if there is only one valid answer in answers
+    if len(answers) == 1 and answers[0].is_valid(question):
+        return 1.0
+
+    combinations = []
+    i = 0
+    while i < len(answers):
+        j = i + 1
+        while j < len(answers):
+            combinations.append([answers[i], answers[j]])
+            j += 1
+        i += 1
+
+    if counters.ACTIVE is not None:
+        counters.ACTIVE.similarity += len(combinations)
+
+    score = []
+    for comb in combinations:  # comb: abbreviation for combination
+        score.append(question.get_similarity(comb[0], comb[1]))
+
+    return sum(score) / len(combinations)
+
+
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'counters',
                                                   'survey']})
@@ -0,0 +1,409 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a coordinator that spreads grouping work over worker
+processes, which may run on other machines, through sockets. Start a
+coordinator in the program that needs the groupings, then start workers
+that connect to it:
+
+    python distributed.py HOST PORT --authkey KEY
+
+The coordinator splits the work into shards: whole courses, or blocks of a
+huge course (see HierarchicalGrouper.set_coordinator). Each shard is sent to
+the next free worker, which groups it with Grouper.make_grouping and sends
+back a compact array with the group number of every student of the shard.
+If a worker dies or its connection is lost before it replies, its shard is
+sent to another worker.
+
+Shards and replies are pickled, so only run workers for a coordinator you
+trust; connections are authenticated with the shared authkey.
+"""
+from __future__ import annotations
+import argparse
+import queue
+import threading
+import time
+from array import array
+from multiprocessing import AuthenticationError, Process
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, List, Optional, Tuple
+from course import Course, Student
+from grouper import Grouper, Group, Grouping
+from survey import Survey
+
+# a shard: the grouper used for it, its students and the survey
+Shard = Tuple[Grouper, List[Student], Survey]
+
+# how often, in seconds, an idle connection checks if the coordinator closed
+_POLL = 0.05
+
+
+class Coordinator:
+    """
+    A coordinator that sends shards of grouping work to the workers connected
+    to it and collects their results.
+
+    === Public Attributes ===
+    address: the (host, port) address that workers connect to
+
+    === Private Attributes ===
+    _listener: the listener that accepts the connections of workers
+    _tasks: the shards waiting for a worker, as tuples (job, index, shard)
+    _results: the replies for the shards of the current job, by index
+    _job: the number of the current job; shards of older jobs are dropped
+    _workers: the number of workers connected
+    _lost: the number of workers whose connection was lost before they were
+           told to stop
+    _closed: whether this coordinator has been closed
+    _condition: guards _results, _job, _workers and _closed, and is notified
+                when they change
+
+    === Representation Invariants ===
+    _workers >= 0
+    _lost >= 0
+    """
+
+    address: Tuple[str, int]
+    _listener: Listener
+    _tasks: queue.Queue
+    _results: Dict[int, Tuple[str, Any]]
+    _job: int
+    _workers: int
+    _lost: int
+    _closed: bool
+    _condition: threading.Condition
+
+    def __init__(self, authkey: bytes,
+                 address: Tuple[str, int] = ('localhost', 0)) -> None:
+        """
+        Initialize a coordinator that accepts workers at <address> that
+        know <authkey>. If the port of <address> is 0, any free port is used.
+        """
+        self._listener = Listener(address, authkey=authkey)
+        self.address = self._listener.address
+        self._tasks = queue.Queue()
+        self._results = {}
+        self._job = 0
+        self._workers = 0
+        self._lost = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def __enter__(self) -> Coordinator:
+        """ Return this coordinator """
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        """ Close this coordinator """
+        self.close()
+
+    def workers(self) -> int:
+        """ Return the number of workers connected to this coordinator """
+        with self._condition:
+            return self._workers
+
+    def wait_for_workers(self, count: int,
+                         timeout: Optional[float] = None) -> None:
+        """
+        Wait until at least <count> workers are connected.
+
+        Raise TimeoutError if they are not connected within <timeout>
+        seconds.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._workers >= count,
+                                            timeout):
+                raise TimeoutError(f'fewer than {count} workers connected')
+
+    def run(self, shards: List[Shard],
+            timeout: Optional[float] = None) -> List[array]:
+        """
+        Group every shard in <shards> on the workers and return, for each
+        shard in order, an array with the group number of each of its
+        students, in the order of its students. Groups are numbered from 0
+        in the order the grouper returned them.
+
+        If no worker is connected, wait for one. Raise RuntimeError if a
+        grouper raised an error on a worker or if every worker was lost
+        while there were shards left, and TimeoutError if the shards are not
+        all grouped within <timeout> seconds.
+        """
+        with self._condition:
+            self._job += 1
+            job = self._job
+            self._results = {}
+            lost = self._lost
+        for index, shard in enumerate(shards):
+            self._tasks.put((job, index, shard))
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while len(self._results) < len(shards):
+                if self._workers == 0 and self._lost > lost:
+                    # drop the shards of this job that are still waiting
+                    self._job += 1
+                    raise RuntimeError('every worker was lost before the '
+                                       'shards were all grouped')
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        # drop the shards of this job that are still waiting
+                        self._job += 1
+                        raise TimeoutError('the shards were not all grouped')
+                self._condition.wait(remaining)
+            results = self._results
+            self._results = {}
+
+        assignments = []
+        for index in range(len(shards)):
+            status, value = results[index]
+            if status == 'error':
+                raise RuntimeError(f'shard {index} failed: {value}')
+            assignments.append(value)
+        return assignments
+
+    def group_courses(self, courses: List[Course], survey: Survey,
+                      grouper: Grouper,
+                      timeout: Optional[float] = None) -> List[Grouping]:
+        """
+        Return a grouping of every course in <courses>, in order, made by
+        <grouper> according to <survey> on the workers. Each course is a
+        shard.
+
+        Raise RuntimeError or TimeoutError as in run.
+        """
+        shards = [(grouper, list(course.get_students()), survey)
+                  for course in courses]
+        groupings = []
+        for shard, assignment in zip(shards, self.run(shards, timeout)):
+            grouping = Grouping()
+            for members in assignment_groups(shard[1], assignment):
+                grouping.add_group(Group(members))
+            groupings.append(grouping)
+        return groupings
+
+    def group_blocks(self, grouper: Grouper, blocks: List[List[Student]],
+                     survey: Survey,
+                     timeout: Optional[float] = None) -> List[List[List[int]]]:
+        """
+        Group every block of students in <blocks> with <grouper> according
+        to <survey> on the workers, and return for each block, in order, the
+        ids of the members of each of its groups. Each block is a shard.
+
+        Raise RuntimeError or TimeoutError as in run.
+        """
+        shards = [(grouper, block, survey) for block in blocks]
+        results = []
+        for block, assignment in zip(blocks, self.run(shards, timeout)):
+            results.append([[member.id for member in members]
+                            for members in assignment_groups(block,
+                                                             assignment)])
+        return results
+
+    def close(self) -> None:
+        """
+        Stop accepting workers and tell the connected workers to stop once
+        they are done with their current shard.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._listener.close()
+
+    def _accept(self) -> None:
+        """ Accept workers until this coordinator is closed """
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                with self._condition:
+                    if self._closed:
+                        return
+                # a client that failed to authenticate
+                continue
+            with self._condition:
+                self._workers += 1
+                self._condition.notify_all()
+            threading.Thread(target=self._serve, args=(conn,),
+                             daemon=True).start()
+
+    def _serve(self, conn: Connection) -> None:
+        """
+        Send shards to the worker connected through <conn>, one at a time,
+        until this coordinator is closed or the worker is lost. A shard
+        whose result was not received is put back for another worker.
+        """
+        lost = None
+        told = False
+        try:
+            while True:
+                task = self._next_task()
+                if task is None:
+                    told = True
+                    conn.send(None)
+                    return
+                job, index, shard = task
+                try:
+                    conn.send(shard)
+                    reply = conn.recv()
+                except (EOFError, OSError):
+                    lost = task
+                    return
+                with self._condition:
+                    if job == self._job:
+                        self._results[index] = reply
+                        self._condition.notify_all()
+        except (EOFError, OSError):
+            return
+        finally:
+            conn.close()
+            with self._condition:
+                self._workers -= 1
+                if not told:
+                    self._lost += 1
+                self._condition.notify_all()
+            if lost is not None:
+                self._tasks.put(lost)
+
+    def _next_task(self) -> Optional[Tuple[int, int, Shard]]:
+        """
+        Return the next shard of the current job, waiting for one if there
+        is none, or None once this coordinator is closed.
+        """
+        while True:
+            with self._condition:
+                if self._closed:
+                    return None
+            try:
+                task = self._tasks.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+            with self._condition:
+                if task[0] == self._job:
+                    return task
+
+
+def assignment_groups(students: List[Student],
+                      assignment: array) -> List[List[Student]]:
+    """
+    Return the groups of <students> described by <assignment>, where
+    assignment[i] is the group number of students[i], in order of group
+    number. The members of a group are in the order of <students>.
+
+    >>> s = [Student(1, 'A'), Student(2, 'B'), Student(3, 'C')]
+    >>> [[m.id for m in g] for g in assignment_groups(s, array('i', [1, 0, 1]))]
+    [[2], [1, 3]]
+    """
+    groups: Dict[int, List[Student]] = {}
+    for student, number in zip(students, assignment):
+        groups.setdefault(number, []).append(student)
+    return [groups[number] for number in sorted(groups)]
+
+
+def group_shard(shard: Shard) -> array:
+    """
+    Group the students of <shard> and return an array with the group number
+    of each of them, in the order of the students of <shard>.
+
+    Raise ValueError if a student has no name or two students have the same
+    id.
+    """
+    grouper, students, survey = shard
+    course = Course('shard')
+    course.enroll_students(students)
+    if len(course.students) != len(students):
+        raise ValueError('the students of the shard cannot all be enrolled')
+    grouping = grouper.make_grouping(course, survey)
+
+    positions = {}
+    for i, student in enumerate(students):
+        positions[student.id] = i
+    assignment = array('i', [0]) * len(students)
+    for number, group in enumerate(grouping.groups_view()):
+        for member in group.members_view():
+            assignment[positions[member.id]] = number
+    return assignment
+
+
+def work(address: Tuple[str, int], authkey: bytes) -> int:
+    """
+    Connect to the coordinator at <address> with <authkey> and group the
+    shards it sends until it tells this worker to stop or the connection is
+    lost. Return the number of shards grouped.
+    """
+    done = 0
+    with Client(address, authkey=authkey) as conn:
+        while True:
+            try:
+                shard = conn.recv()
+            except (EOFError, OSError):
+                return done
+            if shard is None:
+                return done
+            try:
+                reply = ('ok', group_shard(shard))
+            except Exception as error:  # report any failure to the coordinator
+                reply = ('error', repr(error))
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                return done
+            done += 1
+
+
+def start_workers(address: Tuple[str, int], authkey: bytes,
+                  count: int) -> List[Process]:
+    """
+    Start <count> worker processes on this machine that work for the
+    coordinator at <address>, and return them.
+    """
+    processes = []
+    for _ in range(count):
+        process = Process(target=work, args=(address, authkey), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run a worker with the arguments <argv> (or the arguments given to this
+    program if <argv> is None) and return the exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description='Group shards sent by a coordinator.')
+    parser.add_argument('host')
+    parser.add_argument('port', type=int)
+    parser.add_argument('--authkey', required=True)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    done = work((args.host, args.port), args.authkey.encode('utf-8'))
+    print(f'grouped {done} shards in '
+          f'{time.perf_counter() - start:.4f} seconds')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
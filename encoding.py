@@ -0,0 +1,197 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a compact encoding of the students' answers to a survey.
+Every distinct answer to a question gets a small integer code, so students
+can be compared by their codes, and the score of a pair of answers only has
+to be computed once for every pair of distinct answers.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional, \
+    Tuple
+from criterion import InvalidAnswerError
+
+if TYPE_CHECKING:
+    from course import Student
+    from criterion import Criterion
+    from survey import Answer, Question, Survey
+
+# the code of a missing or invalid answer
+MISSING = -1
+
+
+def answer_key(content: Any) -> Hashable:
+    """
+    Return a hashable key for the answer content <content>. Two answers to
+    the same question have the same key iff they have equal content of the
+    same type, where the order of the options in a checkbox answer does not
+    matter.
+
+    Raise TypeError if <content> cannot be turned into a key.
+
+    >>> answer_key(['b', 'a']) == answer_key(['a', 'b'])
+    True
+    >>> answer_key(1) == answer_key(True)
+    False
+    """
+    if isinstance(content, list):
+        return list, tuple(sorted(content))
+    return type(content), content
+
+
+class AnswerEncoding:
+    """
+    The answers of some students to the questions of a survey, encoded as
+    small integer codes.
+
+    === Public Attributes ===
+    scoring: a tuple (question, criterion, weight) for every question in
+             the survey, in the order of Survey.get_scoring
+    codes: codes[i][q] is the code of the answer of student i to question q,
+           or MISSING if that student has no valid answer to it
+    total_weight: the sum of the weights of all questions
+
+    === Private Attributes ===
+    _answers: _answers[q][c] is an answer to question q with code c
+    _pairs: _pairs[q] maps a pair of codes (c1, c2) with c1 <= c2 to the
+            score of the two answers with these codes according to the
+            criterion of question q
+
+    === Representation Invariants ===
+    Every code in codes is MISSING or a valid index into _answers
+    """
+
+    scoring: List[Tuple[Question, Criterion, int]]
+    codes: List[List[int]]
+    total_weight: int
+    _answers: List[List[Answer]]
+    _pairs: List[Dict[Tuple[int, int], float]]
+
+    def __init__(self, students: List[Student], survey: Survey) -> None:
+        """
+        Initialize the encoding of the answers of <students> to the questions
+        of <survey>.
+        """
+        self.scoring = survey.get_scoring()
+        self.codes = [[] for _ in students]
+        self.total_weight = 0
+        self._answers = []
+        self._pairs = []
+
+        for question, _, weight in self.scoring:
+            self.total_weight += weight
+            keys: Dict[Hashable, int] = {}
+            answers = []
+            for i, student in enumerate(students):
+                self.codes[i].append(_encode(student.get_answer(question),
+                                             question, keys, answers))
+            self._answers.append(answers)
+            self._pairs.append({})
+
+    def signature(self, i: int) -> Tuple[int, ...]:
+        """ Return the codes of all answers of student <i> as a tuple """
+        return tuple(self.codes[i])
+
+    def pair_score(self, q: int, code1: int, code2: int) -> float:
+        """
+        Return the score given by the criterion of question <q> to the pair
+        of answers with the codes <code1> and <code2>, or 0.0 if either
+        answer is missing.
+        """
+        if code1 == MISSING or code2 == MISSING:
+            return 0.0
+        if code1 > code2:
+            code1, code2 = code2, code1
+        pairs = self._pairs[q]
+        if (code1, code2) not in pairs:
+            question, criterion, _ = self.scoring[q]
+            try:
+                pairs[(code1, code2)] = criterion.score_answers(
+                    question, [self._answers[q][code1],
+                               self._answers[q][code2]])
+            except InvalidAnswerError:
+                pairs[(code1, code2)] = 0.0
+        return pairs[(code1, code2)]
+
+    def pair_scores(self) -> List[Dict[Tuple[int, int], float]]:
+        """
+        Return the pair scores computed so far for each question, to be given
+        to add_pair_scores of an encoding of the same students and survey.
+        """
+        return self._pairs
+
+    def add_pair_scores(self,
+                        pairs: List[Dict[Tuple[int, int], float]]) -> None:
+        """
+        Remember the pair scores in <pairs>, returned by pair_scores of an
+        encoding of the same students and survey, so they are not computed
+        again.
+        """
+        for q, scores in enumerate(pairs):
+            self._pairs[q].update(scores)
+
+    def affinity(self, codes1: List[int], codes2: List[int]) -> float:
+        """
+        Return the weighted average pair score, between 0.0 and 1.0, of two
+        students whose answers have the codes <codes1> and <codes2>.
+        """
+        if self.total_weight == 0:
+            return 0.0
+        total = 0.0
+        for q in range(len(self.scoring)):
+            total += self.scoring[q][2] * self.pair_score(q, codes1[q],
+                                                          codes2[q])
+        return total / self.total_weight
+
+
+def _encode(answer: Optional[Answer], question: Question,
+            keys: Dict[Hashable, int], answers: List[Answer]) -> int:
+    """
+    Return the code of <answer> to <question>, or MISSING if <answer> is None
+    or not valid.
+
+    <keys> maps the key of every answer already encoded to its code and
+    <answers> contains one answer for every code. A valid answer with a new
+    key is given the next code and added to both.
+    """
+    if answer is None:
+        return MISSING
+    try:
+        key = answer_key(answer.content)
+        if key in keys:
+            return keys[key]
+    except TypeError:
+        return MISSING
+    if not answer.is_valid(question):
+        return MISSING
+    keys[key] = len(answers)
+    answers.append(answer)
+    return keys[key]
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'criterion',
+                                                  'course',
+                                                  'survey']})
@@ -25,12 +25,26 @@ questions. This file also contain a classe that describes a group of students as
 well as a grouping (a group of groups).
 """
 from __future__ import annotations
+import heapq
 import random
-from typing import TYPE_CHECKING, List, Any, Optional
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, List, Any, Optional, Dict, Tuple, Set, \
+    Sequence, Callable
 from course import Course, Student, sort_students
+from criterion import HomogeneousCriterion, HeterogeneousCriterion, \
+    InvalidAnswerError
+from encoding import AnswerEncoding
+from minhash import MinHashIndex
+from constraints import Constraints
+from checkpoint import Checkpoint, run_key
+from progress import Progress
 
 if TYPE_CHECKING:
-    from survey import Survey, Question, YesNoQuestion, Answer
+    from criterion import Criterion
+    from distributed import Coordinator
+    from survey import Survey, Question, YesNoQuestion, Answer, \
+        CheckboxQuestion
 
 
 def slice_list(lst: List[Any], n: int) -> List[List[Any]]:
@@ -84,14 +98,30 @@ class Grouper:
     An abstract class representing a grouper used to create a grouping of
     students according to their answers to a survey.
 
+    If the grouper has constraints, every grouping it makes keeps students
+    that must be paired together and students that cannot be paired apart.
+    Groups may then have fewer than group_size members where that is needed
+    to meet the constraints.
+
     === Public Attributes ===
     group_size: the ideal number of students that should be in each group
 
+    === Private Attributes ===
+    _constraints: the constraints every grouping must meet, or None if there
+                  are none
+    _checkpoint: the checkpoint that make_grouping saves its state to and
+                 resumes from, or None if it does not save its state
+    _progress: the progress that make_grouping reports to and checks for
+               whether to stop, or None
+
     === Representation Invariants ===
     group_size > 1
     """
 
     group_size: int
+    _constraints: Optional[Constraints]
+    _checkpoint: Optional[Checkpoint]
+    _progress: Optional[Progress]
 
     def __init__(self, group_size: int) -> None:
         """
@@ -101,6 +131,9 @@ class Grouper:
         group_size > 1
         """
         self.group_size = group_size
+        self._constraints = None
+        self._checkpoint = None
+        self._progress = None
 
     def make_grouping(self, course: Course, survey: Survey) -> Grouping:
         """ Return a grouping for all students in <course> using the questions
@@ -108,6 +141,214 @@ class Grouper:
         """
         raise NotImplementedError
 
+    def set_constraints(self, constraints: Optional[Constraints]) -> None:
+        """
+        Make every grouping meet <constraints>, or remove the constraints of
+        this grouper if <constraints> is None.
+
+        Raise ValueError if more than self.group_size students must be in
+        the same group.
+        """
+        if constraints is not None and \
+                constraints.largest_block() > self.group_size:
+            raise ValueError('more students must be paired than fit in a group')
+        self._constraints = constraints
+
+    def set_checkpoint(self, checkpoint: Optional[Checkpoint]) -> None:
+        """
+        Make make_grouping save its state to <checkpoint> as it goes and
+        resume from the state saved there by a run of the same grouper on the
+        same students and survey that did not finish, or stop saving state if
+        <checkpoint> is None. The saved state is cleared once a grouping is
+        complete.
+
+        Only groupers that can take a long time save their state: the
+        greedy, window, optimal, cluster, partition and hierarchical
+        groupers. The others ignore <checkpoint>.
+        """
+        self._checkpoint = checkpoint
+
+    def set_progress(self, progress: Optional[Progress]) -> None:
+        """
+        Make make_grouping report to <progress> and stop when <progress> asks
+        it to, or stop reporting if <progress> is None.
+
+        Groupers that can take a long time report and check whether to stop
+        at safe points, and when asked to stop either raise
+        progress.GroupingCancelled or put the students that are left into
+        groups in order. The others only report when they are done.
+        """
+        self._progress = progress
+
+    def _begin(self) -> None:
+        """ Start the clock of the progress of this grouper, if any """
+        if self._progress is not None:
+            self._progress.start()
+
+    def _stopping(self, placed: int, groups: int) -> bool:
+        """
+        Report that <placed> students are in <groups> groups so far, and
+        return True iff this grouper should finish the grouping with
+        _fill now.
+
+        Raise GroupingCancelled if this grouper should stop without a
+        fallback.
+        """
+        return self._progress is not None and \
+            self._progress.check(placed, groups)
+
+    def _fill(self, grouping: Grouping,
+              students: List[Student]) -> List[Student]:
+        """
+        Add the students in <students> to <grouping> in groups of
+        self.group_size consecutive students, the cheap fallback used when
+        a grouper is asked to stop, and return the empty list of students
+        left.
+        """
+        for members in slice_list(students, self.group_size):
+            grouping.add_group(Group(members))
+        return []
+
+    def _done(self, grouping: Grouping) -> Grouping:
+        """ Report that <grouping> is done, and return it """
+        if self._progress is not None:
+            placed = 0
+            for group in grouping.groups_view():
+                placed += len(group)
+            self._progress.report(placed, len(grouping))
+        return grouping
+
+    def _resume(self, students: List[Student], survey: Survey) \
+            -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Return the key of a run of this grouper on <students> with <survey>
+        and the state saved for that run, or None for the state if none was
+        saved. Return (None, None) if this grouper has no checkpoint.
+        """
+        if self._checkpoint is None:
+            return None, None
+        key = run_key(self, students, survey)
+        return key, self._checkpoint.load(key)
+
+    def _save_due(self, key: Optional[str]) -> bool:
+        """
+        Return True iff the state of the run with <key> should be saved now.
+        """
+        return key is not None and self._checkpoint.due()
+
+    def _finish(self, key: Optional[str]) -> None:
+        """ Clear the saved state of the run with <key>, which is done """
+        if key is not None:
+            self._checkpoint.clear()
+
+    def _constrain(self, grouping: Grouping) -> Grouping:
+        """
+        Return <grouping> if it meets the constraints of this grouper, or
+        otherwise a grouping of the same students that does.
+
+        The new grouping keeps the groups of <grouping> in order, each with
+        the blocks of students (see Constraints.units) of its members that
+        still fit in it. The blocks that do not fit are then added to the
+        first group with room that they do not conflict with. If there is
+        none, a block is swapped into a group for one of that group's blocks
+        that can move to another group with room (see _swap_in), and only
+        if no such swap exists is it put in a new group.
+        """
+        constraints = self._constraints
+        if constraints is None or len(constraints.violations(grouping)) == 0:
+            return grouping
+
+        students = []
+        for group in grouping.groups_view():
+            students.extend(group.members_view())
+        unit_of = {}
+        for unit in constraints.units(students):
+            for student in unit:
+                unit_of[student.id] = unit
+
+        groups: List[List[Student]] = []
+        blocks: List[Set[int]] = []
+        placed = set()
+        pending = []
+        for group in grouping.groups_view():
+            members: List[Student] = []
+            member_blocks: Set[int] = set()
+            for student in group.members_view():
+                if student.id in placed:
+                    continue
+                unit = unit_of[student.id]
+                for other in unit:
+                    placed.add(other.id)
+                if len(members) + len(unit) <= self.group_size and \
+                        constraints.fits(student.id, member_blocks):
+                    members.extend(unit)
+                    member_blocks.add(constraints.block(student.id))
+                else:
+                    pending.append(unit)
+            if len(members) > 0:
+                groups.append(members)
+                blocks.append(member_blocks)
+
+        for unit in pending:
+            block = constraints.block(unit[0].id)
+            for g, members in enumerate(groups):
+                if len(members) + len(unit) <= self.group_size and \
+                        constraints.fits(unit[0].id, blocks[g]):
+                    members.extend(unit)
+                    blocks[g].add(block)
+                    break
+            else:
+                if not self._swap_in(unit, groups, blocks, unit_of):
+                    groups.append(list(unit))
+                    blocks.append({block})
+
+        constrained = Grouping()
+        for members in groups:
+            constrained.add_group(Group(members))
+        return constrained
+
+    def _swap_in(self, unit: List[Student], groups: List[List[Student]],
+                 blocks: List[Set[int]],
+                 unit_of: Dict[int, List[Student]]) -> bool:
+        """
+        Put <unit> into the first group of <groups> that it fits in once one
+        of the group's units is moved to another group with room for it,
+        and return True, or return False if there is no such group.
+
+        blocks[g] is the set of blocks of the members of groups[g], and
+        <unit_of> maps the id of every student to its unit. Both <groups>
+        and <blocks> are changed in place.
+
+        === Precondition ===
+        self._constraints is not None
+        """
+        constraints = self._constraints
+        block = constraints.block(unit[0].id)
+        for a, members in enumerate(groups):
+            seen = set()
+            for student in members:
+                if student.id in seen:
+                    continue
+                other = unit_of[student.id]
+                seen.update(member.id for member in other)
+                other_block = constraints.block(student.id)
+                rest = blocks[a] - {other_block}
+                if len(members) - len(other) + len(unit) > self.group_size \
+                        or not constraints.fits(unit[0].id, rest):
+                    continue
+                for b, target in enumerate(groups):
+                    if b != a and \
+                            len(target) + len(other) <= self.group_size and \
+                            constraints.fits(student.id, blocks[b]):
+                        for member in other:
+                            members.remove(member)
+                        members.extend(unit)
+                        blocks[a] = rest | {block}
+                        target.extend(other)
+                        blocks[b].add(other_block)
+                        return True
+        return False
+
     def _best_match(self, survey: Survey, all_students: List[Student],
                     ones: List[Student]) -> List[Student]:
         """
@@ -155,12 +396,11 @@ class AlphaGrouper(Grouper):
         Hint: the sort_students function might be useful
         """
         grouping = Grouping()
-        students = list(course.get_students())
-        sorted_s = sort_students(students, 'name')
+        sorted_s = list(course.get_students_by_name())
         sliced_s = slice_list(sorted_s, self.group_size)
         for slices in sliced_s:
             grouping.add_group(Group(slices))
-        return grouping
+        return self._done(self._constrain(grouping))
 
     def _best_match(self, survey: Survey, all_students: List[Student],
                     ones: List[Student]) -> List[Student]:
@@ -204,9 +444,14 @@ class RandomGrouper(AlphaGrouper):
         members if that is required to make sure all students in <course> are
         members of a group.
         """
+        self._begin()
         grouping = Grouping()
         students = list(course.get_students())
+        total = len(students)
         while len(students) > self.group_size:
+            if self._stopping(total - len(students), len(grouping)):
+                students = self._fill(grouping, students)
+                break
             random.shuffle(students)
             sliced = slice_list(students, self.group_size)
             picked = sliced[0]
@@ -215,7 +460,7 @@ class RandomGrouper(AlphaGrouper):
                 students.remove(student)
         if len(students) > 0:
             grouping.add_group(Group(students))
-        return grouping
+        return self._done(self._constrain(grouping))
 
     def _best_match(self, survey: Survey, all_students: List[Student],
                     ones: List[Student]) -> List[Student]:
@@ -240,14 +485,71 @@ class GreedyGrouper(Grouper):
     answers to a survey. This grouper uses a greedy algorithm to create
     groups.
 
+    If lsh_question is not None, step 2 of the algorithm only scores a
+    shortlist of the students whose answers to lsh_question are most similar
+    to the answers of the new group's members, found with a MinHashIndex.
+    This is much faster for large courses but may give a different grouping,
+    and only makes sense if lsh_question has a HomogeneousCriterion.
+
+    If lazy is True and lsh_question is None, step 2 keeps the students in a
+    heap ordered by how much they last raised the score of the new group,
+    highest first, starting from an upper bound on their score with its
+    first member. It re-scores the student at the top of the heap until the
+    student at the top was scored with the group as it is now, and adds that
+    student, so the choice is always made on a fresh score. The first
+    student added to each group is the same as without lazy, but a student
+    whose gain went up since it was last scored may be missed, so the
+    grouping often differs from the one made without lazy and usually
+    scores a few percent lower: about 2.5% on random surveys of 8 to 40
+    students, and 1% to 3% with 800 students, for 2 to 5 times fewer scores.
+
     === Public Attributes ===
     group_size: the ideal number of students that should be in each group
+    lsh_question: the checkbox question used to shortlist candidates, or None
+                  to score every student that has not been put in a group
+    bands: the number of bands of the MinHashIndex
+    rows: the number of min-hashes in each band of the MinHashIndex
+    shortlist: the largest number of candidates scored in step 2
+    lazy: True iff step 2 only re-scores the most promising students, for a
+          faster but slightly lower-scoring grouping
 
     === Representation Invariants ===
     group_size > 1
+    bands > 0
+    rows > 0
+    shortlist > 0
     """
 
     group_size: int
+    lsh_question: Optional[CheckboxQuestion]
+    bands: int
+    rows: int
+    shortlist: int
+    lazy: bool
+
+    def __init__(self, group_size: int,
+                 lsh_question: Optional[CheckboxQuestion] = None,
+                 bands: int = 16, rows: int = 4, shortlist: int = 32,
+                 lazy: bool = False) -> None:
+        """
+        Initialize a grouper that creates groups of size <group_size>, using
+        a MinHashIndex with <bands> bands of <rows> rows over the answers to
+        <lsh_question> to score at most <shortlist> candidates at each step if
+        <lsh_question> is not None, and only re-scoring the most promising
+        candidates at each step if <lazy> is True.
+
+        === Precondition ===
+        group_size > 1
+        bands > 0
+        rows > 0
+        shortlist > 0
+        """
+        Grouper.__init__(self, group_size)
+        self.lsh_question = lsh_question
+        self.bands = bands
+        self.rows = rows
+        self.shortlist = shortlist
+        self.lazy = lazy
 
     def make_grouping(self, course: Course, survey: Survey) -> Grouping:
         """
@@ -268,25 +570,66 @@ class GreedyGrouper(Grouper):
         4. repeat steps 1-3 until all students have been placed in a group.
 
         In step 2 above, use the <survey>.score_students method to determine
-        the score of each group of students.
+        the score of each group of students. Students whose score is known to
+        be too low from the pair scores of their answers are not scored.
 
         The final group created may have fewer than N members if that is
         required to make sure all students in <course> are members of a group.
+
+        If this grouper has constraints, see _make_constrained_grouping.
+
+        If this grouper has a checkpoint, the groups formed so far are saved
+        after a group is formed, and the grouping resumes after the last
+        group saved.
+
+        If this grouper has a progress, it is checked before a group is
+        formed.
         """
+        self._begin()
         grouping = Grouping()
         students = list(course.get_students())
+        total = len(students)
+        key, state = self._resume(students, survey)
+        bounds = _ScoreBounds(students, survey)
+        index = None
+        if self.lsh_question is not None:
+            index = MinHashIndex(students, self.lsh_question, self.bands,
+                                 self.rows)
+        if state is not None:
+            bounds.restore(state['scores'])
+            grouping = _grouping_of(state['groups'], _by_id(students))
+            students = _ungrouped(students, grouping, index)
+        if self._constraints is not None:
+            grouping = self._make_constrained_grouping(
+                students, survey, bounds, index, grouping, key)
+            self._finish(key)
+            return self._done(self._constrain(grouping))
 
         # if more groups can be formed
         while len(students) > self.group_size:
+            if self._stopping(total - len(students), len(grouping)):
+                students = self._fill(grouping, students)
+                break
 
             # put the first ungrouped kid in a list
             prepared = [students[0]]
+            lazy = None
+            if self.lazy and index is None:
+                lazy = _LazyCandidates(survey, students[1:], prepared,
+                                       bounds)
 
             # if the desired size has not been reached
             while len(prepared) != self.group_size:
 
                 # the length of prepared students should increase one each time
-                prepared = self._best_match(survey, students, prepared)
+                if lazy is not None:
+                    prepared = prepared + [lazy.pop_best(prepared)]
+                    continue
+                candidates = students
+                if index is not None:
+                    candidates = self._shortlist(index, prepared, students)
+                prepared = self._best_match(survey, candidates, prepared,
+                                            bounds)
 
             # after the desired length is reached
             # group the prepared students and put into grouping
@@ -295,18 +638,133 @@ class GreedyGrouper(Grouper):
             # remove the grouped students from the ungrouped list
             for student in prepared:
                 students.remove(student)
+                if index is not None:
+                    index.remove(student)
+
+            if self._save_due(key):
+                self._checkpoint.save(key, {'groups': _group_ids(grouping),
+                                            'scores': bounds.cached()})
 
         # after all possible best_matched groups are formed
         # if there are some students remaining to be ungrouped
+        if len(students) > 0:
+            grouping.add_group(Group(students))
+        self._finish(key)
+        return self._done(self._constrain(grouping))
+
+    def _make_constrained_grouping(self, students: List[Student],
+                                   survey: Survey, bounds: _ScoreBounds,
+                                   index: Optional[MinHashIndex],
+                                   grouping: Grouping,
+                                   key: Optional[str]) -> Grouping:
+        """
+        Add groups of <students> to <grouping>, made as in make_grouping,
+        except that each student is added to a group together with the
+        students that must be paired with it, and return <grouping>. Students
+        that cannot join the new group, or whose block does not fit in it,
+        are left out before any group is scored. A group is closed early if no
+        student can join it. The state of the run with <key> is saved, and
+        the progress is checked, as in make_grouping.
+
+        === Precondition ===
+        self._constraints is not None
+        """
+        constraints = self._constraints
+        unit_of = {}
+        for unit in constraints.units(students):
+            for student in unit:
+                unit_of[student.id] = unit
+        total = len(students)
+        for group in grouping.groups_view():
+            total += len(group)
+
+        while len(students) > self.group_size:
+            if self._stopping(total - len(students), len(grouping)):
+                students = self._fill(grouping, students)
+                break
+            prepared = list(unit_of[students[0].id])
+            blocks = {constraints.block(students[0].id)}
+
+            while len(prepared) < self.group_size:
+                room = self.group_size - len(prepared)
+                candidates = students
+                if index is not None:
+                    candidates = self._shortlist(index, prepared, students)
+                units = _open_units(candidates, unit_of, blocks, room,
+                                    constraints)
+                if len(units) == 0 and candidates is not students:
+                    units = _open_units(students, unit_of, blocks, room,
+                                        constraints)
+                if len(units) == 0:
+                    break
+                best = self._best_unit(survey, units, prepared, bounds)
+                prepared.extend(best)
+                blocks.add(constraints.block(best[0].id))
+
+            grouping.add_group(Group(prepared))
+            grouped = set()
+            for student in prepared:
+                grouped.add(student.id)
+                if index is not None:
+                    index.remove(student)
+            students = [s for s in students if s.id not in grouped]
+            if self._save_due(key):
+                self._checkpoint.save(key, {'groups': _group_ids(grouping),
+                                            'scores': bounds.cached()})
+
         if len(students) > 0:
             grouping.add_group(Group(students))
         return grouping
 
+    def _best_unit(self, survey: Survey, units: List[List[Student]],
+                   ones: List[Student],
+                   bounds: _ScoreBounds) -> List[Student]:
+        """
+        Return the unit in <units> that gives <ones> the highest score when
+        added to it, the first one if several do, skipping single students
+        whose upper bound in <bounds> is below the best score so far.
+
+        === Precondition ===
+        len(units) > 0
+        """
+        best = units[0]
+        top = survey.score_students(ones + best)
+        sums = bounds.group_sums(ones)
+        for unit in units[1:]:
+            if len(unit) == 1 and \
+                    bounds.upper(sums, ones, unit[0]) < top - 1e-9:
+                continue
+            score = survey.score_students(ones + unit)
+            if score > top:
+                best = unit
+                top = score
+        return best
+
+    def _shortlist(self, index: MinHashIndex, ones: List[Student],
+                   students: List[Student]) -> List[Student]:
+        """
+        Return the students in <index> that are most likely to have answers
+        similar to those of <ones>, in the order of <students>, or <students>
+        if <index> finds none.
+
+        === Precondition ===
+        <index> contains exactly the students in <students>
+        """
+        found = index.group_neighbours(ones, self.shortlist)
+        if len(found) == 0:
+            return students
+        return sort_students(found, 'id')
+
     def _best_match(self, survey: Survey, all_students: List[Student],
-                    ones: List[Student]) -> List[Student]:
+                    ones: List[Student],
+                    bounds: Optional[_ScoreBounds] = None) -> List[Student]:
         """
         Return a list containing the combination of students that has the
         highest score.
+
+        If <bounds> is not None and can prune, students whose upper bound in
+        <bounds> is below the best score found so far are not scored. The
+        result is the same either way.
         >>> amy = Student(1, 'Amy')
         >>> lisa = Student(2, 'Lisa')
         >>> kali = Student(3, 'Kali')
@@ -326,16 +784,25 @@ class GreedyGrouper(Grouper):
         # this keeps track of all scores with its owners
         best = {}
         scores = []  # this keeps all the scores
+        top = 0.0
+        sums = None
+        if bounds is not None and bounds.can_prune():
+            sums = bounds.group_sums(ones)
 
         # for all the students
         for each in all_students:
             # avoid duplicates
             if each not in ones:
+                # skip students that cannot beat or tie the best score so far
+                if sums is not None and len(scores) > 0 and \
+                        bounds.upper(sums, ones, each) < top - 1e-9:
+                    continue
                 score = survey.score_students(ones + [each])
                 scores.append(score)
                 # avoid being covered
                 if score not in best:
                     best[score] = ones + [each]
+                top = max(top, score)
 
         return best[max(scores)]
 
@@ -389,19 +856,40 @@ class WindowGrouper(Grouper):
         If there are any remaining students who have not been put in a group
         after repeating steps 1 and 2 above, put the remaining students into a
         new group.
+
+        If this grouper has constraints, windows that would break them are
+        left out in step 2 before any window is scored.
+
+        If this grouper has a checkpoint, the groups made so far are saved
+        after a group is made, and the grouping resumes after the last group
+        saved.
         """
         # gather a list of ungrouped students
+        self._begin()
         students = list(course.get_students())
+        total = len(students)
         grouping = Grouping()
+        key, state = self._resume(students, survey)
+        if state is not None:
+            grouping = _grouping_of(state['groups'], _by_id(students))
+            students = _ungrouped(students, grouping, None)
 
         # when more than one group can be formed
         while len(students) > self.group_size:
+            if self._stopping(total - len(students), len(grouping)):
+                students = self._fill(grouping, students)
+                break
 
             # create a (new) window
             split = windows(students, self.group_size)
+            if self._constraints is not None:
+                split = self._allowed_windows(split, students)
 
             # find the window that has a higher mark than the next
-            best_window = self._find_best_window(split, survey)
+            if len(split) == 1:
+                best_window = split[0]
+            else:
+                best_window = self._find_best_window(split, survey)
 
             # add to grouping
             grouping.add_group(Group(best_window))
@@ -410,11 +898,34 @@ class WindowGrouper(Grouper):
             for student in best_window:
                 students.remove(student)
 
+            if self._save_due(key):
+                self._checkpoint.save(key, {'groups': _group_ids(grouping)})
+
         # if there are students remaining
         if len(students) > 0:
             grouping.add_group(Group(students))
 
-        return grouping
+        self._finish(key)
+        return self._done(self._constrain(grouping))
+
+    def _allowed_windows(self, windows_: List[List[Student]],
+                         students: List[Student]) -> List[List[Student]]:
+        """
+        Return the windows in <windows_> that meet the constraints of this
+        grouper, where <students> are the students not in a group yet, or
+        <windows_> if none of them do.
+
+        === Precondition ===
+        self._constraints is not None
+        """
+        present = {student.id for student in students}
+        allowed = []
+        for window in windows_:
+            if self._constraints.allows([s.id for s in window], present):
+                allowed.append(window)
+        if len(allowed) == 0:
+            return windows_
+        return allowed
 
     def _find_best_window(self, windows_: List[Student],
                           survey: Survey) -> Optional[List[Student]]:
@@ -459,6 +970,1629 @@ class WindowGrouper(Grouper):
         raise NotImplementedError
 
 
+class OptimalGrouper(Grouper):
+    """
+    A grouper used to create the grouping of students with the highest
+    possible score according to a survey. This grouper uses a branch and
+    bound search, so it is only practical for small courses (about 24
+    students or fewer).
+
+    === Public Attributes ===
+    group_size: the ideal number of students that should be in each group
+    node_limit: the largest number of partial groupings to explore
+    time_limit: the largest number of seconds to spend searching
+    nodes: the number of partial groupings explored by the last call to
+           make_grouping
+    proved_optimal: True iff the last call to make_grouping explored the
+           whole search space, so the grouping it returned has the highest
+           possible score
+
+    === Representation Invariants ===
+    group_size > 1
+    node_limit > 0
+    time_limit > 0
+    """
+
+    group_size: int
+    node_limit: int
+    time_limit: float
+    nodes: int
+    proved_optimal: bool
+
+    def __init__(self, group_size: int, node_limit: int = 1000000,
+                 time_limit: float = 10.0) -> None:
+        """
+        Initialize a grouper that creates groups of size <group_size>,
+        exploring at most <node_limit> partial groupings for at most
+        <time_limit> seconds.
+
+        === Precondition ===
+        group_size > 1
+        """
+        Grouper.__init__(self, group_size)
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        self.nodes = 0
+        self.proved_optimal = False
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        """
+        Return a grouping for all students in <course> with the highest
+        score according to <survey>.score_grouping.
+
+        All groups in this grouping have exactly self.group_size members
+        except for the last group which may have fewer than self.group_size
+        members if that is required to make sure all students in <course> are
+        members of a group.
+
+        The search starts from the grouping made by a GreedyGrouper. If the
+        node or time limit is reached, or the progress of this grouper asks
+        it to stop, the best grouping found so far is returned and
+        self.proved_optimal is False.
+
+        If this grouper has a checkpoint, the best grouping found so far is
+        saved whenever a better one is found, and a resumed search starts
+        again from the grouping saved instead of the greedy one.
+        """
+        self._begin()
+        # the results of the last run are not part of the key of this run
+        self.nodes = 0
+        self.proved_optimal = False
+        students = list(course.get_students())
+        key, state = self._resume(students, survey)
+        if state is None:
+            start = GreedyGrouper(self.group_size).make_grouping(course,
+                                                                 survey)
+        else:
+            start = _grouping_of(state['best'], _by_id(students))
+        if self._stopping(len(students), len(start)):
+            self._finish(key)
+            return self._done(self._constrain(start))
+
+        search = _BranchAndBound(students, survey, self.group_size,
+                                 self.node_limit, self.time_limit)
+        if self._progress is not None:
+            search.stop = self._progress.should_stop
+        if key is not None:
+            def save() -> None:
+                if self._save_due(key):
+                    self._checkpoint.save(key, {'best': [
+                        [students[i].id for i in group]
+                        for group in search.best()]})
+            search.improved = save
+        search.set_incumbent(start)
+        best = search.run()
+        if not search.complete and self._progress is not None and \
+                self._progress.should_stop():
+            # the search is over, so its best grouping is returned even if
+            # the progress has no fallback
+            self._progress.stopped = True
+        self.nodes = search.nodes
+        self.proved_optimal = search.complete
+
+        grouping = Grouping()
+        for group in best:
+            grouping.add_group(Group([students[i] for i in group]))
+        self._finish(key)
+        return self._done(self._constrain(grouping))
+
+    def _best_match(self, survey: Survey, all_students: List[Student],
+                    ones: List[Student]) -> List[Student]:
+        """
+        Return a list containing the combination of students that has the
+        highest score.
+        """
+        raise NotImplementedError
+
+    def _find_best_window(self, windows_: List[Student],
+                          survey: Survey) -> List[Student]:
+        """
+        Return a window (a list of student) in the <windows_> that, according to
+        survey, has a higher score than the window right after it.
+        """
+        raise NotImplementedError
+
+
+class _BranchAndBound:
+    """
+    The state of a branch and bound search for the grouping of some students
+    with the highest total group score.
+
+    Students are referred to by their index in <students>. Groups are
+    unordered and so are their members, so the search only builds groups
+    whose members are in increasing order of index, and each full group
+    starts with the unplaced student with the lowest index. The one group
+    with fewer members, if any, is chosen first.
+
+    The score of a group of two or more students is at most the largest
+    pair score of any two of its members for the questions whose criterion
+    averages pair similarities, plus the largest possible score of every
+    other question. Branches whose bound cannot beat the best grouping
+    found so far are pruned.
+
+    === Public Attributes ===
+    nodes: the number of partial groupings explored so far
+    complete: True iff the search finished without reaching a limit
+    stop: a function that returns True if the search should stop, checked
+          as often as the time limit, or None
+    improved: a function called whenever a better grouping is found, or
+              None
+
+    === Private Attributes ===
+    _students: the students to group
+    _survey: the survey used to score groups
+    _size: the size of a full group
+    _sizes: the size of every group, the smaller group first
+    _node_limit: the largest number of partial groupings to explore
+    _deadline: the time at which the search stops
+    _best_pair: _best_pair[i] is the largest pair score of student i with
+                any other student
+    _other: the largest possible score of the questions that are not
+            scored by averaging pair similarities
+    _cache: the score of every full group scored so far
+    _best: the groups of the best grouping found so far
+    _best_total: the total group score of _best
+    """
+
+    nodes: int
+    complete: bool
+    stop: Optional[Callable[[], bool]]
+    improved: Optional[Callable[[], None]]
+    _students: List[Student]
+    _survey: Survey
+    _size: int
+    _sizes: List[int]
+    _node_limit: int
+    _deadline: float
+    _best_pair: List[float]
+    _other: float
+    _cache: Dict[Tuple[int, ...], float]
+    _best: List[Tuple[int, ...]]
+    _best_total: float
+
+    def __init__(self, students: List[Student], survey: Survey,
+                 group_size: int, node_limit: int, time_limit: float) -> None:
+        """ Initialize a search for the best grouping of <students> """
+        self.nodes = 0
+        self.complete = False
+        self.stop = None
+        self.improved = None
+        self._students = students
+        self._survey = survey
+        self._size = group_size
+        self._node_limit = node_limit
+        self._deadline = time.perf_counter() + time_limit
+        self._cache = {}
+        self._best = []
+        self._best_total = -1.0
+
+        n = len(students)
+        self._sizes = [group_size] * (n // group_size)
+        if n % group_size != 0:
+            self._sizes.insert(0, n % group_size)
+
+        # split the questions into those scored by averaging pair scores and
+        # the others, which score at most 1.0 each
+        pairwise = []
+        self._other = 0.0
+        count = max(len(survey), 1)
+        for question, criterion, weight in survey.get_scoring():
+            if type(criterion) in (HomogeneousCriterion,
+                                   HeterogeneousCriterion):
+                pairwise.append((question, criterion, weight / count))
+            else:
+                self._other += weight / count
+
+        self._best_pair = [0.0] * n
+        for i in range(n):
+            for j in range(i + 1, n):
+                pair = _pair_score(pairwise, students[i], students[j])
+                self._best_pair[i] = max(self._best_pair[i], pair)
+                self._best_pair[j] = max(self._best_pair[j], pair)
+
+    def set_incumbent(self, grouping: Grouping) -> None:
+        """ Use <grouping> as the best grouping found so far """
+        index = {}
+        for i, student in enumerate(self._students):
+            index[student.id] = i
+        groups = []
+        total = 0.0
+        for group in grouping.groups_view():
+            members = tuple(sorted(index[m.id] for m in group.members_view()))
+            groups.append(members)
+            total += self._group_score(members)
+        # the smaller group is chosen first by the search
+        groups.sort(key=len)
+        self._best = groups
+        self._best_total = total
+
+    def run(self) -> List[Tuple[int, ...]]:
+        """
+        Search for the best grouping and return its groups, each as a tuple
+        of indices of students, with the smaller group last.
+        """
+        if len(self._sizes) > 1:
+            # without a smaller group, the first group starts with student 0
+            first = [] if self._sizes[0] < self._size else [0]
+            try:
+                self._extend([], 0.0, list(range(len(self._students))), first)
+                self.complete = True
+            except _SearchLimit:
+                self.complete = False
+        else:
+            self.complete = True
+            self._best = [tuple(range(len(self._students)))]
+        return self.best()
+
+    def best(self) -> List[Tuple[int, ...]]:
+        """
+        Return the groups of the best grouping found so far, each as a tuple
+        of indices of students, with the smaller group last.
+        """
+        groups = list(self._best)
+        if len(groups) > 0 and len(groups[0]) < self._size:
+            groups.append(groups.pop(0))
+        return groups
+
+    def _group_score(self, members: Tuple[int, ...]) -> float:
+        """ Return the score of the group of students with <members> """
+        if members not in self._cache:
+            self._cache[members] = self._survey.score_students(
+                [self._students[i] for i in members])
+        return self._cache[members]
+
+    def _bound(self, unplaced: List[int], groups_left: int) -> float:
+        """
+        Return an upper bound on the total score of <groups_left> groups
+        made from the students in <unplaced>.
+        """
+        if groups_left == 0:
+            return 0.0
+        # the groups are disjoint, so each one is bounded by the best pair
+        # score of a different student
+        best_pairs = sorted((self._best_pair[i] for i in unplaced),
+                            reverse=True)
+        return sum(best_pairs[:groups_left]) + groups_left * self._other
+
+    def _extend(self, groups: List[Tuple[int, ...]], total: float,
+                unplaced: List[int], current: List[int]) -> None:
+        """
+        Explore every grouping that contains <groups>, whose total score is
+        <total>, and the group being built, <current>, made from the students
+        in <unplaced> (which includes <current>).
+
+        Raise _SearchLimit if the node or time limit is reached.
+        """
+        self.nodes += 1
+        if self.nodes >= self._node_limit or (
+                self.nodes % 1024 == 0 and (
+                    time.perf_counter() > self._deadline or
+                    (self.stop is not None and self.stop()))):
+            raise _SearchLimit
+
+        size = self._sizes[len(groups)]
+        if size == self._size and len(current) < size and \
+                total + self._bound(unplaced, len(self._sizes) - len(groups)) \
+                <= self._best_total + 1e-12:
+            return
+
+        if len(current) == size:
+            members = tuple(current)
+            total += self._group_score(members)
+            rest = [i for i in unplaced if i not in current]
+            groups = groups + [members]
+            if len(rest) == 0:
+                if total > self._best_total + 1e-12:
+                    self._best = groups
+                    self._best_total = total
+                    if self.improved is not None:
+                        self.improved()
+                return
+            if total + self._bound(rest, len(self._sizes) - len(groups)) \
+                    <= self._best_total + 1e-12:
+                return
+            self._extend(groups, total, rest, [rest[0]])
+            return
+
+        if len(current) == 0:
+            # the smaller group may start with any student
+            candidates = unplaced
+        else:
+            candidates = [i for i in unplaced if i > current[-1]]
+        needed = size - len(current)
+        for position, i in enumerate(candidates):
+            if len(candidates) - position < needed:
+                break
+            self._extend(groups, total, unplaced, current + [i])
+
+
+class _SearchLimit(Exception):
+    """
+    Raised when a branch and bound search reaches its node or time limit.
+    """
+
+
+def _pair_score(pairwise: List[Tuple[Question, Criterion, float]],
+                student1: Student, student2: Student) -> float:
+    """
+    Return the weighted score of the pair <student1> and <student2> for the
+    questions, criteria and weights in <pairwise>.
+
+    If either answer is invalid, return the largest possible score instead.
+    """
+    score = 0.0
+    for question, criterion, weight in pairwise:
+        answers = [student1.get_answer(question), student2.get_answer(question)]
+        try:
+            score += criterion.score_answers(question, answers) * weight
+        except (InvalidAnswerError, AttributeError):
+            score += weight
+    return score
+
+
+class ClusterGrouper(Grouper):
+    """
+    A grouper used to create a grouping of students by clustering them
+    according to how well their answers to a survey score together. This
+    grouper uses a balanced k-medoids algorithm to create groups.
+
+    The distance between two students is 1.0 minus the score that the
+    survey's criteria and weights give to the pair, so students who would
+    score well together are close.
+
+    Clusters are built around a single student, which suits homogeneous
+    criteria better than heterogeneous ones, so the members of the clusters
+    are swapped afterwards to bring each cluster closer together. The
+    grouping still scores lower than a GreedyGrouper's: with 800 students,
+    about 6% lower on a homogeneous survey and 15% lower on a mostly
+    heterogeneous one (from 8% and 35% without the swaps), in a third of the
+    time or less. A larger shortlist narrows the gap at the cost of time.
+
+    === Public Attributes ===
+    group_size: the ideal number of students that should be in each group
+    max_iterations: the largest number of times the medoids are updated
+    shortlist: the number of nearest medoids considered for each student
+               when students are assigned to clusters
+    swap_passes: the largest number of passes over the students that swap
+                 them between clusters
+
+    === Representation Invariants ===
+    group_size > 1
+    max_iterations >= 0
+    shortlist > 0
+    swap_passes >= 0
+    """
+
+    group_size: int
+    max_iterations: int
+    shortlist: int
+    swap_passes: int
+
+    def __init__(self, group_size: int, max_iterations: int = 5,
+                 shortlist: int = 8, swap_passes: int = 4) -> None:
+        """
+        Initialize a grouper that creates groups of size <group_size>, with
+        at most <max_iterations> updates of the medoids and at most
+        <swap_passes> passes swapping students between clusters.
+
+        === Precondition ===
+        group_size > 1
+        """
+        Grouper.__init__(self, group_size)
+        self.max_iterations = max_iterations
+        self.shortlist = shortlist
+        self.swap_passes = swap_passes
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        """
+        Return a grouping for all students in <course>.
+
+        1. Choose one medoid (a student at the centre of a cluster) for every
+           group, spread evenly through the students sorted by their answers.
+        2. Assign students to medoids, closest pairs first, so that every
+           cluster has exactly self.group_size students, except the cluster
+           of the last medoid which gets the students left over.
+        3. Make the member of each cluster with the smallest total distance
+           to the other members its new medoid, and repeat step 2 until the
+           medoids do not change or self.max_iterations is reached.
+        4. For each student in turn, swap it with the member of one of the
+           clusters of its self.shortlist nearest medoids that most lowers
+           the total distance within the two clusters, if any does, for at
+           most self.swap_passes passes over the students.
+
+        If this grouper has a checkpoint, the clusters are saved after step 2
+        is repeated, and the grouping resumes after the last repeat saved. If
+        it has a progress, it is checked before step 3 and before each pass
+        of step 4; if the grouper is asked to stop, the clusters it has are
+        its groups.
+
+        All groups in this grouping should have exactly self.group_size members
+        except for the last group which may have fewer than self.group_size
+        members if that is required to make sure all students in <course> are
+        members of a group.
+        """
+        self._begin()
+        students = list(course.get_students())
+        grouping = Grouping()
+        if len(students) <= self.group_size:
+            if len(students) > 0:
+                grouping.add_group(Group(students))
+            return self._done(self._constrain(grouping))
+
+        distance = _Distances(students, survey)
+        n = len(students)
+        clusters = -(-n // self.group_size)
+        capacities = [self.group_size] * clusters
+        capacities[-1] = n - (clusters - 1) * self.group_size
+
+        key, state = self._resume(students, survey)
+        if state is None:
+            near: List[List[int]] = [[] for _ in students]
+            medoids = self._initial_medoids(distance, clusters, near)
+            members = self._assign(distance, medoids, capacities, near)
+            done = 0
+        else:
+            distance.restore(state['scores'])
+            near = state['near']
+            medoids = state['medoids']
+            members = state['members']
+            done = state['iterations']
+        for iteration in range(done, self.max_iterations):
+            # every student is in a cluster, so stopping keeps the clusters
+            if self._stopping(n, clusters):
+                break
+            new_medoids = []
+            for cluster in members:
+                new_medoids.append(min(
+                    cluster, key=lambda i, c=cluster: (distance.total(i, c),
+                                                       i)))
+            if new_medoids == medoids:
+                break
+            medoids = new_medoids
+            members = self._assign(distance, medoids, capacities, near)
+            if self._save_due(key):
+                self._checkpoint.save(key, {'iterations': iteration + 1,
+                                            'near': near,
+                                            'medoids': medoids,
+                                            'members': members,
+                                            'scores': distance.cached()})
+        self._swap_members(distance, members, near)
+
+        for cluster in members:
+            grouping.add_group(Group([students[i] for i in sorted(cluster)]))
+        self._finish(key)
+        return self._done(self._constrain(grouping))
+
+    def _initial_medoids(self, distance: _Distances, clusters: int,
+                         near: List[List[int]]) -> List[int]:
+        """
+        Return <clusters> students, by index, spread evenly through the
+        students sorted by their answers, and set near[i] to the clusters
+        whose medoids are closest to student i in that order.
+        """
+        order = distance.sorted_by_answers()
+        step = len(order) / clusters
+        medoids = []
+        for c in range(clusters):
+            medoids.append(order[int((c + 0.5) * step)])
+
+        width = self.shortlist
+        for rank, i in enumerate(order):
+            c = int(rank / step)
+            near[i] = list(range(max(0, c - width),
+                                 min(clusters, c + width + 1)))
+        return medoids
+
+    def _assign(self, distance: _Distances, medoids: List[int],
+                capacities: List[int], near: List[List[int]]
+                ) -> List[List[int]]:
+        """
+        Return the members, by index, of the cluster of each medoid in
+        <medoids>, where cluster c has exactly capacities[c] members.
+
+        Each student is first offered the self.shortlist clusters with the
+        nearest medoids, closest pairs first; students left over join the
+        nearest cluster that still has room. Only the clusters in near[i]
+        are considered for the shortlist of student i, unless near[i] is
+        empty; near[i] is then replaced by the shortlist of student i.
+        Medoids move little between updates, so after the first assignment
+        each student only looks at the clusters that were near it before.
+        """
+        offers = []
+        for i in range(distance.size):
+            candidates = near[i] if near[i] else range(len(medoids))
+            distances = []
+            for c in candidates:
+                distances.append((distance.between(i, medoids[c]), i, c))
+            shortlist = heapq.nsmallest(self.shortlist, distances)
+            near[i] = [c for _, _, c in shortlist]
+            offers.extend(shortlist)
+        offers.sort()
+
+        members: List[List[int]] = [[] for _ in medoids]
+        placed = [False] * distance.size
+        for _, i, c in offers:
+            if not placed[i] and len(members[c]) < capacities[c]:
+                members[c].append(i)
+                placed[i] = True
+
+        for i in range(distance.size):
+            if not placed[i]:
+                open_ = [c for c in range(len(medoids))
+                         if len(members[c]) < capacities[c]]
+                c = min(open_, key=lambda c: (distance.between(i, medoids[c]),
+                                              c))
+                members[c].append(i)
+        return members
+
+    def _swap_members(self, distance: _Distances, members: List[List[int]],
+                      near: List[List[int]]) -> None:
+        """
+        Swap students between the clusters <members> while this lowers the
+        total distance within the clusters: for each student i in turn, make
+        the best swap with a member of a cluster in near[i], for at most
+        self.swap_passes passes over the students. <members> is changed in
+        place.
+        """
+        cluster_of = {}
+        for c, cluster in enumerate(members):
+            for i in cluster:
+                cluster_of[i] = c
+        # own[i] is the total distance from student i to its cluster
+        own = [distance.total(i, members[cluster_of[i]])
+               for i in range(distance.size)]
+        for _ in range(self.swap_passes):
+            if self._stopping(distance.size, len(members)):
+                return
+            swapped = False
+            for i in range(distance.size):
+                a = cluster_of[i]
+                best_gain = 1e-12
+                best = None
+                for b in near[i]:
+                    if b == a:
+                        continue
+                    other = distance.total(i, members[b])
+                    for j in members[b]:
+                        # how much the distance within a and b goes down
+                        gain = own[i] - other + own[j] \
+                            - distance.total(j, members[a]) \
+                            + 2 * distance.between(i, j)
+                        if gain > best_gain:
+                            best_gain = gain
+                            best = j
+                if best is not None:
+                    b = cluster_of[best]
+                    members[a][members[a].index(i)] = best
+                    members[b][members[b].index(best)] = i
+                    cluster_of[i] = b
+                    cluster_of[best] = a
+                    for k in members[a] + members[b]:
+                        own[k] = distance.total(k, members[cluster_of[k]])
+                    swapped = True
+            if not swapped:
+                return
+
+    def _best_match(self, survey: Survey, all_students: List[Student],
+                    ones: List[Student]) -> List[Student]:
+        """
+        Return a list containing the combination of students that has the
+        highest score.
+        """
+        raise NotImplementedError
+
+    def _find_best_window(self, windows_: List[Student],
+                          survey: Survey) -> List[Student]:
+        """
+        Return a window (a list of student) in the <windows_> that, according to
+        survey, has a higher score than the window right after it.
+        """
+        raise NotImplementedError
+
+
+class PartitionGrouper(Grouper):
+    """
+    A grouper used to create a grouping of students by partitioning a graph
+    of the students. Each student is connected to a few students with
+    similar answers (or, for questions with a HeterogeneousCriterion,
+    different answers), and every connection is weighted by how much better
+    than average the survey scores the pair. The graph is then split in two
+    again and again, keeping strongly connected students in the same part,
+    until every part is the size of a group.
+
+    Building the graph and each refinement pass take time roughly linear in
+    the number of students, so this grouper can group very large courses.
+
+    === Public Attributes ===
+    group_size: the ideal number of students that should be in each group
+    degree: the number of neighbours each student is connected to for each
+            question
+    passes: the largest number of refinement passes for each split of a
+            part of at most dense_size groups
+    dense_size: parts of at most dense_size groups have an edge between
+            every pair of students before they are split
+    sparse_passes: the largest number of refinement passes for each split of
+            a larger part
+
+    === Representation Invariants ===
+    group_size > 1
+    degree > 0
+    passes >= 0
+    dense_size >= 0
+    sparse_passes >= 0
+    """
+
+    group_size: int
+    degree: int
+    passes: int
+    dense_size: int
+    sparse_passes: int
+
+    def __init__(self, group_size: int, degree: int = 3,
+                 passes: int = 4, dense_size: int = 8,
+                 sparse_passes: int = 2) -> None:
+        """
+        Initialize a grouper that creates groups of size <group_size>.
+
+        === Precondition ===
+        group_size > 1
+        """
+        Grouper.__init__(self, group_size)
+        self.degree = degree
+        self.passes = passes
+        self.dense_size = dense_size
+        self.sparse_passes = sparse_passes
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        """
+        Return a grouping for all students in <course>.
+
+        1. Build a graph with an edge between each student and the
+           self.degree students before and after it when the students are
+           sorted by their answer to each question; for questions with a
+           HeterogeneousCriterion, the neighbours are taken from far away in
+           that order instead. Each edge is weighted by the score of the
+           pair according to <survey>, minus the average score of a pair.
+        2. Split the students in two parts whose sizes are multiples of
+           self.group_size (except the part with the students left over),
+           starting from the students sorted by their answers.
+        3. Swap students between the parts, in the style of Kernighan-Lin,
+           while this increases the total weight of the edges inside the
+           parts, for at most self.sparse_passes passes. Parts of at most
+           self.dense_size groups first get an edge between every pair of
+           students and are refined for at most self.passes passes.
+        4. Repeat steps 2-3 on each part until it is the size of a group.
+
+        If this grouper has a checkpoint, the parts left to split and the
+        groups made so far are saved after a part is split, and the grouping
+        resumes from the last parts saved.
+
+        If this grouper has a progress, it is checked before each split and
+        each refinement pass; if the grouper is asked to stop, the students
+        of each part that is left are put into groups in order.
+
+        All groups in this grouping should have exactly self.group_size members
+        except for the last group which may have fewer than self.group_size
+        members if that is required to make sure all students in <course> are
+        members of a group.
+        """
+        self._begin()
+        students = list(course.get_students())
+        distance = _Distances(students, survey)
+        centre = _mean_affinity(distance)
+        graph = self._build_graph(students, distance, centre)
+
+        grouping = Grouping()
+        placed = 0
+        key, state = self._resume(students, survey)
+        if state is None:
+            # start from students sorted by their answers, so that the first
+            # split of every part already keeps similar students together
+            parts = [distance.sorted_by_answers()]
+        else:
+            # a part that was dense is connected again before it is split
+            distance.restore(state['scores'])
+            grouping = _grouping_of(state['groups'], _by_id(students))
+            placed = len(students) - sum(len(part) for part in state['parts'])
+            parts = state['parts']
+        while len(parts) > 0:
+            part = parts.pop(0)
+            if len(part) <= self.group_size:
+                if len(part) > 0:
+                    grouping.add_group(Group([students[i]
+                                              for i in sorted(part)]))
+                    placed += len(part)
+                continue
+            if self._stopping(placed, len(grouping)):
+                # every part but the last has a multiple of self.group_size
+                # students, so only the last group can be short
+                for rest in [part] + parts:
+                    self._fill(grouping, [students[i] for i in sorted(rest)])
+                break
+            groups = -(-len(part) // self.group_size)
+            if groups <= self.dense_size:
+                _connect_all(graph, part, distance, centre)
+                passes = self.passes
+            else:
+                passes = self.sparse_passes
+            left, right = _bisect(
+                graph, part, groups // 2 * self.group_size, passes,
+                lambda: self._stopping(placed, len(grouping)))
+            # parts are split in order, so the students left over end up in
+            # the last group
+            parts.insert(0, right)
+            parts.insert(0, left)
+            if self._save_due(key):
+                self._checkpoint.save(key, {'parts': parts,
+                                            'groups': _group_ids(grouping),
+                                            'scores': distance.cached()})
+        self._finish(key)
+        return self._done(self._constrain(grouping))
+
+    def _build_graph(self, students: List[Student], distance: _Distances,
+                     centre: float) -> List[Dict[int, float]]:
+        """
+        Return the graph of <students> as a list mapping each student, by
+        index, to a dictionary from its neighbours to the weights of the
+        edges between them. <distance> gives the distances between students
+        and <centre> is subtracted from the score of every pair.
+        """
+        encoding = distance.encoding
+        graph: List[Dict[int, float]] = [{} for _ in students]
+        n = len(students)
+
+        orders = []
+        for q, (_, criterion, _) in enumerate(encoding.scoring):
+            orders.append((sorted(range(n), key=lambda i, q=q: (
+                encoding.codes[i][q], i)), criterion))
+        # students with the same answers to every question
+        orders.append((distance.sorted_by_answers(), None))
+
+        for order, criterion in orders:
+            if isinstance(criterion, HeterogeneousCriterion):
+                steps = [max(1, n * t // (self.degree + 1))
+                         for t in range(1, self.degree + 1)]
+            else:
+                steps = list(range(1, self.degree + 1))
+            for rank, i in enumerate(order):
+                for step in steps:
+                    j = order[(rank + step) % n]
+                    if j != i and j not in graph[i]:
+                        weight = 1.0 - distance.between(i, j) - centre
+                        graph[i][j] = weight
+                        graph[j][i] = weight
+        return graph
+
+    def _best_match(self, survey: Survey, all_students: List[Student],
+                    ones: List[Student]) -> List[Student]:
+        """
+        Return a list containing the combination of students that has the
+        highest score.
+        """
+        raise NotImplementedError
+
+    def _find_best_window(self, windows_: List[Student],
+                          survey: Survey) -> List[Student]:
+        """
+        Return a window (a list of student) in the <windows_> that, according to
+        survey, has a higher score than the window right after it.
+        """
+        raise NotImplementedError
+
+
+def _bisect(graph: List[Dict[int, float]], part: List[int], left_size: int,
+            passes: int, stop: Optional[Callable[[], bool]] = None) \
+        -> Tuple[List[int], List[int]]:
+    """
+    Return two lists splitting the students in <part>, the first with
+    <left_size> students, such that the total weight of the edges of <graph>
+    inside each list is large. The split starts with the first <left_size>
+    students of <part> on the left and is refined by swapping students for
+    at most <passes> passes, stopping early if <stop> returns True.
+
+    === Precondition ===
+    0 < left_size < len(part)
+    """
+    members = set(part)
+    left = set(part[:left_size])
+
+    for _ in range(passes):
+        if stop is not None and stop():
+            break
+        if not _swap_pass(graph, members, left):
+            break
+
+    left_list = [i for i in part if i in left]
+    right_list = [i for i in part if i not in left]
+    return left_list, right_list
+
+
+def _swap_pass(graph: List[Dict[int, float]], members: Set[int],
+               left: Set[int]) -> bool:
+    """
+    Make one Kernighan-Lin pass over the split of <members> into <left> and
+    the rest, swapping pairs of students between the sides, and keep the
+    prefix of swaps with the largest total gain. <left> is changed in place.
+
+    Return True iff the pass made the split better.
+    """
+    # gain[i] is how much the weight inside the sides grows if i moves
+    gain = {}
+    for i in members:
+        total = 0.0
+        for j, weight in graph[i].items():
+            if j in members:
+                total += weight if (j in left) != (i in left) else -weight
+        gain[i] = total
+
+    heaps: Dict[bool, List[Tuple[float, int]]] = {True: [], False: []}
+    for i in members:
+        heaps[i in left].append((-gain[i], i))
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    locked = set()
+    swaps = []
+    total = 0.0
+    best_total = 0.0
+    best_swaps = 0
+    while True:
+        a = _pop_unlocked(heaps[True], gain, locked)
+        b = _pop_unlocked(heaps[False], gain, locked)
+        if a is None or b is None:
+            break
+        total += gain[a] + gain[b] - 2 * graph[a].get(b, 0.0)
+        locked.add(a)
+        locked.add(b)
+        left.remove(a)
+        left.add(b)
+        swaps.append((a, b))
+        if total > best_total + 1e-12:
+            best_total = total
+            best_swaps = len(swaps)
+
+        for moved in (a, b):
+            for j, weight in graph[moved].items():
+                if j in members and j not in locked:
+                    # <moved> changed sides
+                    if (j in left) == (moved in left):
+                        gain[j] -= 2 * weight
+                    else:
+                        gain[j] += 2 * weight
+                    heapq.heappush(heaps[j in left], (-gain[j], j))
+
+    # undo the swaps after the best prefix
+    for a, b in swaps[best_swaps:]:
+        left.remove(b)
+        left.add(a)
+    return best_swaps > 0
+
+
+def _connect_all(graph: List[Dict[int, float]], part: List[int],
+                 distance: _Distances, centre: float) -> None:
+    """
+    Add an edge to <graph> between every pair of students in <part> that
+    are not connected yet, weighted by the score of the pair minus <centre>.
+    """
+    for position, i in enumerate(part):
+        for j in part[position + 1:]:
+            if j not in graph[i]:
+                weight = 1.0 - distance.between(i, j) - centre
+                graph[i][j] = weight
+                graph[j][i] = weight
+
+
+def _mean_affinity(distance: _Distances) -> float:
+    """
+    Return an estimate of the average score of a pair of students, from one
+    pair for each student spread evenly across the course.
+    """
+    if distance.size < 2:
+        return 0.0
+    total = 0.0
+    for i in range(distance.size):
+        j = (i + 1 + i * 7919) % distance.size
+        if j == i:
+            j = (i + 1) % distance.size
+        total += 1.0 - distance.between(i, j)
+    return total / distance.size
+
+
+def _pop_unlocked(heap: List[Tuple[float, int]], gain: Dict[int, float],
+                  locked: Set[int]) -> Optional[int]:
+    """
+    Remove and return the unlocked student with the largest current gain in
+    <heap>, skipping stale entries, or None if there is no such student.
+    """
+    while len(heap) > 0:
+        negative_gain, i = heapq.heappop(heap)
+        if i not in locked and -negative_gain == gain[i]:
+            return i
+    return None
+
+
+class StratifiedGrouper(Grouper):
+    """
+    A grouper used to create a grouping of students whose answers differ as
+    much as possible. This grouper sorts students by their answers and deals
+    them out to the groups in turn, like cards, so students with the same or
+    close answers end up in different groups.
+
+    This suits surveys that mostly use a HeterogeneousCriterion, and takes
+    O(n log n) time for n students.
+
+    === Public Attributes ===
+    group_size: the ideal number of students that should be in each group
+
+    === Representation Invariants ===
+    group_size > 1
+    """
+
+    group_size: int
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        """
+        Return a grouping for all students in <course>.
+
+        1. Sort the students by their answers to the questions of <survey>
+           with a HeterogeneousCriterion, most heavily weighted question
+           first. If no question has a HeterogeneousCriterion, use all
+           questions. Students with no valid answer to a question come after
+           those with one; ties keep the order of <course>.get_students().
+           The students are cut into self.group_size strata of equal size
+           by their answer to the first question, each stratum is sorted
+           and cut the same way by the next question, and so on. The order
+           of the b-th stratum of each level is rotated by b /
+           self.group_size of its length, so that students dealt to the
+           same group come from different strata of every level.
+        2. Deal the sorted students to the groups in turn, one student per
+           group per round, skipping groups that are full.
+
+        If this grouper has a progress, it is checked before each round; if
+        the grouper is asked to stop, the places left in each group are
+        filled in turn with the students left, in order.
+
+        All groups in this grouping should have exactly self.group_size members
+        except for the last group which may have fewer than self.group_size
+        members if that is required to make sure all students in <course> are
+        members of a group.
+        """
+        self._begin()
+        students = list(course.get_students())
+        grouping = Grouping()
+        if len(students) == 0:
+            return self._done(grouping)
+
+        questions = []
+        for question, criterion, weight in survey.get_scoring():
+            if isinstance(criterion, HeterogeneousCriterion):
+                questions.append((-weight, len(questions), question))
+        if len(questions) == 0:
+            for question, _, weight in survey.get_scoring():
+                questions.append((-weight, len(questions), question))
+        questions.sort(key=lambda q: (q[0], q[1]))
+
+        keys = []
+        for student in students:
+            key = []
+            for _, _, question in questions:
+                key.append(_sort_value(student.get_answer(question),
+                                       question))
+            keys.append(key)
+        ordered = [students[i] for i in
+                   _stratify(list(range(len(students))), keys, 0,
+                             self.group_size)]
+
+        sizes = [self.group_size] * (len(students) // self.group_size)
+        if len(students) % self.group_size != 0:
+            sizes.append(len(students) % self.group_size)
+
+        members: List[List[Student]] = [[] for _ in sizes]
+        i = 0
+        while i < len(ordered):
+            if self._stopping(i, len(sizes)):
+                for g, size in enumerate(sizes):
+                    while len(members[g]) < size:
+                        members[g].append(ordered[i])
+                        i += 1
+                break
+            for g, size in enumerate(sizes):
+                if len(members[g]) < size and i < len(ordered):
+                    members[g].append(ordered[i])
+                    i += 1
+
+        for group_members in members:
+            grouping.add_group(Group(group_members))
+        return self._done(self._constrain(grouping))
+
+    def _best_match(self, survey: Survey, all_students: List[Student],
+                    ones: List[Student]) -> List[Student]:
+        """
+        Return a list containing the combination of students that has the
+        highest score.
+        """
+        raise NotImplementedError
+
+    def _find_best_window(self, windows_: List[Student],
+                          survey: Survey) -> List[Student]:
+        """
+        Return a window (a list of student) in the <windows_> that, according to
+        survey, has a higher score than the window right after it.
+        """
+        raise NotImplementedError
+
+
+class HierarchicalGrouper(Grouper):
+    """
+    A grouper used to group very large courses. This grouper splits the
+    students into blocks of similar students and groups each block with
+    another grouper, so a grouper that takes O(n ** 2) time takes
+    O(n * block_size) time instead. Blocks can be grouped in parallel
+    processes.
+
+    Students in different blocks are never in the same group, so the
+    grouping may score lower than one made by the inner grouper for the
+    whole course; compare reports how much lower.
+
+    === Public Attributes ===
+    group_size: the ideal number of students that should be in each group
+    inner: the grouper used for each block
+    block_size: the largest number of students in a block
+    workers: the number of processes used to group the blocks
+
+    === Private Attributes ===
+    _coordinator: the coordinator whose workers group the blocks, or None if
+                  they are grouped on this machine
+
+    === Representation Invariants ===
+    group_size > 1
+    inner.group_size == group_size
+    block_size >= group_size
+    workers > 0
+    """
+
+    group_size: int
+    inner: Grouper
+    block_size: int
+    workers: int
+    _coordinator: Optional[Coordinator]
+
+    def __init__(self, group_size: int, inner: Optional[Grouper] = None,
+                 block_size: int = 240, workers: int = 1) -> None:
+        """
+        Initialize a grouper that creates groups of size <group_size> by
+        grouping blocks of at most <block_size> students with <inner>, in
+        <workers> processes. If <inner> is None, use a GreedyGrouper.
+
+        === Precondition ===
+        group_size > 1
+        inner is None or inner.group_size == group_size
+        block_size >= group_size
+        workers > 0
+        """
+        Grouper.__init__(self, group_size)
+        if inner is None:
+            inner = GreedyGrouper(group_size)
+        self.inner = inner
+        self.block_size = block_size
+        self.workers = workers
+        self._coordinator = None
+
+    def set_coordinator(self, coordinator: Optional[Coordinator]) -> None:
+        """
+        Group the blocks on the workers of <coordinator> instead of in
+        self.workers processes, or on this machine again if <coordinator> is
+        None.
+        """
+        self._coordinator = coordinator
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        """
+        Return a grouping for all students in <course>.
+
+        1. Sort the students by their answers to the questions of <survey>
+           that do not have a HeterogeneousCriterion, most heavily weighted
+           question first, with ties in order of id.
+        2. Split the sorted students into blocks of consecutive students. The
+           size of every block is the largest multiple of self.group_size
+           that is at most self.block_size, except for the last block.
+        3. Group the students of each block with self.inner, on the workers
+           of the coordinator if there is one.
+        4. Return all the groups of all the blocks, in order of block.
+
+        If this grouper has a checkpoint and groups the blocks in this
+        process, the groups of the blocks done so far are saved after a block
+        is grouped, and the grouping resumes after the last block saved. Its
+        progress is then checked before a block is grouped; if it is asked to
+        stop, the students of each block that is left are put into groups in
+        order.
+
+        All groups in this grouping should have exactly self.group_size members
+        except for the last group which may have fewer than self.group_size
+        members if that is required to make sure all students in <course> are
+        members of a group.
+        """
+        self._begin()
+        students = list(course.get_students())
+        blocks = self._blocks(students, survey)
+        tasks = [(self.inner, block, survey) for block in blocks]
+
+        if self._coordinator is not None:
+            results = self._coordinator.group_blocks(self.inner, blocks,
+                                                     survey)
+        elif self.workers == 1 or len(blocks) == 1:
+            key, state = self._resume(students, survey)
+            results = [] if state is None else state['blocks']
+            placed = sum(len(block) for block in blocks[:len(results)])
+            groups = sum(len(result) for result in results)
+            for block, task in zip(blocks[len(results):],
+                                   tasks[len(results):]):
+                if self._stopping(placed, groups):
+                    result = [[member.id for member in members]
+                              for members in slice_list(block,
+                                                        self.group_size)]
+                else:
+                    result = _group_block(task)
+                results.append(result)
+                placed += len(block)
+                groups += len(result)
+                if self._save_due(key):
+                    self._checkpoint.save(key, {'blocks': results})
+            self._finish(key)
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(_group_block, tasks))
+
+        # the processes return ids, since their students are copies
+        by_id = {}
+        for student in students:
+            by_id[student.id] = student
+        grouping = Grouping()
+        for groups in results:
+            for ids in groups:
+                grouping.add_group(Group([by_id[id_] for id_ in ids]))
+        return self._done(self._constrain(grouping))
+
+    def compare(self, course: Course, survey: Survey) -> Dict[str, float]:
+        """
+        Group <course> with this grouper and with self.inner alone, and
+        return the 'score' and 'seconds' of this grouper, the 'flat_score'
+        and 'flat_seconds' of self.inner, and the 'loss' in score, which is
+        negative if this grouper did better.
+
+        This takes as long as grouping the whole course with self.inner, so
+        it is meant for courses of a few thousand students.
+        """
+        start = time.perf_counter()
+        grouping = self.make_grouping(course, survey)
+        seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        flat = self.inner.make_grouping(course, survey)
+        flat_seconds = time.perf_counter() - start
+
+        score = survey.score_grouping(grouping)
+        flat_score = survey.score_grouping(flat)
+        return {'score': score, 'seconds': seconds,
+                'flat_score': flat_score, 'flat_seconds': flat_seconds,
+                'loss': flat_score - score}
+
+    def _blocks(self, students: List[Student],
+                survey: Survey) -> List[List[Student]]:
+        """
+        Return <students> split into blocks as in steps 1 and 2 of
+        make_grouping.
+        """
+        questions = []
+        for question, criterion, weight in survey.get_scoring():
+            if not isinstance(criterion, HeterogeneousCriterion):
+                questions.append((-weight, len(questions), question))
+        questions.sort(key=lambda q: (q[0], q[1]))
+
+        keys = []
+        for student in students:
+            key = [_sort_value(student.get_answer(question), question)
+                   for _, _, question in questions]
+            keys.append(key)
+        order = sorted(range(len(students)), key=lambda i: (keys[i], i))
+
+        size = max(self.block_size // self.group_size, 1) * self.group_size
+        blocks = []
+        for i in range(0, len(order), size):
+            blocks.append([students[j] for j in order[i:i + size]])
+        return blocks
+
+    def _best_match(self, survey: Survey, all_students: List[Student],
+                    ones: List[Student]) -> List[Student]:
+        """
+        Return a list containing the combination of students that has the
+        highest score.
+        """
+        raise NotImplementedError
+
+    def _find_best_window(self, windows_: List[Student],
+                          survey: Survey) -> List[Student]:
+        """
+        Return a window (a list of student) in the <windows_> that, according to
+        survey, has a higher score than the window right after it.
+        """
+        raise NotImplementedError
+
+
+def _group_block(task: Tuple[Grouper, List[Student], Survey]) \
+        -> List[List[int]]:
+    """
+    Group the students of a block with a grouper, where <task> is a tuple
+    (grouper, students, survey), and return the ids of the members of each
+    group.
+    """
+    grouper, students, survey = task
+    block = Course('block')
+    block.enroll_students(students)
+    grouping = grouper.make_grouping(block, survey)
+    return [[member.id for member in group.members_view()]
+            for group in grouping.groups_view()]
+
+
+def _stratify(indices: List[int], keys: List[List[Tuple]], level: int,
+              strata: int) -> List[int]:
+    """
+    Return <indices> sorted by keys[i][level] and cut into <strata> blocks
+    of equal size (or fewer, one student each, if there are fewer students),
+    where each block is itself stratified by the next levels of its keys,
+    and the order of the b-th block is rotated by b/<strata> of its length.
+
+    Dealing the result to groups in turn gives each group one student from
+    every block. The rotation makes the students at the same position in
+    different blocks fall in different blocks of the next level too, so
+    every group gets a spread of answers to every question, not only the
+    first one.
+
+    >>> _stratify([0, 1, 2, 3], [[(0, 'a'), (0, 1)], [(0, 'a'), (0, 2)],
+    ...                          [(0, 'b'), (0, 1)], [(0, 'b'), (0, 2)]], 0, 2)
+    [0, 1, 3, 2]
+    """
+    if len(indices) <= 1 or level == len(keys[indices[0]]):
+        return indices
+    order = sorted(indices, key=lambda i: keys[i][level])
+    blocks = min(strata, len(order))
+
+    ordered = []
+    for b in range(blocks):
+        block = _stratify(order[b * len(order) // blocks:
+                                (b + 1) * len(order) // blocks],
+                          keys, level + 1, strata)
+        shift = b * len(block) // blocks
+        ordered.extend(block[shift:] + block[:shift])
+    return ordered
+
+
+def _sort_value(answer: Optional[Answer], question: Question) -> Tuple:
+    """
+    Return a value used to sort students by their <answer> to <question>.
+    Valid answers sort by their content (a checkbox answer by its options in
+    order) before missing or invalid answers.
+    """
+    if answer is None or not answer.is_valid(question):
+        return (1,)
+    if isinstance(answer.content, list):
+        return 0, tuple(sorted(answer.content))
+    return 0, answer.content
+
+
+class _Distances:
+    """
+    The distances between some students according to a survey.
+
+    Students with the same answers to every question share a signature, and
+    distances are remembered for each pair of signatures, so they are only
+    computed once for each pair of distinct sets of answers.
+
+    === Public Attributes ===
+    size: the number of students
+    encoding: the encoded answers of the students
+
+    === Private Attributes ===
+    _signatures: _signatures[i] is the index of the signature of student i
+    _codes: _codes[s] is the list of answer codes of signature s
+    _cache: maps a pair of signatures (s1, s2) with s1 <= s2 to the distance
+            between them
+    """
+
+    size: int
+    encoding: AnswerEncoding
+    _signatures: List[int]
+    _codes: List[List[int]]
+    _cache: Dict[Tuple[int, int], float]
+
+    def __init__(self, students: List[Student], survey: Survey) -> None:
+        """ Initialize the distances between <students> """
+        self.size = len(students)
+        self.encoding = AnswerEncoding(students, survey)
+        self._signatures = []
+        self._codes = []
+        self._cache = {}
+
+        index: Dict[Tuple[int, ...], int] = {}
+        for i in range(self.size):
+            signature = self.encoding.signature(i)
+            if signature not in index:
+                index[signature] = len(self._codes)
+                self._codes.append(self.encoding.codes[i])
+            self._signatures.append(index[signature])
+
+    def between(self, i: int, j: int) -> float:
+        """ Return the distance between students <i> and <j> """
+        s1 = self._signatures[i]
+        s2 = self._signatures[j]
+        if s1 > s2:
+            s1, s2 = s2, s1
+        if (s1, s2) not in self._cache:
+            self._cache[(s1, s2)] = 1.0 - self.encoding.affinity(
+                self._codes[s1], self._codes[s2])
+        return self._cache[(s1, s2)]
+
+    def cached(self) -> Any:
+        """
+        Return the distances and pair scores computed so far, to be given to
+        restore on the distances between the same students.
+        """
+        return self._cache, self.encoding.pair_scores()
+
+    def restore(self, cached: Any) -> None:
+        """ Remember the distances and pair scores in <cached> """
+        self._cache.update(cached[0])
+        self.encoding.add_pair_scores(cached[1])
+
+    def sorted_by_answers(self) -> List[int]:
+        """
+        Return the indices of all students sorted by their answer codes, so
+        that students with the same answers are next to each other.
+        """
+        return sorted(range(self.size),
+                      key=lambda i: (self._codes[self._signatures[i]], i))
+
+    def total(self, i: int, others: List[int]) -> float:
+        """ Return the sum of the distances from student <i> to <others> """
+        total = 0.0
+        for j in others:
+            total += self.between(i, j)
+        return total
+
+
+def _open_units(candidates: List[Student], unit_of: Dict[int, List[Student]],
+                blocks: Set[int], room: int,
+                constraints: Constraints) -> List[List[Student]]:
+    """
+    Return the units (see Constraints.units) of the students in <candidates>
+    that can join a group whose members are in the blocks <blocks> and that
+    has room for <room> more students, in order of their first student in
+    <candidates>.
+    """
+    units = []
+    seen = set()
+    for student in candidates:
+        block = constraints.block(student.id)
+        if block in seen or block in blocks:
+            continue
+        seen.add(block)
+        unit = unit_of[student.id]
+        if len(unit) <= room and constraints.fits(student.id, blocks):
+            units.append(unit)
+    return units
+
+
+def _by_id(students: List[Student]) -> Dict[int, Student]:
+    """ Return a dictionary mapping the id of each student to the student """
+    by_id = {}
+    for student in students:
+        by_id[student.id] = student
+    return by_id
+
+
+def _group_ids(grouping: Grouping) -> List[List[int]]:
+    """ Return the ids of the members of each group in <grouping> """
+    return [[member.id for member in group.members_view()]
+            for group in grouping.groups_view()]
+
+
+def _grouping_of(ids: List[List[int]], by_id: Dict[int, Student]) -> Grouping:
+    """
+    Return a grouping with a group for each list of student ids in <ids>,
+    where <by_id> maps every id to its student.
+    """
+    grouping = Grouping()
+    for members in ids:
+        grouping.add_group(Group([by_id[id_] for id_ in members]))
+    return grouping
+
+
+def _ungrouped(students: List[Student], grouping: Grouping,
+               index: Optional[MinHashIndex]) -> List[Student]:
+    """
+    Return the students in <students> that are not in a group of <grouping>,
+    in order, and remove the others from <index> if it is not None.
+    """
+    grouped = set()
+    for members in _group_ids(grouping):
+        grouped.update(members)
+    left = []
+    for student in students:
+        if student.id not in grouped:
+            left.append(student)
+        elif index is not None:
+            index.remove(student)
+    return left
+
+
+class _ScoreBounds:
+    """
+    Upper bounds on the score that a survey gives to a group of students
+    with one more member, computed from the encoded answers of the students.
+
+    For a question whose criterion is a HomogeneousCriterion or a
+    HeterogeneousCriterion, the score of two or more answers is the average
+    of the scores of each pair of them, so the score of a group plus one
+    student follows from the pair scores of the group and of that student
+    with each member. Every other question scores at most its weight. If
+    any answer is invalid the real score is 0.0, which is below the bound.
+
+    === Private Attributes ===
+    _encoding: the encoded answers of the students
+    _index: maps the id of each student to its index in _encoding
+    _pairwise: a tuple (q, weight) for each question q of _encoding scored by
+               averaging pair scores, where weight is its share of the score
+    _other: the largest possible score of all the other questions
+    """
+
+    _encoding: AnswerEncoding
+    _index: Dict[int, int]
+    _pairwise: List[Tuple[int, float]]
+    _other: float
+
+    def __init__(self, students: List[Student], survey: Survey) -> None:
+        """ Initialize the bounds for groups of <students> """
+        self._encoding = AnswerEncoding(students, survey)
+        self._index = {}
+        for i, student in enumerate(students):
+            self._index[student.id] = i
+        self._pairwise = []
+        self._other = 0.0
+        count = max(len(survey), 1)
+        for q, (_, criterion, weight) in enumerate(self._encoding.scoring):
+            if type(criterion) in (HomogeneousCriterion,
+                                   HeterogeneousCriterion):
+                self._pairwise.append((q, weight / count))
+            else:
+                self._other += weight / count
+
+    def cached(self) -> Any:
+        """
+        Return the pair scores computed so far, to be given to restore on the
+        bounds for the same students.
+        """
+        return self._encoding.pair_scores()
+
+    def restore(self, cached: Any) -> None:
+        """ Remember the pair scores in <cached> """
+        self._encoding.add_pair_scores(cached)
+
+    def can_prune(self) -> bool:
+        """
+        Return True iff some question is scored from pair scores, so that
+        the bounds can be below the highest possible score.
+        """
+        return len(self._pairwise) > 0
+
+    def group_sums(self, ones: List[Student]) -> List[float]:
+        """
+        Return the sum of the pair scores of the members of <ones> for each
+        question in self._pairwise.
+        """
+        codes = self._encoding.codes
+        members = [self._index[student.id] for student in ones]
+        sums = []
+        for q, _ in self._pairwise:
+            total = 0.0
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    total += self._encoding.pair_score(
+                        q, codes[members[a]][q], codes[members[b]][q])
+            sums.append(total)
+        return sums
+
+    def upper(self, sums: List[float], ones: List[Student],
+              candidate: Student) -> float:
+        """
+        Return an upper bound on the score of <ones> plus <candidate>, where
+        <sums> is the result of self.group_sums(ones).
+
+        === Precondition ===
+        len(ones) > 0
+        """
+        codes = self._encoding.codes
+        new = codes[self._index[candidate.id]]
+        pairs = (len(ones) + 1) * len(ones) / 2
+        bound = self._other
+        for (q, weight), total in zip(self._pairwise, sums):
+            for student in ones:
+                total += self._encoding.pair_score(
+                    q, codes[self._index[student.id]][q], new[q])
+            bound += weight * total / pairs
+        return bound
+
+
+class _LazyCandidates:
+    """
+    The candidates to join a group that is being formed, in a heap ordered by
+    how much each of them raised the score of the group when they were last
+    scored, highest first, with ties in the order the candidates were given.
+
+    The gain of adding a student to a group of m members whose pair scores
+    average to the group's score is (the student's average pair score with
+    the members - the group's score) * 2 / (m + 1), so gains computed for
+    smaller groups are comparable with, and larger than, the gains of the
+    same students for the group as it is now.
+
+    === Private Attributes ===
+    _survey: the survey used to score the group
+    _score: the score of the group as it was at the last call of pop_best,
+            with the candidate it returned
+    _heap: an entry (-gain, position, members, score, candidate) for every
+           candidate, where score is the score of the group with <members>
+           members plus the candidate, or an upper bound on the score of the
+           first member plus the candidate if <members> is 0, gain is score
+           minus the score of that group without the candidate, and
+           position is the place of the candidate in the order the
+           candidates were given
+    """
+
+    _survey: Survey
+    _score: float
+    _heap: List[Tuple[float, int, int, float, Student]]
+
+    def __init__(self, survey: Survey, candidates: List[Student],
+                 ones: List[Student], bounds: _ScoreBounds) -> None:
+        """
+        Initialize the heap of the students in <candidates> for the group
+        <ones>, with the upper bounds in <bounds> on their scores.
+
+        === Precondition ===
+        len(ones) == 1
+        """
+        self._survey = survey
+        self._score = survey.score_students(ones)
+        self._heap = []
+        sums = bounds.group_sums(ones)
+        for position, candidate in enumerate(candidates):
+            bound = bounds.upper(sums, ones, candidate)
+            self._heap.append((self._score - bound, position, 0, bound,
+                               candidate))
+        heapq.heapify(self._heap)
+
+    def pop_best(self, ones: List[Student]) -> Student:
+        """
+        Remove and return the candidate with the highest score with the group
+        <ones> among the candidates with the highest last gains: re-score the
+        candidate with the highest last gain until it was last scored with
+        <ones>.
+
+        === Precondition ===
+        There is at least one candidate left, and <ones> is the group of the
+        last call of this method plus the candidate it returned, or the group
+        this heap was made for if this is the first call.
+        """
+        while True:
+            _, position, members, score, candidate = self._heap[0]
+            if members == len(ones):
+                heapq.heappop(self._heap)
+                self._score = score
+                return candidate
+            score = self._survey.score_students(ones + [candidate])
+            heapq.heapreplace(self._heap,
+                              (self._score - score, position, len(ones),
+                               score, candidate))
+
+
 class Group:
     """
     A group of one or more students
@@ -506,10 +2640,15 @@ class Group:
         """ Return a list of members in this group. This list should be a
         shallow copy of the self._members attribute.
         """
-        members = []
-        for member in self._members:
-            members.append(member)
-        return members
+        return list(self._members)
+
+    def members_view(self) -> Sequence[Student]:
+        """ Return the members of this group without copying them.
+
+        The result must not be changed; use get_members for a list that
+        can be.
+        """
+        return self._members
 
 
 class Grouping:
@@ -518,6 +2657,7 @@ class Grouping:
 
     === Private Attributes ===
     _groups: a list of Groups
+    _ids: the ids of all students in the groups in _groups
 
     === Representation Invariants ===
     No group in _groups contains zero members
@@ -525,10 +2665,12 @@ class Grouping:
     """
 
     _groups: List[Group]
+    _ids: Set[int]
 
     def __init__(self) -> None:
         """ Initialize a Grouping that contains zero groups """
         self._groups = []
+        self._ids = set()
 
     def __len__(self) -> int:
         """ Return the number of groups in this grouping """
@@ -544,7 +2686,7 @@ class Grouping:
         """
         list_of_names = ''
         for group in self._groups:
-            for member in group.get_members():
+            for member in group.members_view():
                 list_of_names = list_of_names + str(member) + ' '
             list_of_names += '\n'
         return list_of_names
@@ -561,17 +2703,14 @@ class Grouping:
             return False
 
         # if there is a duplicate, do not add
-        ids = []
-        for fixed_group in self._groups:
-            for member in fixed_group.get_members():
-                ids.append(member.id)
-
-        for new_member in group.get_members():
-            if new_member.id in ids:
+        ids = set()
+        for new_member in group.members_view():
+            if new_member.id in self._ids or new_member.id in ids:
                 return False
-            ids.append(new_member.id)
+            ids.add(new_member.id)
 
         self._groups.append(group)
+        self._ids.update(ids)
         return True
 
     def get_groups(self) -> List[Group]:
@@ -579,16 +2718,31 @@ class Grouping:
         This list should be a shallow copy of the self._groups
         attribute.
         """
-        groups = []
-        for group in self._groups:
-            groups.append(group)
-        return groups
+        return list(self._groups)
+
+    def groups_view(self) -> Sequence[Group]:
+        """ Return the groups in this grouping without copying them.
+
+        The result must not be changed; use get_groups for a list that
+        can be.
+        """
+        return self._groups
 
 
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'concurrent.futures',
+                                                  'heapq',
                                                   'random',
+                                                  'time',
+                                                  'criterion',
+                                                  'encoding',
+                                                  'minhash',
+                                                  'constraints',
+                                                  'checkpoint',
+                                                  'progress',
+                                                  'distributed',
                                                   'survey',
                                                   'course']})
@@ -0,0 +1,277 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains functions that build surveys, courses and groupers from
+plain data (as read from JSON files) and turn groupings back into plain data.
+
+A survey file contains a list of questions under the key "questions":
+
+    {"questions": [{"id": 1, "type": "yes_no", "text": "Morning person?",
+                    "weight": 2, "criterion": "heterogeneous"},
+                   {"id": 2, "type": "numeric", "text": "Hours?",
+                    "min": 0, "max": 10},
+                   {"id": 3, "type": "checkbox", "text": "Languages?",
+                    "options": ["C", "Java", "Python"]}]}
+
+"weight" and "criterion" are optional. A course file contains the name of the
+course and its students, with each student's answers keyed by question id:
+
+    {"name": "CSC148 L0101",
+     "students": [{"id": 1, "name": "Amy", "answers": {"1": true, "2": 4}}]}
+
+Groupers need every student to answer every question; use check_answers to
+reject a course where some answers are missing before grouping it.
+"""
+from __future__ import annotations
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from course import Course, Student
+from criterion import Criterion, HomogeneousCriterion, \
+    HeterogeneousCriterion, LonelyMemberCriterion
+from grouper import Grouper, AlphaGrouper, RandomGrouper, GreedyGrouper, \
+    WindowGrouper, OptimalGrouper, ClusterGrouper, PartitionGrouper, \
+    StratifiedGrouper, HierarchicalGrouper, Grouping
+from survey import Question, MultipleChoiceQuestion, NumericQuestion, \
+    YesNoQuestion, CheckboxQuestion, Answer, AnswerPool, Survey
+
+# the names used for criteria and groupers in files and on the command line
+CRITERIA = {'homogeneous': HomogeneousCriterion,
+            'heterogeneous': HeterogeneousCriterion,
+            'lonely_member': LonelyMemberCriterion}
+GROUPERS = {'alpha': AlphaGrouper,
+            'random': RandomGrouper,
+            'greedy': GreedyGrouper,
+            'window': WindowGrouper,
+            'optimal': OptimalGrouper,
+            'cluster': ClusterGrouper,
+            'partition': PartitionGrouper,
+            'stratified': StratifiedGrouper,
+            'hierarchical': HierarchicalGrouper}
+
+
+class MissingAnswersError(ValueError):
+    """
+    Error raised when students of a course have no answer to some questions
+    of a survey.
+
+    === Public Attributes ===
+    missing: a tuple (student id, question id, reason) for every answer that
+             is missing or invalid, as returned by Course.missing_answers
+    """
+
+    missing: List[Tuple[int, int, str]]
+
+    def __init__(self, missing: List[Tuple[int, int, str]]) -> None:
+        """ Initialize an error for the answers in <missing> """
+        ValueError.__init__(self, missing)
+        self.missing = missing
+
+    def __str__(self) -> str:
+        """
+        Return a description of the first few missing answers.
+
+        >>> str(MissingAnswersError([(1, 7, 'missing'), (2, 7, 'invalid')]))
+        '1 missing answers: student 1 question 7'
+        """
+        absent = [(student, question)
+                  for student, question, reason in self.missing
+                  if reason == 'missing']
+        shown = ', '.join(f'student {student} question {question}'
+                          for student, question in absent[:5])
+        if len(absent) > 5:
+            shown += f' and {len(absent) - 5} more'
+        return f'{len(absent)} missing answers: {shown}'
+
+
+def question_from_record(record: Dict[str, Any]) -> Question:
+    """
+    Return the question described by <record>.
+
+    Raise ValueError if the type of the question is unknown.
+
+    >>> q = question_from_record({'id': 1, 'type': 'numeric', 'text': 'Age?',
+    ...                           'min': 18, 'max': 30})
+    >>> isinstance(q, NumericQuestion)
+    True
+    """
+    type_ = record['type']
+    if type_ == 'multiple_choice':
+        return MultipleChoiceQuestion(record['id'], record['text'],
+                                      record['options'])
+    if type_ == 'checkbox':
+        return CheckboxQuestion(record['id'], record['text'],
+                                record['options'])
+    if type_ == 'numeric':
+        return NumericQuestion(record['id'], record['text'], record['min'],
+                               record['max'])
+    if type_ == 'yes_no':
+        return YesNoQuestion(record['id'], record['text'])
+    raise ValueError(f'unknown question type: {type_}')
+
+
+def make_criterion(name: str) -> Criterion:
+    """
+    Return a new criterion with the name <name>.
+
+    Raise ValueError if no criterion has that name.
+    """
+    if name not in CRITERIA:
+        raise ValueError(f'unknown criterion: {name}')
+    return CRITERIA[name]()
+
+
+def make_grouper(name: str, group_size: int) -> Grouper:
+    """
+    Return a new grouper with the name <name> that makes groups of size
+    <group_size>.
+
+    Raise ValueError if no grouper has that name.
+
+    >>> isinstance(make_grouper('greedy', 3), GreedyGrouper)
+    True
+    """
+    if name not in GROUPERS:
+        raise ValueError(f'unknown grouper: {name}')
+    return GROUPERS[name](group_size)
+
+
+def survey_from_record(record: Dict[str, Any]) -> Survey:
+    """
+    Return the survey described by <record>, with the weights and criteria
+    given for its questions.
+    """
+    questions = []
+    for question_record in record['questions']:
+        questions.append(question_from_record(question_record))
+    survey = Survey(questions)
+
+    for question, question_record in zip(questions, record['questions']):
+        if 'weight' in question_record:
+            survey.set_weight(question_record['weight'], question)
+        if 'criterion' in question_record:
+            survey.set_criterion(make_criterion(question_record['criterion']),
+                                 question)
+    return survey
+
+
+def course_from_record(record: Dict[str, Any], survey: Survey) -> Course:
+    """
+    Return the course described by <record>. Each student's answers are
+    recorded for the questions in <survey>; answers to questions that are not
+    in <survey> are ignored.
+
+    Raise ValueError if the students cannot all be enrolled in the course.
+    """
+    questions = {}
+    for question in survey.get_questions():
+        questions[str(question.id)] = question
+
+    # students with the same answer to a question share one Answer
+    pool = AnswerPool()
+    students = []
+    for student_record in record['students']:
+        students.append(student_from_record(student_record, questions, pool))
+
+    course = Course(record['name'])
+    course.enroll_students(students)
+    if len(course.students) != len(students):
+        raise ValueError(f'invalid students in course: {record["name"]}')
+    return course
+
+
+def student_from_record(record: Dict[str, Any],
+                        questions: Dict[str, Question],
+                        pool: Optional[AnswerPool] = None) -> Student:
+    """
+    Return the student described by <record>. <questions> maps the id of
+    each question, as a string, to the question itself.
+
+    If <pool> is not None, the student's answers are shared answers from
+    <pool>.
+    """
+    student = Student(record['id'], record['name'])
+    answers = record.get('answers', {})
+    for id_ in answers:
+        if id_ in questions:
+            if pool is None:
+                answer = Answer(answers[id_])
+            else:
+                answer = pool.intern(questions[id_], answers[id_])
+            student.set_answer(questions[id_], answer)
+    return student
+
+
+def grouping_to_record(grouping: Grouping) -> List[List[int]]:
+    """
+    Return a list containing, for each group in <grouping>, the list of the
+    ids of its members.
+    """
+    groups = []
+    for group in grouping.get_groups():
+        ids = []
+        for member in group.get_members():
+            ids.append(member.id)
+        groups.append(ids)
+    return groups
+
+
+def check_answers(course: Course, survey: Survey) -> List[Tuple[int, int, str]]:
+    """
+    Return a tuple (student id, question id, reason) for every answer to a
+    question of <survey> that a student in <course> is missing or gave an
+    invalid answer to, as Course.missing_answers does.
+
+    Raise MissingAnswersError if any answer is missing, since groupers
+    cannot group a student without an answer. Invalid answers only make the
+    groups containing them score zero on that question.
+    """
+    missing = course.missing_answers(survey)
+    for _, _, reason in missing:
+        if reason == 'missing':
+            raise MissingAnswersError(missing)
+    return missing
+
+
+def load_survey(path: str) -> Survey:
+    """ Return the survey described by the JSON file at <path> """
+    with open(path) as file:
+        return survey_from_record(json.load(file))
+
+
+def load_course(path: str, survey: Survey) -> Course:
+    """
+    Return the course described by the JSON file at <path>, with answers to
+    the questions in <survey>.
+    """
+    with open(path) as file:
+        return course_from_record(json.load(file), survey)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'json',
+                                                  'course',
+                                                  'criterion',
+                                                  'grouper',
+                                                  'survey']})
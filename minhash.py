@@ -0,0 +1,289 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a MinHash index over the answers of students to a checkbox
+question. The index finds students whose answers are likely to have a high
+Jaccard similarity (CheckboxQuestion.get_similarity) to the answer of a
+student or a group, without comparing the answer to every other answer.
+
+Every answer is summarized by bands * rows min-hashes. Two answers with
+similarity s share all the min-hashes of a band with probability s ** rows,
+so they are in the same bucket for at least one band with probability
+1 - (1 - s ** rows) ** bands. More bands find more of the similar students;
+more rows leave out more of the dissimilar ones.
+"""
+from __future__ import annotations
+import random
+import zlib
+from typing import TYPE_CHECKING, Dict, Hashable, List, Optional, Set, \
+    Tuple
+from encoding import answer_key
+
+if TYPE_CHECKING:
+    from course import Student
+    from survey import CheckboxQuestion
+
+# a Mersenne prime larger than any crc32 value, used for the hash functions
+_PRIME = (1 << 61) - 1
+
+
+class MinHashIndex:
+    """
+    An index of the answers of some students to a checkbox question.
+
+    === Public Attributes ===
+    question: the question whose answers are indexed
+    bands: the number of bands of each signature
+    rows: the number of min-hashes in each band
+
+    === Private Attributes ===
+    _students: the indexed students, in the order they were given
+    _positions: maps the id of each indexed student to its position in
+                _students
+    _removed: the positions of the students removed from this index
+    _hashes: the coefficients (a, b) of the hash functions (a * x + b) % _PRIME
+    _signatures: the signature of each indexed student, or None if that
+                 student has no valid answer to question
+    _holders: maps each signature to the positions of the students in this
+              index with that signature, in order
+    _buckets: _buckets[b] maps the min-hashes of band b of a signature to the
+              signatures in _holders with those min-hashes
+
+    === Representation Invariants ===
+    bands > 0
+    rows > 0
+    len(_hashes) == bands * rows
+    No position in _holders is in _removed, and no list in _holders is empty
+    """
+
+    question: CheckboxQuestion
+    bands: int
+    rows: int
+    _students: List[Student]
+    _positions: Dict[int, int]
+    _removed: Set[int]
+    _hashes: List[Tuple[int, int]]
+    _signatures: List[Optional[Tuple[int, ...]]]
+    _holders: Dict[Tuple[int, ...], Dict[int, None]]
+    _buckets: List[Dict[Tuple[int, ...], Dict[Tuple[int, ...], None]]]
+
+    def __init__(self, students: List[Student], question: CheckboxQuestion,
+                 bands: int = 16, rows: int = 4, seed: int = 0) -> None:
+        """
+        Initialize an index of the answers of <students> to <question> with
+        <bands> bands of <rows> min-hashes. The hash functions are chosen
+        with a random number generator seeded with <seed>, so the same seed
+        always gives the same index.
+
+        === Precondition ===
+        bands > 0
+        rows > 0
+        No two students in <students> have the same id
+        """
+        self.question = question
+        self.bands = bands
+        self.rows = rows
+        self._students = list(students)
+        self._positions = {}
+        self._removed = set()
+        rng = random.Random(seed)
+        self._hashes = []
+        for _ in range(bands * rows):
+            self._hashes.append((rng.randrange(1, _PRIME),
+                                 rng.randrange(0, _PRIME)))
+        self._signatures = []
+        self._holders = {}
+        self._buckets = [{} for _ in range(bands)]
+
+        # equal answers have equal signatures, so compute each one once
+        known: Dict[Hashable, Tuple[int, ...]] = {}
+        for i, student in enumerate(self._students):
+            self._positions[student.id] = i
+            signature = self._make_signature(student, known)
+            self._signatures.append(signature)
+            if signature is None:
+                continue
+            if signature not in self._holders:
+                self._holders[signature] = {}
+                for b in range(bands):
+                    self._buckets[b].setdefault(self._band(signature, b),
+                                                {})[signature] = None
+            self._holders[signature][i] = None
+
+    def __len__(self) -> int:
+        """ Return the number of students in this index """
+        return len(self._students) - len(self._removed)
+
+    def __contains__(self, student: Student) -> bool:
+        """ Return True iff <student> is in this index """
+        return student.id in self._positions and \
+            self._positions[student.id] not in self._removed
+
+    def remove(self, student: Student) -> None:
+        """
+        Remove <student> from this index, so that it is no longer returned as
+        a neighbour. Do nothing if <student> is not in this index.
+        """
+        if student not in self:
+            return
+        i = self._positions[student.id]
+        self._removed.add(i)
+        signature = self._signatures[i]
+        if signature is None:
+            return
+        del self._holders[signature][i]
+        if len(self._holders[signature]) == 0:
+            del self._holders[signature]
+            for b in range(self.bands):
+                key = self._band(signature, b)
+                del self._buckets[b][key][signature]
+                if len(self._buckets[b][key]) == 0:
+                    del self._buckets[b][key]
+
+    def estimate(self, student1: Student, student2: Student) -> float:
+        """
+        Return the estimated similarity of the answers of <student1> and
+        <student2>: the fraction of their min-hashes that are equal. Return
+        0.0 if either student has no valid answer.
+
+        === Precondition ===
+        <student1> and <student2> were given when this index was created
+        """
+        sig1 = self._signatures[self._positions[student1.id]]
+        sig2 = self._signatures[self._positions[student2.id]]
+        if sig1 is None or sig2 is None:
+            return 0.0
+        return _agreement(sig1, sig2)
+
+    def neighbours(self, student: Student,
+                   limit: Optional[int] = None) -> List[Student]:
+        """
+        Return the students in this index, other than <student>, that share a
+        bucket with <student> in at least one band.
+
+        The students are ordered from the highest estimated similarity to the
+        lowest, with ties in the order the students were given. If <limit> is
+        not None, return at most <limit> students.
+
+        === Precondition ===
+        <student> was given when this index was created
+        """
+        return self.group_neighbours([student], limit)
+
+    def group_neighbours(self, members: List[Student],
+                         limit: Optional[int] = None) -> List[Student]:
+        """
+        Return the students in this index, other than <members>, that share a
+        bucket with at least one student in <members> in at least one band.
+
+        The students are ordered from the highest to the lowest sum of their
+        estimated similarities to <members>, with ties in the order the
+        students were given. If <limit> is not None, return at most <limit>
+        students.
+
+        === Precondition ===
+        Every student in <members> was given when this index was created
+        """
+        signatures = []
+        excluded = set()
+        for member in members:
+            i = self._positions[member.id]
+            excluded.add(i)
+            if self._signatures[i] is not None:
+                signatures.append(self._signatures[i])
+
+        found: Dict[Tuple[int, ...], None] = {}
+        for signature in signatures:
+            for b in range(self.bands):
+                found.update(self._buckets[b].get(self._band(signature, b),
+                                                  {}))
+
+        totals: Dict[float, List[int]] = {}
+        for other in found:
+            total = 0.0
+            for signature in signatures:
+                total += _agreement(signature, other)
+            positions = totals.setdefault(total, [])
+            for j in self._holders[other]:
+                if j not in excluded:
+                    positions.append(j)
+
+        ranked = []
+        for total in sorted(totals, reverse=True):
+            ranked.extend(sorted(totals[total]))
+            if limit is not None and len(ranked) >= limit:
+                ranked = ranked[:limit]
+                break
+        return [self._students[j] for j in ranked]
+
+    def _make_signature(self, student: Student,
+                        known: Dict[Hashable, Tuple[int, ...]]) \
+            -> Optional[Tuple[int, ...]]:
+        """
+        Return the min-hashes of the answer of <student> to this index's
+        question, or None if <student> has no valid answer to it.
+
+        <known> maps the key of every answer whose min-hashes have already
+        been computed to those min-hashes, and is updated with this answer.
+        """
+        answer = student.get_answer(self.question)
+        if answer is None or not answer.is_valid(self.question):
+            return None
+        key = answer_key(answer.content)
+        if key not in known:
+            values = [zlib.crc32(str(option).encode('utf-8'))
+                      for option in answer.content]
+            signature = []
+            for a, b in self._hashes:
+                signature.append(min((a * x + b) % _PRIME for x in values))
+            known[key] = tuple(signature)
+        return known[key]
+
+    def _band(self, signature: Tuple[int, ...], b: int) -> Tuple[int, ...]:
+        """ Return the min-hashes of band <b> of <signature> """
+        return signature[b * self.rows:(b + 1) * self.rows]
+
+
+def _agreement(sig1: Tuple[int, ...], sig2: Tuple[int, ...]) -> float:
+    """
+    Return the fraction of the positions at which <sig1> and <sig2> are
+    equal.
+
+    >>> _agreement((1, 2, 3, 4), (1, 5, 3, 6))
+    0.5
+    """
+    same = 0
+    for x, y in zip(sig1, sig2):
+        if x == y:
+            same += 1
+    return same / len(sig1)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['random',
+                                                  'zlib',
+                                                  'typing',
+                                                  'encoding',
+                                                  'course',
+                                                  'survey']})
@@ -0,0 +1,414 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains an out-of-core pipeline for grouping courses that are too
+large to hold in memory as Student and Answer objects:
+
+    python outofcore.py build SURVEY_FILE STUDENTS_FILE STORE_DIR
+    python outofcore.py group STORE_DIR SURVEY_FILE OUTPUT_FILE \
+        --grouper greedy --group-size 4 --memory 64
+
+STUDENTS_FILE has one student record per line, in the format of the records
+in a course file (see loader.py). The build command encodes the answers of
+the students, chunk by chunk, into a store in STORE_DIR: every distinct answer
+to a question gets a small integer code, and each chunk keeps the ids, names
+and codes of its students in compact arrays.
+
+The group command groups the students in blocks of consecutive students,
+using as many students per block as fit in the memory budget (in MiB), and
+reads the store back at most one block at a time, whatever the size of its
+chunks. Each group is written to OUTPUT_FILE as
+soon as its block is grouped, as one JSON list of member ids per line.
+Students in different blocks are never in the same group.
+"""
+from __future__ import annotations
+import argparse
+import itertools
+import json
+import os
+import time
+from array import array
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, \
+    Tuple
+from course import Course, Student
+from encoding import MISSING, answer_key
+from grouper import Grouper
+from loader import GROUPERS, load_survey, make_grouper
+from survey import Answer, AnswerPool, Survey
+
+# the estimated memory, in bytes, used by a student while its block is
+# grouped, and the extra memory used for each of its answers
+STUDENT_BYTES = 1024
+ANSWER_BYTES = 128
+
+# the name of the file in a store that describes the store
+_META = 'store.json'
+
+
+class AnswerStore:
+    """
+    A chunked on-disk store of the students of a course and their encoded
+    answers to the questions of a survey.
+
+    === Public Attributes ===
+    directory: the directory that holds the files of this store
+    question_ids: the ids of the questions whose answers are stored, in order
+    contents: contents[q][code] is the content of the answer with code <code>
+              to the question with id question_ids[q]
+    chunk_sizes: the number of students in each chunk, in order
+
+    === Representation Invariants ===
+    len(contents) == len(question_ids)
+    Every size in chunk_sizes is > 0
+    """
+
+    directory: str
+    question_ids: List[int]
+    contents: List[List[Any]]
+    chunk_sizes: List[int]
+
+    def __init__(self, directory: str) -> None:
+        """
+        Open the store in <directory>.
+
+        Raise ValueError if <directory> does not contain a store.
+        """
+        path = os.path.join(directory, _META)
+        if not os.path.isfile(path):
+            raise ValueError(f'no answer store in {directory}')
+        with open(path) as file:
+            meta = json.load(file)
+        self.directory = directory
+        self.question_ids = meta['questions']
+        self.contents = meta['contents']
+        self.chunk_sizes = meta['chunks']
+
+    def __len__(self) -> int:
+        """ Return the number of students in this store """
+        return sum(self.chunk_sizes)
+
+    def chunks(self, limit: Optional[int] = None) \
+            -> Iterator[Tuple[array, List[str], array]]:
+        """
+        Yield the chunks of this store in order, one at a time, as tuples
+        (ids, names, codes), reading at most <limit> students of a chunk at a
+        time if <limit> is not None. codes[i * len(question_ids) + q] is the
+        code of the answer of the student with id ids[i] to the question with
+        id question_ids[q], or MISSING if that student has no answer to it.
+
+        === Precondition ===
+        limit is None or limit > 0
+        """
+        width = len(self.question_ids)
+        for n, size in enumerate(self.chunk_sizes):
+            base = os.path.join(self.directory, f'{n:06d}')
+            step = size if limit is None else min(size, limit)
+            with open(base + '.ids', 'rb') as id_file, \
+                    open(base + '.codes', 'rb') as code_file, \
+                    open(base + '.names') as name_file:
+                names = _read_names(name_file)
+                for start in range(0, size, step):
+                    count = min(step, size - start)
+                    ids = array('q')
+                    ids.fromfile(id_file, count)
+                    codes = array('i')
+                    codes.fromfile(code_file, count * width)
+                    yield ids, list(itertools.islice(names, count)), codes
+
+
+def build_store(records: Iterable[Dict[str, Any]], survey: Survey,
+                directory: str, chunk_size: int = 10000) -> AnswerStore:
+    """
+    Write the students described by <records> and their answers to the
+    questions of <survey> to a new store in <directory>, with <chunk_size>
+    students per chunk, and return the store. <records> is read one record at
+    a time, so it can be a generator over a file that does not fit in memory.
+
+    Answers to questions that are not in <survey> are ignored. An answer
+    whose content cannot be encoded is stored as MISSING.
+
+    === Precondition ===
+    chunk_size > 0
+    """
+    os.makedirs(directory, exist_ok=True)
+    question_ids = [question.id for question in survey.questions_view()]
+    keys = [str(id_) for id_ in question_ids]
+    known: List[Dict[Hashable, int]] = [{} for _ in question_ids]
+    contents: List[List[Any]] = [[] for _ in question_ids]
+    chunk_sizes = []
+
+    ids = array('q')
+    names = []
+    codes = array('i')
+    for record in records:
+        ids.append(record['id'])
+        names.append(record['name'])
+        answers = record.get('answers', {})
+        for q, key in enumerate(keys):
+            codes.append(_code(answers.get(key), known[q], contents[q]))
+        if len(ids) == chunk_size:
+            _write_chunk(directory, len(chunk_sizes), ids, names, codes)
+            chunk_sizes.append(len(ids))
+            ids, names, codes = array('q'), [], array('i')
+    if len(ids) > 0:
+        _write_chunk(directory, len(chunk_sizes), ids, names, codes)
+        chunk_sizes.append(len(ids))
+
+    with open(os.path.join(directory, _META), 'w') as file:
+        json.dump({'questions': question_ids, 'contents': contents,
+                   'chunks': chunk_sizes}, file)
+    return AnswerStore(directory)
+
+
+def block_size(memory_budget: int, group_size: int, survey: Survey) -> int:
+    """
+    Return the number of students in each block grouped by group_store so
+    that a block fits in <memory_budget> bytes: the largest multiple of
+    <group_size> students whose estimated memory is at most <memory_budget>.
+
+    Raise ValueError if not even <group_size> students fit.
+
+    >>> from survey import YesNoQuestion
+    >>> block_size(100000, 4, Survey([YesNoQuestion(1, 'Yes?')]))
+    84
+    """
+    per_student = STUDENT_BYTES + ANSWER_BYTES * len(survey)
+    size = memory_budget // per_student // group_size * group_size
+    if size == 0:
+        raise ValueError(f'a memory budget of {memory_budget} bytes does not '
+                         f'fit a group of {group_size} students')
+    return size
+
+
+def group_store(store: AnswerStore, survey: Survey, grouper: Grouper,
+                out_path: str, memory_budget: int = 64 << 20) \
+        -> Dict[str, Any]:
+    """
+    Group the students in <store> with <grouper> according to <survey>,
+    write the groups to <out_path> and return a summary with the number of
+    'students', 'groups' and 'blocks', and the 'score' of the grouping.
+
+    The students are read in the order of the store, at most a block at a
+    time whatever the size of its chunks, and grouped in blocks of
+    block_size(memory_budget, grouper.group_size, survey) students, so at most
+    one block of students is in memory at a time. Each group is written to
+    <out_path> as a JSON list of the ids of its members, one group per line,
+    as soon as its block is grouped. The students of a group that is smaller
+    than grouper.group_size are carried over to the next block, so only the
+    last group may be smaller than grouper.group_size.
+
+    Raise ValueError if the questions of <survey> are not the questions of
+    <store>, if the memory budget is too small for a group, or if a block
+    has a student with no name or two students with the same id.
+    """
+    questions = list(survey.questions_view())
+    if [question.id for question in questions] != store.question_ids:
+        raise ValueError('the survey does not match the answer store')
+    size = block_size(memory_budget, grouper.group_size, survey)
+
+    # there are few distinct answers, so each one is made once and shared
+    pool = AnswerPool()
+    answers: List[List[Answer]] = []
+    for question, contents in zip(questions, store.contents):
+        answers.append([pool.intern(question, content)
+                        for content in contents])
+
+    summary = {'students': 0, 'groups': 0, 'blocks': 0, 'score': 0.0}
+    block: List[Student] = []
+    with open(out_path, 'w') as out:
+        for ids, names, codes in store.chunks(size):
+            width = len(questions)
+            for i, id_ in enumerate(ids):
+                student = Student(id_, names[i])
+                for q, code in enumerate(codes[i * width:(i + 1) * width]):
+                    if code != MISSING:
+                        student.set_answer(questions[q], answers[q][code])
+                block.append(student)
+                if len(block) == size:
+                    block = _group_block(block, survey, grouper, out,
+                                         summary, False)
+        if len(block) > 0:
+            _group_block(block, survey, grouper, out, summary, True)
+
+    summary['students'] = len(store)
+    if summary['groups'] > 0:
+        summary['score'] /= summary['groups']
+    return summary
+
+
+def iter_groups(path: str) -> Iterator[List[int]]:
+    """
+    Yield the ids of the members of each group in the file at <path>
+    written by group_store, one group at a time.
+    """
+    with open(path) as file:
+        for line in file:
+            if line.strip() != '':
+                yield json.loads(line)
+
+
+def _code(content: Any, known: Dict[Hashable, int],
+          contents: List[Any]) -> int:
+    """
+    Return the code of the answer content <content>, where <known> maps the
+    key of every content already coded to its code and contents[code] is the
+    content with that code. Give <content> the next code if it has none yet.
+    Return MISSING if <content> is None or cannot be coded.
+    """
+    if content is None:
+        return MISSING
+    try:
+        key = answer_key(content)
+        if key not in known:
+            known[key] = len(contents)
+            contents.append(content)
+    except TypeError:
+        return MISSING
+    return known[key]
+
+
+def _write_chunk(directory: str, n: int, ids: array, names: List[str],
+                 codes: array) -> None:
+    """ Write chunk number <n> of a store in <directory> """
+    base = os.path.join(directory, f'{n:06d}')
+    with open(base + '.ids', 'wb') as file:
+        ids.tofile(file)
+    with open(base + '.codes', 'wb') as file:
+        codes.tofile(file)
+    with open(base + '.names', 'w') as file:
+        for name in names:
+            file.write(json.dumps(name) + '\n')
+
+
+def _read_names(file: Any) -> Iterator[str]:
+    """
+    Yield the names in the names file <file> of a chunk one at a time: one
+    JSON string per line, or a single JSON list in stores built before names
+    were written one per line.
+    """
+    if file.read(1) == '[':
+        file.seek(0)
+        yield from json.load(file)
+        return
+    file.seek(0)
+    for line in file:
+        yield json.loads(line)
+
+
+def _group_block(block: List[Student], survey: Survey, grouper: Grouper,
+                 out: Any, summary: Dict[str, Any],
+                 last: bool) -> List[Student]:
+    """
+    Group the students in <block> with <grouper>, write the groups to <out>
+    and add them to <summary>. Return the members of the last group if it is
+    smaller than grouper.group_size and this is not the <last> block, without
+    writing that group, and an empty list otherwise.
+    """
+    course = Course('block')
+    course.enroll_students(block)
+    if len(course.students) != len(block):
+        raise ValueError(f'invalid student in the store: {_invalid(block)}')
+    groups = list(grouper.make_grouping(course, survey).groups_view())
+    carried: List[Student] = []
+    if not last and len(groups) > 0 and \
+            len(groups[-1]) < grouper.group_size:
+        carried = list(groups.pop().members_view())
+    for group in groups:
+        members = group.members_view()
+        out.write(json.dumps([member.id for member in members]) + '\n')
+        summary['score'] += survey.score_students(members)
+        summary['groups'] += 1
+    summary['blocks'] += 1
+    return carried
+
+
+def _invalid(students: List[Student]) -> str:
+    """
+    Return a description of the first student in <students> that cannot be
+    enrolled in a course: one with an empty name, or with the same id as a
+    student before it.
+    """
+    seen = set()
+    for student in students:
+        if str(student) == '':
+            return f'student {student.id} has no name'
+        if student.id in seen:
+            return f'student id {student.id} is repeated'
+        seen.add(student.id)
+    return 'unknown'
+
+
+def _read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """ Yield the student records in the JSON lines file at <path> """
+    with open(path) as file:
+        for line in file:
+            if line.strip() != '':
+                yield json.loads(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the command line tool with the arguments <argv> (or the arguments
+    given to this program if <argv> is None) and return the exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description='Group a course that does not fit in memory.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='encode students into a store')
+    build.add_argument('survey')
+    build.add_argument('students')
+    build.add_argument('store_dir')
+    build.add_argument('--chunk-size', type=int, default=10000)
+    group = commands.add_parser('group', help='group the students in a store')
+    group.add_argument('store_dir')
+    group.add_argument('survey')
+    group.add_argument('output')
+    group.add_argument('--grouper', choices=sorted(GROUPERS),
+                       default='greedy')
+    group.add_argument('--group-size', type=int, default=4)
+    group.add_argument('--memory', type=int, default=64,
+                       help='memory budget of a block in MiB (default: 64)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    survey = load_survey(args.survey)
+    if args.command == 'build':
+        if args.chunk_size < 1:
+            parser.error('--chunk-size must be at least 1')
+        store = build_store(_read_records(args.students), survey,
+                            args.store_dir, args.chunk_size)
+        print(f'stored {len(store)} students in '
+              f'{len(store.chunk_sizes)} chunks')
+    else:
+        if args.group_size < 2:
+            parser.error('--group-size must be at least 2')
+        summary = group_store(AnswerStore(args.store_dir), survey,
+                              make_grouper(args.grouper, args.group_size),
+                              args.output, args.memory << 20)
+        print(f'{summary["students"]} students, {summary["groups"]} groups '
+              f'in {summary["blocks"]} blocks, score {summary["score"]:.4f}')
+    print(f'wall time: {time.perf_counter() - start:.4f} seconds')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a class that records how much time a survey spends scoring
+each question and each criterion. A profiler is attached to a survey with
+Survey.set_profiler and stays out of the way when it is not attached.
+"""
+from __future__ import annotations
+from typing import Dict, List
+
+
+class ScoreProfiler:
+    """
+    A profiler that records the cumulative time, the number of calls and the
+    number of answers scored for every question and every criterion used by
+    a survey.
+
+    === Private Attributes ===
+    _questions: a dictionary mapping a question's id to a list
+                [seconds, calls, answers] for that question
+    _criteria: a dictionary mapping the name of a criterion class to a list
+               [seconds, calls, answers] for that criterion
+    _students: a list [seconds, calls, students] for Survey.score_students
+    _groupings: a list [seconds, calls, groups] for Survey.score_grouping
+
+    === Representation Invariants ===
+    Every recorded number of seconds, calls and answers is >= 0
+    """
+
+    _questions: Dict[int, List[float]]
+    _criteria: Dict[str, List[float]]
+    _students: List[float]
+    _groupings: List[float]
+
+    def __init__(self) -> None:
+        """ Initialize a profiler that has not recorded anything yet """
+        self._questions = {}
+        self._criteria = {}
+        self._students = [0.0, 0, 0]
+        self._groupings = [0.0, 0, 0]
+
+    def reset(self) -> None:
+        """ Forget everything recorded by this profiler """
+        self._questions = {}
+        self._criteria = {}
+        self._students = [0.0, 0, 0]
+        self._groupings = [0.0, 0, 0]
+
+    def record(self, question_id: int, criterion_name: str, seconds: float,
+               answers: int) -> None:
+        """
+        Record that scoring <answers> answers to the question with id
+        <question_id> using the criterion class <criterion_name> took
+        <seconds> seconds.
+        """
+        for table, key in ((self._questions, question_id),
+                           (self._criteria, criterion_name)):
+            if key not in table:
+                table[key] = [0.0, 0, 0]
+            row = table[key]
+            row[0] += seconds
+            row[1] += 1
+            row[2] += answers
+
+    def record_students(self, seconds: float, students: int) -> None:
+        """
+        Record that one call to Survey.score_students on <students> students
+        took <seconds> seconds.
+        """
+        self._students[0] += seconds
+        self._students[1] += 1
+        self._students[2] += students
+
+    def record_grouping(self, seconds: float, groups: int) -> None:
+        """
+        Record that one call to Survey.score_grouping on a grouping with
+        <groups> groups took <seconds> seconds.
+        """
+        self._groupings[0] += seconds
+        self._groupings[1] += 1
+        self._groupings[2] += groups
+
+    def as_dict(self) -> Dict[str, Dict]:
+        """
+        Return everything recorded by this profiler as a dictionary with the
+        keys 'questions', 'criteria', 'score_students' and 'score_grouping'.
+
+        'questions' maps each question id, and 'criteria' maps each criterion
+        class name, to a dictionary with the keys 'seconds', 'calls' and
+        'answers'.
+
+        >>> p = ScoreProfiler()
+        >>> p.record(1, 'HomogeneousCriterion', 0.5, 3)
+        >>> p.as_dict()['questions'][1]
+        {'seconds': 0.5, 'calls': 1, 'answers': 3}
+        """
+        def _row(row: List[float], count_name: str) -> Dict[str, float]:
+            return {'seconds': row[0], 'calls': row[1], count_name: row[2]}
+
+        questions = {}
+        for id_ in self._questions:
+            questions[id_] = _row(self._questions[id_], 'answers')
+        criteria = {}
+        for name in self._criteria:
+            criteria[name] = _row(self._criteria[name], 'answers')
+
+        return {'questions': questions,
+                'criteria': criteria,
+                'score_students': _row(self._students, 'students'),
+                'score_grouping': _row(self._groupings, 'groups')}
+
+    def as_table(self) -> str:
+        """
+        Return a multi-line string with one row per question and one row per
+        criterion, sorted from the most to the least time spent.
+        """
+        lines = [f'{"key":<32}{"seconds":>12}{"calls":>10}{"answers":>10}']
+
+        rows = []
+        for id_ in self._questions:
+            rows.append((f'question {id_}', self._questions[id_]))
+        for name in self._criteria:
+            rows.append((f'criterion {name}', self._criteria[name]))
+        rows.sort(key=lambda r: r[1][0], reverse=True)
+
+        rows.append(('score_students', self._students))
+        rows.append(('score_grouping', self._groupings))
+        for key, row in rows:
+            lines.append(f'{key:<32}{row[0]:>12.6f}{row[1]:>10}{row[2]:>10}')
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['typing']})
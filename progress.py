@@ -0,0 +1,165 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a class that reports the progress of a grouper while it
+makes a grouping and lets another thread, or a time limit, stop it (see
+Grouper.set_progress).
+
+Groupers check their progress at safe points, such as after a group has been
+formed. If they are asked to stop, they either raise GroupingCancelled or, if
+fallback is True, put the students that are left into groups in order, which
+takes almost no time, and return a complete grouping.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Optional
+
+
+class GroupingCancelled(Exception):
+    """
+    Error raised by Grouper.make_grouping when it is cancelled or runs out of
+    time and its progress has no fallback.
+    """
+
+
+class Progress:
+    """
+    The progress of a grouper that is making a grouping.
+
+    === Public Attributes ===
+    callback: a function called with the number of students placed in
+              groups, the number of groups formed and the number of seconds
+              since the grouping was started, or None
+    interval: the smallest number of seconds between two calls of callback
+              before the grouping is done
+    time_limit: the largest number of seconds the grouping may take, or None
+                if there is no limit
+    fallback: if True, a grouper that is asked to stop finishes the grouping
+              with a cheap strategy instead of raising GroupingCancelled
+    stopped: True iff the last grouping was asked to stop before it was done
+
+    === Private Attributes ===
+    _cancel: set when the grouping is cancelled
+    _start: the time.monotonic() time at which the grouping was started
+    _last: the time.monotonic() time of the last call of callback
+
+    === Representation Invariants ===
+    interval >= 0.0
+    time_limit is None or time_limit >= 0.0
+    """
+
+    callback: Optional[Callable[[int, int, float], None]]
+    interval: float
+    time_limit: Optional[float]
+    fallback: bool
+    stopped: bool
+    _cancel: threading.Event
+    _start: float
+    _last: float
+
+    def __init__(self, callback: Optional[Callable[[int, int, float],
+                                                   None]] = None,
+                 interval: float = 1.0, time_limit: Optional[float] = None,
+                 fallback: bool = True) -> None:
+        """
+        Initialize the progress of a grouping that is reported to <callback>
+        at most once every <interval> seconds and stops after <time_limit>
+        seconds, finishing with a cheap strategy iff <fallback> is True.
+
+        === Precondition ===
+        interval >= 0.0
+        time_limit is None or time_limit >= 0.0
+        """
+        self.callback = callback
+        self.interval = interval
+        self.time_limit = time_limit
+        self.fallback = fallback
+        self.stopped = False
+        self._cancel = threading.Event()
+        self.start()
+
+    def start(self) -> None:
+        """
+        Start the clock of a new grouping. The time limit is counted from
+        now; a cancellation stays in effect.
+        """
+        self._start = time.monotonic()
+        self._last = self._start
+        self.stopped = False
+
+    def cancel(self) -> None:
+        """
+        Ask the grouping to stop at its next safe point. This may be called
+        from any thread.
+        """
+        self._cancel.set()
+
+    def elapsed(self) -> float:
+        """ Return the number of seconds since the grouping was started """
+        return time.monotonic() - self._start
+
+    def should_stop(self) -> bool:
+        """
+        Return True iff the grouping was cancelled or is over its time
+        limit.
+        """
+        if self._cancel.is_set():
+            return True
+        return self.time_limit is not None and \
+            self.elapsed() >= self.time_limit
+
+    def check(self, placed: int, groups: int) -> bool:
+        """
+        Report that <placed> students have been placed in <groups> groups if
+        the interval has passed since the last report, and return True iff
+        the grouping should stop now and finish with the fallback.
+
+        Raise GroupingCancelled if the grouping should stop and there is no
+        fallback.
+        """
+        if self.callback is not None and \
+                time.monotonic() - self._last >= self.interval:
+            self.report(placed, groups)
+        if not self.should_stop():
+            return False
+        self.stopped = True
+        if not self.fallback:
+            raise GroupingCancelled(f'stopped after {self.elapsed():.3f} '
+                                    f'seconds with {placed} students placed')
+        return True
+
+    def report(self, placed: int, groups: int) -> None:
+        """
+        Call the callback with <placed> students placed in <groups> groups.
+        """
+        self._last = time.monotonic()
+        if self.callback is not None:
+            self.callback(placed, groups, self.elapsed())
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['threading',
+                                                  'time',
+                                                  'typing']})
@@ -0,0 +1,147 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a function that repairs an existing grouping after some
+students have enrolled late or dropped the course. Only the groups that lost
+members (and a final group that was not full) are changed; every other group
+is kept exactly as it was.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Optional
+from grouper import Group, Grouping
+
+if TYPE_CHECKING:
+    from course import Student
+    from survey import Survey
+
+
+def regroup(grouping: Grouping, added: List[Student],
+            removed: List[Student], survey: Survey,
+            group_size: int) -> Grouping:
+    """
+    Return a new grouping made from <grouping> by removing the students in
+    <removed> and placing the students in <added>.
+
+    A group is open if it lost a member or has fewer than <group_size>
+    members. Each added student, in order of id, joins the open group with
+    room for it whose score according to <survey> increases the most (or
+    decreases the least) when the student joins. Students who do not fit in
+    any open group start a new group. Afterwards, a student left alone in an
+    open group joins another open group with room in the same way.
+
+    Only open groups are scored, so the work done is proportional to the
+    number of students added and removed rather than to the size of the
+    course. Groups that are not open are the same Group objects as in
+    <grouping> and stay in the same order; new groups come last.
+
+    === Precondition ===
+    No student in <added> is a member of a group in <grouping>
+    group_size > 1
+    """
+    removed_ids = set()
+    for student in removed:
+        removed_ids.add(student.id)
+
+    # kept[i] is the original group if it is not open and None otherwise
+    members: List[List[Student]] = []
+    kept: List[Optional[Group]] = []
+    open_: List[int] = []
+    for group in grouping.get_groups():
+        current = group.get_members()
+        remaining = []
+        for member in current:
+            if member.id not in removed_ids:
+                remaining.append(member)
+        if len(remaining) == len(current) and len(current) >= group_size:
+            kept.append(group)
+        else:
+            kept.append(None)
+            open_.append(len(members))
+        members.append(remaining)
+
+    base: Dict[int, float] = {}
+    for i in open_:
+        if len(members[i]) > 0:
+            base[i] = survey.score_students(members[i])
+
+    for student in sorted(added, key=lambda s: s.id):
+        best = _best_open_group(student, members, open_, base, survey,
+                                group_size)
+        if best is None:
+            best = len(members)
+            members.append([])
+            kept.append(None)
+            open_.append(best)
+        members[best].append(student)
+        base[best] = survey.score_students(members[best])
+
+    # a student left alone joins another open group if one has room
+    for i in open_:
+        if len(members[i]) == 1:
+            student = members[i][0]
+            others = [j for j in open_ if j != i and len(members[j]) > 0]
+            best = _best_open_group(student, members, others, base, survey,
+                                    group_size)
+            if best is not None:
+                members[best].append(student)
+                base[best] = survey.score_students(members[best])
+                members[i] = []
+
+    new_grouping = Grouping()
+    for group, group_members in zip(kept, members):
+        if group is not None:
+            new_grouping.add_group(group)
+        elif len(group_members) > 0:
+            new_grouping.add_group(Group(group_members))
+    return new_grouping
+
+
+def _best_open_group(student: Student, members: List[List[Student]],
+                     candidates: List[int], base: Dict[int, float],
+                     survey: Survey, group_size: int) -> Optional[int]:
+    """
+    Return the index of the group in <candidates> with room for <student>
+    whose score increases the most when <student> joins it, or None if no
+    group in <candidates> has room. Ties go to the first such group.
+
+    <base> maps the index of each non-empty group to its current score.
+    """
+    best = None
+    best_delta = 0.0
+    for i in candidates:
+        size = len(members[i])
+        if size == 0 or size >= group_size:
+            continue
+        delta = survey.score_students(members[i] + [student]) - base[i]
+        if best is None or delta > best_delta:
+            best = i
+            best_delta = delta
+    return best
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'grouper',
+                                                  'course',
+                                                  'survey']})
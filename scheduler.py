@@ -0,0 +1,225 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a scheduler that groups many courses in parallel. The cost
+of grouping each course is estimated from its number of students, the group
+size, the number of survey questions and the grouper used. Courses are then
+dispatched to a pool of processes from the most to the least expensive, so
+that one large course does not start last and finish long after the others.
+"""
+from __future__ import annotations
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from course import Course
+from loader import GROUPERS, make_grouper, grouping_to_record
+from survey import Survey
+
+
+def estimate_cost(n: int, group_size: int, questions: int,
+                  grouper_name: str) -> float:
+    """
+    Return an estimate of the work needed for the grouper named
+    <grouper_name> to group <n> students into groups of <group_size> using a
+    survey with <questions> questions.
+
+    The estimate counts pairs of answers compared, so it is only meaningful
+    relative to the estimates of other courses. The groupers are those made
+    by loader.make_grouper, with their default settings.
+
+    Raise ValueError if no grouper has the name <grouper_name>.
+
+    >>> estimate_cost(100, 4, 3, 'greedy') > estimate_cost(50, 4, 3, 'greedy')
+    True
+    >>> estimate_cost(100, 4, 3, 'alpha') < estimate_cost(100, 4, 3, 'greedy')
+    True
+    """
+    if grouper_name not in GROUPERS:
+        raise ValueError(f'unknown grouper: {grouper_name}')
+    if n <= 1:
+        return 1.0
+    k = min(group_size, n)
+    questions = max(questions, 1)
+
+    # groups are formed from a pool that shrinks by k each time, so the
+    # number of candidates looked at over all groups is about n * n / (2k)
+    candidates = n * n / (2 * k)
+
+    if grouper_name == 'alpha':
+        return n * math.log2(n)
+    if grouper_name == 'random':
+        return candidates
+    if grouper_name == 'window':
+        # in practice a good window is found among the first few, each
+        # scored with k(k-1)/2 pairs; removing grouped students from the pool
+        # touches the remaining candidates
+        return n * questions * k * (k - 1) + candidates
+    if grouper_name == 'stratified':
+        # sorting the students by their answers
+        return n * questions * math.log2(n)
+
+    # scoring a candidate added to m members compares (m+1)m/2 pairs
+    greedy = candidates * questions * (k - 1) * k * (k + 1) / 6
+    if grouper_name == 'greedy':
+        return greedy
+
+    grouper = make_grouper(grouper_name, group_size)
+    if grouper_name == 'optimal':
+        # the search starts from the greedy grouping and scores a group at
+        # each node, up to the node limit
+        nodes = min(grouper.node_limit, 2 ** min(n, 32))
+        return greedy + nodes * questions * k * (k - 1) / 2
+    if grouper_name == 'cluster':
+        # every assignment compares each student with the medoids on its
+        # shortlist, every update compares the members of each cluster, and
+        # every swap pass compares each student with the members of the
+        # clusters on its shortlist
+        iterations = grouper.max_iterations + 1
+        swaps = grouper.swap_passes * grouper.shortlist * k * (k + 1)
+        return n * questions * (
+            iterations * (2 * grouper.shortlist + 1 + k) + swaps)
+    if grouper_name == 'partition':
+        # each refinement pass visits every edge; parts of at most
+        # dense_size groups get an edge between every pair of students
+        edges = n * grouper.degree * (questions + 1)
+        dense = n * min(n, grouper.dense_size * k) / 2
+        levels = math.log2(max(n / k, 2))
+        return (edges + dense) * questions + \
+            levels * grouper.sparse_passes * edges + grouper.passes * dense
+
+    # hierarchical: sorting the students into blocks, then grouping each
+    # block with the inner grouper
+    size = min(grouper.block_size, n)
+    inner = 'greedy'
+    for name, kind in GROUPERS.items():
+        if type(grouper.inner) is kind:
+            inner = name
+    return n * questions * math.log2(n) + \
+        math.ceil(n / size) * estimate_cost(size, group_size, questions, inner)
+
+
+def _group_course(course: Course, survey: Survey, grouper_name: str,
+                  group_size: int) -> Tuple[List[List[int]], float, float]:
+    """
+    Group <course> and return the ids of the members of each group, the
+    time spent making the grouping and the score of the grouping.
+    """
+    grouper = make_grouper(grouper_name, group_size)
+    start = time.perf_counter()
+    grouping = grouper.make_grouping(course, survey)
+    seconds = time.perf_counter() - start
+    score = survey.score_grouping(grouping)
+    return grouping_to_record(grouping), seconds, score
+
+
+def schedule(courses: List[Course], survey: Survey, grouper_name: str,
+             group_size: int, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Group every course in <courses> using <survey> and the grouper named
+    <grouper_name>, dispatching the most expensive courses first to a pool
+    of <workers> processes (or grouping them in order of cost in this
+    process if <workers> is 1).
+
+    Return a dictionary with the keys:
+    - 'jobs': one dictionary per course, in the order of <courses>, with the
+      keys 'course', 'students', 'estimate', 'order' (the position in which
+      the course was dispatched), 'groups', 'score' and 'seconds'
+    - 'wall_seconds': the time taken to group all courses
+    - 'busy_seconds': the sum of the time taken by each course
+    """
+    jobs = []
+    for course in courses:
+        jobs.append({'course': course.name,
+                     'students': len(course.students),
+                     'estimate': estimate_cost(len(course.students),
+                                               group_size, len(survey),
+                                               grouper_name)})
+
+    # longest processing time first
+    order = sorted(range(len(courses)), key=lambda i: -jobs[i]['estimate'])
+    for position, i in enumerate(order):
+        jobs[i]['order'] = position
+
+    start = time.perf_counter()
+    if workers == 1:
+        for i in order:
+            _record(jobs[i], _group_course(courses[i], survey, grouper_name,
+                                           group_size))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for i in order:
+                futures[i] = pool.submit(_group_course, courses[i], survey,
+                                         grouper_name, group_size)
+            for i in order:
+                _record(jobs[i], futures[i].result())
+    wall = time.perf_counter() - start
+
+    busy = 0.0
+    for job in jobs:
+        busy += job['seconds']
+    return {'jobs': jobs, 'wall_seconds': wall, 'busy_seconds': busy}
+
+
+def _record(job: Dict[str, Any],
+            result: Tuple[List[List[int]], float, float]) -> None:
+    """ Store the <result> of grouping a course in <job> """
+    job['groups'], job['seconds'], job['score'] = result
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Return a multi-line table comparing the estimated and the actual cost of
+    every job in <report>, as returned by schedule.
+
+    The estimated cost of each job is shown as a share of the estimated
+    total, next to its share of the actual time spent.
+    """
+    estimated = 0.0
+    for job in report['jobs']:
+        estimated += job['estimate']
+    busy = report['busy_seconds'] or 1.0
+
+    lines = [f'{"course":<24}{"students":>10}{"order":>7}{"est %":>9}'
+             f'{"act %":>9}{"seconds":>12}']
+    for job in sorted(report['jobs'], key=lambda j: j['order']):
+        lines.append(f'{job["course"]:<24}{job["students"]:>10}'
+                     f'{job["order"]:>7}'
+                     f'{100 * job["estimate"] / estimated:>9.2f}'
+                     f'{100 * job["seconds"] / busy:>9.2f}'
+                     f'{job["seconds"]:>12.4f}')
+    lines.append(f'wall time: {report["wall_seconds"]:.4f} seconds, '
+                 f'busy time: {report["busy_seconds"]:.4f} seconds')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'math',
+                                                  'time',
+                                                  'concurrent.futures',
+                                                  'course',
+                                                  'loader',
+                                                  'survey']})
@@ -0,0 +1,344 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+
+=== Module Description ===
+
+This file contains a small asyncio HTTP service that groups courses on
+request. Requests are queued and run in a pool of processes so that the
+event loop is never blocked by a grouper:
+
+    POST /group    body: {"survey": {...}, "course": {...},
+                          "grouper": "greedy", "group_size": 4,
+                          "deadline": 2.5}
+                   reply: {"groups": [[1, 2], ...], "score": 0.75,
+                           "complete": true,
+                           "missing": [[3, 1, "invalid"], ...],
+                           "latency": {"queued": ..., "run": ..., "total": ...}}
+    GET /metrics   reply: request counts and latency statistics
+
+See loader.py for the format of surveys and courses. A course where some
+students have no answer to a question is not grouped: the service replies 400
+with the same "missing" list next to the error. When the queue is full
+the service replies 503 instead of accepting more work. If a deadline (in
+seconds) is given and the grouper has not finished by then, the students that
+are left are put into groups in order and "complete" is false.
+
+    python service.py --port 8148 --workers 4 --queue 64
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from breakdown import percentile
+from loader import survey_from_record, course_from_record, make_grouper, \
+    grouping_to_record, check_answers, MissingAnswersError
+from progress import Progress
+
+# the number of recent requests kept for latency statistics
+_LATENCY_WINDOW = 1000
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+            500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+def run_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Group the course in <payload> and return its groups, the score of the
+    grouping, the time spent making it, whether the grouper finished before
+    the deadline in <payload>, if any, and a list [student id, question id,
+    reason] for every answer that is missing or invalid.
+
+    Raise ValueError or KeyError if <payload> does not describe a valid
+    request, and loader.MissingAnswersError if a student has no answer to a
+    question of the survey.
+    """
+    survey = survey_from_record(payload['survey'])
+    course = course_from_record(payload['course'], survey)
+    missing = check_answers(course, survey)
+    group_size = int(payload.get('group_size', 4))
+    if group_size < 2:
+        raise ValueError('group_size must be at least 2')
+    grouper = make_grouper(payload.get('grouper', 'greedy'), group_size)
+    progress = None
+    if payload.get('deadline') is not None:
+        deadline = float(payload['deadline'])
+        if deadline < 0:
+            raise ValueError('deadline must not be negative')
+        progress = Progress(time_limit=deadline)
+        grouper.set_progress(progress)
+
+    start = time.perf_counter()
+    grouping = grouper.make_grouping(course, survey)
+    seconds = time.perf_counter() - start
+    return {'groups': grouping_to_record(grouping),
+            'score': survey.score_grouping(grouping),
+            'run': seconds,
+            'complete': progress is None or not progress.stopped,
+            'missing': [list(entry) for entry in missing]}
+
+
+class GroupingService:
+    """
+    An asyncio service that groups courses on request.
+
+    === Public Attributes ===
+    workers: the number of requests that are run at the same time
+    queue_size: the number of accepted requests that may wait for a worker
+
+    === Private Attributes ===
+    _executor: the pool that runs the groupers
+    _owns_executor: True iff _executor was created by this service
+    _queue: the accepted requests waiting for a worker, each stored with the
+            future for its reply and the time it was accepted
+    _tasks: the worker tasks
+    _server: the asyncio server, or None if the service is not running
+    _latencies: the total latency in seconds of the most recent requests
+    _counts: the number of requests completed, rejected and failed
+
+    === Representation Invariants ===
+    workers >= 1
+    queue_size >= 1
+    """
+
+    workers: int
+    queue_size: int
+    _executor: Optional[Executor]
+    _owns_executor: bool
+    _queue: Optional[asyncio.Queue]
+    _tasks: List[asyncio.Task]
+    _server: Optional[asyncio.AbstractServer]
+    _latencies: Deque[float]
+    _counts: Dict[str, int]
+
+    def __init__(self, workers: int = 2, queue_size: int = 16,
+                 executor: Optional[Executor] = None) -> None:
+        """
+        Initialize a service that runs <workers> requests at a time, keeps at
+        most <queue_size> requests waiting and runs groupers in <executor>
+        (or in a new pool of <workers> processes if <executor> is None).
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue = None
+        self._tasks = []
+        self._server = None
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self._counts = {'completed': 0, 'rejected': 0, 'failed': 0}
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        """
+        Start serving on <host> and <port> and return the port used; a
+        <port> of 0 picks any free port.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            # start the worker processes now: processes forked later would
+            # inherit the sockets of open connections and keep them open
+            await asyncio.get_running_loop().run_in_executor(self._executor,
+                                                             int)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.ensure_future(self._work()))
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """ Stop serving and cancel the requests that have not started """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Return the number of requests completed, rejected and failed, the
+        number waiting in the queue and statistics of the latency of recent
+        requests in seconds.
+        """
+        latencies = list(self._latencies)
+        mean = sum(latencies) / len(latencies) if latencies else 0.0
+        result = dict(self._counts)
+        result['queued'] = self._queue.qsize() if self._queue else 0
+        result['latency'] = {'mean': mean,
+                             'p50': percentile(latencies, 50),
+                             'p95': percentile(latencies, 95),
+                             'max': max(latencies) if latencies else 0.0}
+        return result
+
+    async def _work(self) -> None:
+        """ Run queued requests one at a time, forever """
+        loop = asyncio.get_running_loop()
+        while True:
+            payload, reply, accepted = await self._queue.get()
+            started = time.perf_counter()
+            try:
+                result = await loop.run_in_executor(self._executor,
+                                                    run_request, payload)
+            except MissingAnswersError as error:
+                self._counts['failed'] += 1
+                if not reply.done():
+                    reply.set_result((400, {'error': str(error),
+                                            'missing': [list(entry) for entry
+                                                        in error.missing]}))
+            except (ValueError, KeyError, TypeError) as error:
+                self._counts['failed'] += 1
+                if not reply.done():
+                    reply.set_result((400, {'error': str(error)}))
+            except Exception as error:  # the worker process failed
+                self._counts['failed'] += 1
+                if not reply.done():
+                    reply.set_result((500, {'error': repr(error)}))
+            else:
+                total = time.perf_counter() - accepted
+                self._latencies.append(total)
+                self._counts['completed'] += 1
+                result['latency'] = {'queued': started - accepted,
+                                     'run': result.pop('run'),
+                                     'total': total}
+                if not reply.done():
+                    reply.set_result((200, result))
+            finally:
+                self._queue.task_done()
+
+    async def _submit(self, payload: Dict[str, Any]
+                      ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Queue <payload> and return the status and body of its reply once it
+        has run, or a 503 reply at once if the queue is full.
+        """
+        reply = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((payload, reply, time.perf_counter()))
+        except asyncio.QueueFull:
+            self._counts['rejected'] += 1
+            return 503, {'error': 'too many requests, try again later'}
+        return await reply
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        """ Read one HTTP request from <reader> and write its reply """
+        try:
+            method, path, body = await _read_request(reader)
+            if method == 'POST' and path == '/group':
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    status, reply = 400, {'error': 'body is not JSON'}
+                else:
+                    status, reply = await self._submit(payload)
+            elif method == 'GET' and path == '/metrics':
+                status, reply = 200, self.metrics()
+            else:
+                status, reply = 404, {'error': f'no route {method} {path}'}
+        except (ValueError, asyncio.IncompleteReadError):
+            status, reply = 400, {'error': 'malformed request'}
+
+        data = json.dumps(reply).encode()
+        writer.write(f'HTTP/1.1 {status} {_REASONS[status]}\r\n'
+                     f'Content-Type: application/json\r\n'
+                     f'Content-Length: {len(data)}\r\n'
+                     f'Connection: close\r\n\r\n'.encode() + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def _read_request(reader: asyncio.StreamReader
+                        ) -> Tuple[str, str, bytes]:
+    """
+    Return the method, path and body of the HTTP request read from <reader>.
+
+    Raise ValueError if the request is malformed.
+    """
+    request_line = (await reader.readline()).decode('latin-1').split()
+    if len(request_line) < 2:
+        raise ValueError('malformed request line')
+    length = 0
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if line == '':
+            break
+        name, _, value = line.partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    body = await reader.readexactly(length) if length > 0 else b''
+    return request_line[0].upper(), request_line[1], body
+
+
+async def request(host: str, port: int, method: str, path: str,
+                  payload: Optional[Dict[str, Any]] = None
+                  ) -> Tuple[int, Dict[str, Any]]:
+    """
+    Send an HTTP request to the service at <host> and <port> and return the
+    status and the decoded body of its reply.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: {host}\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+
+    head, _, body = data.partition(b'\r\n\r\n')
+    status = int(head.split()[1])
+    return status, json.loads(body)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """ Run the service with the command line arguments <argv> """
+    parser = argparse.ArgumentParser(description='Group courses on request.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8148)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--queue', type=int, default=16)
+    args = parser.parse_args(argv)
+
+    async def _serve() -> None:
+        service = GroupingService(args.workers, args.queue)
+        port = await service.start(args.host, args.port)
+        print(f'serving on {args.host}:{port}')
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
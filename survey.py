@@ -23,11 +23,17 @@ This file contains classes that describe a survey as well as classes that
 described different types of questions that can be asked in a given survey.
 """
 from __future__ import annotations
-from typing import TYPE_CHECKING, Union, Dict, List
+import time
+from typing import TYPE_CHECKING, Union, Any, Callable, Dict, Hashable, \
+    List, Optional, Sequence, Tuple, ValuesView
 from criterion import HomogeneousCriterion, InvalidAnswerError
+from encoding import answer_key
+from breakdown import ScoreBreakdown
+import counters
 
 if TYPE_CHECKING:
     from criterion import Criterion
+    from profiler import ScoreProfiler
     from grouper import Grouping
     from course import Student
 
@@ -143,7 +149,8 @@ class MultipleChoiceQuestion(Question):
         === Precondition ===
         <answer1> and <answer2> are both valid answers to this question.
         """
-        if answer1.content == answer2.content:
+        # shared answers (see AnswerPool) are equal iff they are identical
+        if answer1 is answer2 or answer1.content == answer2.content:
             return 1.0
         else:
             return 0.0
@@ -275,7 +282,7 @@ class YesNoQuestion(Question):
         === Precondition ===
         <answer1> and <answer2> are both valid answers to this question
         """
-        if answer1.content == answer2.content:
+        if answer1 is answer2 or answer1.content == answer2.content:
             return 1.0
         else:
             return 0.0
@@ -358,6 +365,9 @@ class CheckboxQuestion(MultipleChoiceQuestion):
         === Precondition ===
         <answer1> and <answer2> are both valid answers to this question
         """
+        if answer1 is answer2:
+            return 1.0
+
         common = []
 
         # collect all shared elements
@@ -386,9 +396,79 @@ class Answer:
 
     def is_valid(self, question: Question) -> bool:
         """Return True iff self.content is a valid answer to <question>"""
+        if counters.ACTIVE is not None:
+            counters.ACTIVE.validate_answer += 1
         return question.validate_answer(self)
 
 
+class SharedAnswer(Answer):
+    """ An answer that is shared by every student in an AnswerPool who gave
+    the same answer to a question. Its content cannot be replaced.
+
+    === Public Attributes ===
+    content: an answer to a single question
+
+    === Representation Invariants ===
+    content is never reassigned, and if it is a list, it is never changed
+    """
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """ Set the attribute <name> to <value>, unless that would replace
+        the content of this answer. """
+        if name == 'content' and 'content' in self.__dict__:
+            raise AttributeError('a shared answer cannot be changed')
+        object.__setattr__(self, name, value)
+
+
+class AnswerPool:
+    """ A pool of shared answers. Answers to the same question with equal
+    content are the same SharedAnswer, so they take the memory of one answer
+    and compare equal by identity.
+
+    === Private Attributes ===
+    _answers: maps the id of a question and the key of the content of an
+              answer (see encoding.answer_key) to the shared answer
+
+    >>> pool = AnswerPool()
+    >>> q = YesNoQuestion(1, 'Yes?')
+    >>> pool.intern(q, True) is pool.intern(q, True)
+    True
+    >>> pool.intern(q, True) is pool.intern(q, 1)
+    False
+    >>> len(pool)
+    2
+    """
+
+    _answers: Dict[Tuple[int, Hashable], SharedAnswer]
+
+    def __init__(self) -> None:
+        """ Initialize an empty pool """
+        self._answers = {}
+
+    def __len__(self) -> int:
+        """ Return the number of distinct answers in this pool """
+        return len(self._answers)
+
+    def intern(self, question: Question,
+               content: Union[str, bool, int, List[str]]) -> Answer:
+        """
+        Return the shared answer to <question> with content <content>,
+        adding it to this pool if there is none yet.
+
+        If <content> cannot be shared, because it is not made of hashable
+        values, return a new Answer with content <content> instead.
+        """
+        try:
+            key = (question.id, answer_key(content))
+            if key not in self._answers:
+                if isinstance(content, list):
+                    content = list(content)
+                self._answers[key] = SharedAnswer(content)
+            return self._answers[key]
+        except TypeError:
+            return Answer(content)
+
+
 class Survey:
     """
     A survey containing questions as well as criteria and weights used to
@@ -404,6 +484,11 @@ class Survey:
               question does not have an associated criterion in _criteria
     _default_weight: a weight to use to evaluate a question if the
               question does not have an associated weight in _weights
+    _profiler: a profiler that records the time spent scoring each question,
+              or None if this survey is not being profiled
+    _plan: a tuple (question, kernel, weight) for every question, where
+           kernel is the score_answers method of the question's criterion,
+           or None if it must be compiled again before scoring
 
     === Representation Invariants ===
     No two questions on this survey have the same id
@@ -419,6 +504,10 @@ class Survey:
     _weights: Dict[int, int]
     _default_criterion: Criterion
     _default_weight: int
+    _profiler: Optional[ScoreProfiler]
+    _plan: Optional[Tuple[Tuple[Question,
+                                Callable[[Question, List[Answer]], float],
+                                int], ...]]
 
     def __init__(self, questions: List[Question]) -> None:
         """
@@ -431,6 +520,8 @@ class Survey:
         self._weights = {}
         self._default_criterion = HomogeneousCriterion()
         self._default_weight = 1
+        self._profiler = None
+        self._plan = None
 
         for question in questions:
             if question.id not in self._questions:
@@ -461,11 +552,27 @@ class Survey:
 
     def get_questions(self) -> List[Question]:
         """ Return a list of all questions in this survey """
-        questions = []
-        for id_ in self._questions:
-            questions.append(self._questions[id_])
+        return list(self._questions.values())
 
-        return questions
+    def questions_view(self) -> ValuesView[Question]:
+        """ Return all questions in this survey, in the order of get_questions,
+        without copying them.
+        """
+        return self._questions.values()
+
+    def get_scoring(self) -> List[Tuple[Question, Criterion, int]]:
+        """
+        Return a list containing, for each question in this survey, a tuple
+        of the question, its associated criterion and its associated weight.
+
+        Groupers use this to reason about how score_students would score a
+        group without calling it.
+        """
+        scoring = []
+        for question in self.questions_view():
+            scoring.append((question, self._get_criterion(question),
+                            self._get_weight(question)))
+        return scoring
 
     def _get_criterion(self, question: Question) -> Criterion:
         """
@@ -515,6 +622,7 @@ class Survey:
             return False
 
         self._weights[question.id] = weight
+        self._plan = None
         return True
 
     def set_criterion(self, criterion: Criterion, question: Question) -> bool:
@@ -530,9 +638,39 @@ class Survey:
             return False
 
         self._criteria[question.id] = criterion
+        self._plan = None
         return True
 
-    def score_students(self, students: List[Student]) -> float:
+    def compile(self) -> Tuple[Tuple[Question,
+                                     Callable[[Question, List[Answer]], float],
+                                     int], ...]:
+        """
+        Return the scoring plan of this survey: a tuple of tuples (question,
+        kernel, weight), one for every question in the order of get_questions,
+        where kernel is the score_answers method of the question's criterion.
+        The plan is shared by every caller, so it cannot be changed.
+
+        The plan is kept until set_weight or set_criterion changes this
+        survey, so score_students does not look up the criterion and weight
+        of every question each time it is called.
+        """
+        if self._plan is None:
+            plan = []
+            for question in self.questions_view():
+                plan.append((question,
+                             self._get_criterion(question).score_answers,
+                             self._get_weight(question)))
+            self._plan = tuple(plan)
+        return self._plan
+
+    def set_profiler(self, profiler: Optional[ScoreProfiler]) -> None:
+        """
+        Record the time spent by score_students and score_grouping in
+        <profiler>. Stop profiling this survey if <profiler> is None.
+        """
+        self._profiler = profiler
+
+    def score_students(self, students: Sequence[Student]) -> float:
         """
         Return a quality score for <students> calculated based on their answers
         to the questions in this survey, and the associated criterion and weight
@@ -553,24 +691,56 @@ class Survey:
         All students in <students> have an answer to all questions in this
             survey
         """
+        if counters.ACTIVE is not None:
+            counters.ACTIVE.score_students += 1
+
         # if there is no question in self
         if len(self) == 0:
             return 0.0
 
+        if self._profiler is not None:
+            return self._score_students_profiled(students)
+
         try:
             scores = []
 
-            # for each question in self
-            for question in self.get_questions():
+            # for each question in self, with its criterion and weight
+            for question, kernel, weight in self.compile():
+                answers = [student.get_answer(question)
+                           for student in students]
+                scores.append(kernel(question, answers) * weight)
+
+            return sum(scores) / len(self)
+
+        except InvalidAnswerError:
+            return 0.0
+
+    def _score_students_profiled(self, students: Sequence[Student]) -> float:
+        """
+        Return the same score as score_students, recording the time spent on
+        each question and criterion in self._profiler.
+
+        === Precondition ===
+        self._profiler is not None and len(self) > 0
+        """
+        profiler = self._profiler
+        start = time.perf_counter()
+        try:
+            scores = []
+            for question in self.questions_view():
                 criteria = self._get_criterion(question)
                 weight = self._get_weight(question)
-                answers = []
 
+                began = time.perf_counter()
+                answers = []
                 for student in students:
-                    answer = student.get_answer(question)
-                    answers.append(answer)
-
-                score = criteria.score_answers(question, answers)
+                    answers.append(student.get_answer(question))
+                try:
+                    score = criteria.score_answers(question, answers)
+                finally:
+                    profiler.record(question.id, type(criteria).__name__,
+                                    time.perf_counter() - began,
+                                    len(answers))
                 scores.append(score * weight)
 
             return sum(scores) / len(self)
@@ -578,6 +748,10 @@ class Survey:
         except InvalidAnswerError:
             return 0.0
 
+        finally:
+            profiler.record_students(time.perf_counter() - start,
+                                     len(students))
+
     def score_grouping(self, grouping: Grouping) -> float:
         """ Return a score for <grouping> calculated based on the answers of
         each student in each group in <grouping> to the questions in <self>.
@@ -594,24 +768,76 @@ class Survey:
         All students in the groups in <grouping> have an answer to all questions
             in this survey
         """
+        profiler = self._profiler
+        if profiler is not None:
+            start = time.perf_counter()
         try:
             if len(grouping) == 0:
                 return 0.0
 
             scores = []
-            for group in grouping.get_groups():
-                score = self.score_students(group.get_members())
+            for group in grouping.groups_view():
+                score = self.score_students(group.members_view())
                 scores.append(score)
             return sum(scores) / len(scores)
 
         except InvalidAnswerError:
             return 0.0
 
+        finally:
+            if profiler is not None:
+                profiler.record_grouping(time.perf_counter() - start,
+                                         len(grouping))
+
+    def score_breakdown(self, grouping: Grouping) -> ScoreBreakdown:
+        """
+        Return the score of every group in <grouping> for every question in
+        this survey, weighted and unweighted, with the score of each group.
+
+        The groups are scored one question at a time. Groups whose answers to
+        a question are the same answer objects, as with an AnswerPool, are
+        only scored once for that question. A group with a missing or invalid
+        answer scores 0.0 for that question and 0.0 overall, as in
+        score_students.
+        """
+        plan = self.compile()
+        groups = [group.members_view() for group in grouping.groups_view()]
+        valid = [True] * len(groups)
+        columns = []
+        for question, kernel, _ in plan:
+            column = []
+            known: Dict[Tuple[int, ...], Optional[float]] = {}
+            for g, members in enumerate(groups):
+                answers = [member.get_answer(question) for member in members]
+                key = tuple(id(answer) for answer in answers)
+                if key not in known:
+                    try:
+                        known[key] = kernel(question, answers)
+                    except (InvalidAnswerError, AttributeError):
+                        known[key] = None
+                if known[key] is None:
+                    valid[g] = False
+                    column.append(0.0)
+                else:
+                    column.append(known[key])
+            columns.append(column)
+
+        breakdown = ScoreBreakdown([question.id for question, _, _ in plan],
+                                   [weight for _, _, weight in plan])
+        for g in range(len(groups)):
+            breakdown.add_group([column[g] for column in columns], valid[g])
+        return breakdown
+
 
 if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'time',
                                                   'criterion',
+                                                  'encoding',
+                                                  'breakdown',
+                                                  'counters',
+                                                  'profiler',
                                                   'course',
                                                   'grouper']})
@@ -1,11 +1,36 @@
+import asyncio
+import itertools
+import json
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pytest
 from course import sort_students, Student, Course
 from survey import Question, MultipleChoiceQuestion, NumericQuestion, \
-    YesNoQuestion, CheckboxQuestion, Answer, Survey
+    YesNoQuestion, CheckboxQuestion, Answer, AnswerPool, Survey
 from criterion import InvalidAnswerError, HomogeneousCriterion, \
     HeterogeneousCriterion, LonelyMemberCriterion, Criterion
 from grouper import slice_list, windows, Grouper, AlphaGrouper, RandomGrouper, \
-    GreedyGrouper, WindowGrouper, Group, Grouping
+    GreedyGrouper, WindowGrouper, OptimalGrouper, ClusterGrouper, \
+    PartitionGrouper, StratifiedGrouper, HierarchicalGrouper, Group, \
+    Grouping
+from encoding import AnswerEncoding, MISSING
+from minhash import MinHashIndex
+from constraints import Constraints
+from checkpoint import Checkpoint, run_key
+from progress import Progress, GroupingCancelled
+from profiler import ScoreProfiler
+import counters
+from counters import counting
+from loader import survey_from_record, course_from_record, make_grouper, \
+    question_from_record, GROUPERS
+import batch
+import outofcore
+import distributed
+from scheduler import estimate_cost, schedule, format_report
+from service import GroupingService, request, run_request
+from regroup import regroup
 
 
 class TestStudent:
@@ -1618,5 +1643,1906 @@ class TestWindowGrouper:
             windows(students, 2), survey) == [lily, mike]
 
 
+class TestScoreProfiler:
+    def test_profile_score_students(self) -> None:
+        amy = Student(1, 'Amy')
+        lisa = Student(2, 'Lisa')
+        yesno = YesNoQuestion(0, 'True or False')
+        num = NumericQuestion(1, '1-3', 1, 3)
+        s = Survey([yesno, num])
+        s.set_criterion(LonelyMemberCriterion(), num)
+        for student, ans in ((amy, 1), (lisa, 3)):
+            student.set_answer(yesno, Answer(True))
+            student.set_answer(num, Answer(ans))
+
+        profiler = ScoreProfiler()
+        s.set_profiler(profiler)
+        score = s.score_students([amy, lisa])
+        grouping = Grouping()
+        grouping.add_group(Group([amy, lisa]))
+        assert s.score_grouping(grouping) == score
+
+        report = profiler.as_dict()
+        assert set(report['questions']) == {0, 1}
+        assert report['questions'][0]['calls'] == 2
+        assert report['questions'][0]['answers'] == 4
+        assert report['criteria']['LonelyMemberCriterion']['calls'] == 2
+        assert report['criteria']['HomogeneousCriterion']['calls'] == 2
+        assert report['score_students']['calls'] == 2
+        assert report['score_grouping']['groups'] == 1
+        assert 'question 0' in profiler.as_table()
+
+        # scores are unchanged and nothing is recorded once detached
+        s.set_profiler(None)
+        assert s.score_students([amy, lisa]) == score
+        assert profiler.as_dict()['score_students']['calls'] == 2
+
+    def test_no_timing_without_profiler(self, monkeypatch) -> None:
+        amy = Student(1, 'Amy')
+        yesno = YesNoQuestion(0, 'True or False')
+        amy.set_answer(yesno, Answer(True))
+        grouping = Grouping()
+        grouping.add_group(Group([amy]))
+
+        def fail() -> float:
+            raise AssertionError('timed without a profiler')
+        monkeypatch.setattr('survey.time.perf_counter', fail)
+        s = Survey([yesno])
+        assert s.score_grouping(grouping) == 1.0
+        assert s.score_grouping(Grouping()) == 0.0
+
+
+class _CallCountingCriterion(HomogeneousCriterion):
+    """ A HomogeneousCriterion that counts its own score_answers calls """
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def score_answers(self, question: Question, answers: list) -> float:
+        self.calls += 1
+        return HomogeneousCriterion.score_answers(self, question, answers)
+
+
+class TestWorkCounters:
+    def test_counting_greedy(self) -> None:
+        students = []
+        q = YesNoQuestion(0, 'True or False')
+        for i in range(4):
+            student = Student(i, f'S{i}')
+            student.set_answer(q, Answer(i % 2 == 0))
+            students.append(student)
+        course = Course('Counting')
+        course.enroll_students(students)
+        s = Survey([q])
+
+        assert counters.ACTIVE is None
+        with counting() as work:
+            GreedyGrouper(2).make_grouping(course, s)
+        assert counters.ACTIVE is None
+
+        # 2 of the 3 candidates for the first group are scored: S3 cannot
+        # beat S2, so it is skipped. The rest form the last group.
+        assert work.score_students == 2
+        # the bounds score the pairs (True, False) and (True, True) once
+        assert work.score_answers == 2 + 2
+        assert work.similarity == 2 + 2
+        # 2 distinct answers are encoded, then 2 per scored pair and group
+        assert work.validate_answer == 2 + 4 + 4
+        assert work.as_dict()['score_students'] == 2
+
+    def test_counting_without_score_students(self) -> None:
+        course, survey = _constrained_course(12)
+        criterion = _CallCountingCriterion()
+        survey.set_criterion(criterion, survey.get_questions()[0])
+        with counting() as work:
+            ClusterGrouper(3).make_grouping(course, survey)
+        # the cluster grouper scores pairs of answers without score_students
+        assert work.score_students == 0
+        assert work.score_answers == criterion.calls > 0
+
+    def test_nested_counting(self) -> None:
+        q = NumericQuestion(0, '1-3', 1, 3)
+        a = Answer(1)
+        with counting() as outer:
+            a.is_valid(q)
+            with counting() as inner:
+                a.is_valid(q)
+            a.is_valid(q)
+        assert outer.validate_answer == 2
+        assert inner.validate_answer == 1
+
+
+def _write_sections(tmp_path, sections: int, size: int) -> tuple:
+    """ Write a survey and <sections> course files of <size> students """
+    survey_path = tmp_path / 'survey.json'
+    survey_path.write_text(json.dumps({'questions': [
+        {'id': 1, 'type': 'yes_no', 'text': 'Morning person?'},
+        {'id': 2, 'type': 'numeric', 'text': 'Hours?', 'min': 0, 'max': 10,
+         'weight': 2, 'criterion': 'heterogeneous'}]}))
+    sections_dir = tmp_path / 'sections'
+    sections_dir.mkdir()
+    for i in range(sections):
+        students = []
+        for j in range(size):
+            students.append({'id': j, 'name': f'S{j}',
+                             'answers': {'1': j % 2 == 0, '2': j % 11}})
+        (sections_dir / f'L{i:04}.json').write_text(
+            json.dumps({'name': f'L{i:04}', 'students': students}))
+    return str(sections_dir), str(survey_path)
+
+
+class TestLoader:
+    def test_survey_and_course_from_record(self) -> None:
+        survey = survey_from_record({'questions': [
+            {'id': 1, 'type': 'checkbox', 'text': 'Pick',
+             'options': ['a', 'b'], 'criterion': 'lonely_member'},
+            {'id': 2, 'type': 'multiple_choice', 'text': 'One',
+             'options': ['x', 'y'], 'weight': 3}]})
+        assert len(survey) == 2
+        course = course_from_record(
+            {'name': 'C', 'students': [
+                {'id': 1, 'name': 'Amy', 'answers': {'1': ['a'], '2': 'x'}},
+                {'id': 2, 'name': 'Bo', 'answers': {'1': ['b'], '9': 1}}]},
+            survey)
+        amy, bo = course.get_students()
+        assert amy.get_answer(survey.get_questions()[0]).content == ['a']
+        assert bo.get_answer(survey.get_questions()[1]) is None
+        assert not course.all_answered(survey)
+
+    def test_unknown_names(self) -> None:
+        with pytest.raises(ValueError):
+            make_grouper('best', 2)
+        with pytest.raises(ValueError):
+            question_from_record({'id': 1, 'type': 'essay', 'text': '?'})
+        survey = Survey([])
+        with pytest.raises(ValueError):
+            course_from_record({'name': 'C', 'students': [
+                {'id': 1, 'name': 'A'}, {'id': 1, 'name': 'B'}]}, survey)
+
+
+class TestBatch:
+    def test_main(self, tmp_path, capsys) -> None:
+        sections_dir, survey_path = _write_sections(tmp_path, 3, 7)
+        out_dir = str(tmp_path / 'out')
+        assert batch.main([sections_dir, survey_path, out_dir,
+                           '--grouper', 'greedy', '--group-size', '3',
+                           '--workers', '2']) == 0
+        summary = capsys.readouterr().out
+        assert 'L0002.json' in summary and 'total' in summary
+
+        with open(os.path.join(out_dir, 'L0001.json')) as file:
+            result = json.load(file)
+        assert result['course'] == 'L0001'
+        assert sorted(sum(result['groups'], [])) == list(range(7))
+        assert [len(group) for group in result['groups']] == [3, 3, 1]
+
+    def test_serial_matches_parallel(self, tmp_path) -> None:
+        sections_dir, survey_path = _write_sections(tmp_path, 2, 6)
+        serial = batch.run_batch(sections_dir, survey_path,
+                                 str(tmp_path / 'a'), 'window', 2, 1)
+        parallel = batch.run_batch(sections_dir, survey_path,
+                                   str(tmp_path / 'b'), 'window', 2, 2)
+        assert [r['score'] for r in serial] == [r['score'] for r in parallel]
+        assert [r['section'] for r in serial] == ['L0000.json', 'L0001.json']
+        assert [r['missing'] for r in serial] == [0, 0]
+
+    def test_failed_section(self, tmp_path, capsys) -> None:
+        sections_dir, survey_path = _write_sections(tmp_path, 3, 6)
+        with open(os.path.join(sections_dir, 'L0000.json')) as file:
+            record = json.load(file)
+        # an answer out of range is counted but does not stop the grouping
+        record['students'][0]['answers']['2'] = 99
+        with open(os.path.join(sections_dir, 'L0000.json'), 'w') as file:
+            json.dump(record, file)
+        with open(os.path.join(sections_dir, 'L0001.json'), 'w') as file:
+            file.write('{"name": "L0001", "students": [')
+        with open(os.path.join(sections_dir, 'L0002.json')) as file:
+            record = json.load(file)
+        del record['students'][4]['answers']['2']
+        with open(os.path.join(sections_dir, 'L0002.json'), 'w') as file:
+            json.dump(record, file)
+        for workers in (1, 2):
+            results = batch.run_batch(sections_dir, survey_path,
+                                      str(tmp_path / f'out{workers}'),
+                                      'greedy', 3, workers)
+            assert results[0]['missing'] == 1
+            assert results[1]['section'] == 'L0001.json'
+            assert 'error' in results[1] and 'score' not in results[1]
+            # a missing answer fails the section with a report, not a crash
+            assert results[2] == {'section': 'L0002.json',
+                                  'error': '1 missing answers: '
+                                           'student 4 question 2'}
+
+        summary = batch.format_summary(results)
+        assert summary.splitlines()[1].split()[:3] == ['L0000.json', '6', '1']
+        assert 'L0001.json' in summary and 'failed:' in summary
+        assert 'student 4 question 2' in summary
+        assert summary.splitlines()[-1] == '2 of 3 sections failed'
+        assert batch.main([sections_dir, survey_path, str(tmp_path / 'out'),
+                           '--workers', '1']) == 1
+        assert 'missing' in capsys.readouterr().out
+
+
+class TestScheduler:
+    def test_estimate_cost(self) -> None:
+        assert estimate_cost(1, 4, 3, 'greedy') == 1.0
+        assert estimate_cost(300, 4, 3, 'greedy') > \
+            estimate_cost(300, 4, 3, 'window') > \
+            estimate_cost(300, 4, 3, 'random') > \
+            estimate_cost(300, 4, 3, 'alpha')
+        assert estimate_cost(300, 4, 6, 'greedy') == \
+            2 * estimate_cost(300, 4, 3, 'greedy')
+
+    def test_estimate_cost_every_grouper(self) -> None:
+        for name in GROUPERS:
+            costs = [estimate_cost(n, 4, 3, name) for n in (2, 50, 500, 5000)]
+            assert costs == sorted(costs) and costs[0] > 0, name
+        # each block of a hierarchical grouper costs as much as a greedy run
+        assert estimate_cost(2400, 4, 3, 'hierarchical') > \
+            10 * estimate_cost(240, 4, 3, 'greedy')
+        assert estimate_cost(2400, 4, 3, 'hierarchical') < \
+            estimate_cost(2400, 4, 3, 'greedy')
+        with pytest.raises(ValueError):
+            estimate_cost(10, 4, 3, 'best')
+
+    def test_schedule_largest_first(self) -> None:
+        q = NumericQuestion(1, 'Hours?', 0, 10)
+        survey = Survey([q])
+        courses = []
+        for size in (4, 12, 7):
+            students = []
+            for i in range(size):
+                student = Student(i, f'S{i}')
+                student.set_answer(q, Answer(i % 11))
+                students.append(student)
+            course = Course(f'C{size}')
+            course.enroll_students(students)
+            courses.append(course)
+
+        for workers in (1, 2):
+            report = schedule(courses, survey, 'greedy', 3, workers)
+            jobs = report['jobs']
+            assert [job['course'] for job in jobs] == ['C4', 'C12', 'C7']
+            assert [job['order'] for job in jobs] == [2, 0, 1]
+            flat = GreedyGrouper(3).make_grouping(courses[1], survey)
+            assert jobs[1]['score'] == survey.score_grouping(flat)
+            assert sorted(sum(jobs[2]['groups'], [])) == list(range(7))
+            assert 'C12' in format_report(report)
+
+
+def _service_payload(size: int) -> dict:
+    """ Return a request to group <size> students into pairs """
+    students = []
+    for i in range(size):
+        students.append({'id': i, 'name': f'S{i}', 'answers': {'1': i % 3}})
+    return {'survey': {'questions': [{'id': 1, 'type': 'numeric',
+                                      'text': '?', 'min': 0, 'max': 2}]},
+            'course': {'name': 'C', 'students': students},
+            'grouper': 'greedy', 'group_size': 2}
+
+
+class _GatedExecutor(ThreadPoolExecutor):
+    """ A thread pool that only starts running jobs once <gate> is set """
+
+    def __init__(self) -> None:
+        super().__init__(max_workers=2)
+        self.gate = threading.Event()
+        self.submitted = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted += 1
+
+        def _wait_then_run():
+            self.gate.wait(5)
+            return fn(*args, **kwargs)
+        return super().submit(_wait_then_run)
+
+
+class TestGroupingService:
+    def test_group_request(self) -> None:
+        async def scenario() -> None:
+            service = GroupingService(workers=2, queue_size=4)
+            port = await service.start()
+            try:
+                status, reply = await request('127.0.0.1', port, 'POST',
+                                              '/group', _service_payload(6))
+                assert status == 200
+                assert sorted(sum(reply['groups'], [])) == list(range(6))
+                assert reply['score'] == 1.0
+                assert reply['missing'] == []
+                assert reply['latency']['total'] >= reply['latency']['run']
+
+                status, reply = await request('127.0.0.1', port, 'POST',
+                                              '/group', {'survey': {}})
+                assert status == 400
+                payload = _service_payload(6)
+                del payload['course']['students'][2]['answers']['1']
+                status, reply = await request('127.0.0.1', port, 'POST',
+                                              '/group', payload)
+                assert status == 400
+                assert reply['missing'] == [[2, 1, 'missing']]
+                assert reply['error'] == \
+                    '1 missing answers: student 2 question 1'
+                status, reply = await request('127.0.0.1', port, 'GET',
+                                              '/nothing')
+                assert status == 404
+
+                status, metrics = await request('127.0.0.1', port, 'GET',
+                                                '/metrics')
+                assert metrics['completed'] == 1
+                assert metrics['failed'] == 2
+                assert metrics['latency']['max'] > 0
+            finally:
+                await service.stop()
+
+        asyncio.run(scenario())
+
+    def test_back_pressure(self) -> None:
+        async def scenario() -> None:
+            executor = _GatedExecutor()
+            service = GroupingService(workers=1, queue_size=1,
+                                      executor=executor)
+            port = await service.start()
+            try:
+                payload = _service_payload(4)
+                running = asyncio.ensure_future(
+                    request('127.0.0.1', port, 'POST', '/group', payload))
+                while executor.submitted == 0:
+                    await asyncio.sleep(0.01)
+                waiting = asyncio.ensure_future(
+                    request('127.0.0.1', port, 'POST', '/group', payload))
+                while service.metrics()['queued'] != 1:
+                    await asyncio.sleep(0.01)
+
+                status, _ = await request('127.0.0.1', port, 'POST',
+                                          '/group', payload)
+                assert status == 503
+
+                executor.gate.set()
+                assert (await running)[0] == 200
+                assert (await waiting)[0] == 200
+                metrics = service.metrics()
+                assert metrics['completed'] == 2
+                assert metrics['rejected'] == 1
+            finally:
+                executor.gate.set()
+                await service.stop()
+                executor.shutdown()
+
+        asyncio.run(scenario())
+
+
+class TestRegroup:
+    def test_regroup(self) -> None:
+        q = YesNoQuestion(0, 'True or False')
+        s = Survey([q])
+        students = []
+        for i in range(8):
+            student = Student(i, f'S{i}')
+            student.set_answer(q, Answer(i < 4))
+            students.append(student)
+        groups = [Group(students[0:3]), Group(students[3:6]),
+                  Group(students[6:8])]
+        grouping = Grouping()
+        for group in groups:
+            grouping.add_group(group)
+
+        late_yes = Student(10, 'Late')
+        late_yes.set_answer(q, Answer(True))
+        late_no = Student(11, 'Later')
+        late_no.set_answer(q, Answer(False))
+        extra = Student(12, 'Latest')
+        extra.set_answer(q, Answer(False))
+
+        new = regroup(grouping, [extra, late_no, late_yes], [students[1]],
+                      s, 3)
+        new_groups = new.get_groups()
+        # the untouched full group is kept as is
+        assert new_groups[1] is groups[1]
+        # the late students fill the group that lost a member and the last
+        # group that was not full, where they fit best
+        assert new_groups[0].get_members() == [students[0], students[2],
+                                               late_yes]
+        assert new_groups[2].get_members() == [students[6], students[7],
+                                               late_no]
+        assert new_groups[3].get_members() == [extra]
+        assert len(new) == 4
+
+    def test_regroup_lonely_student(self) -> None:
+        q = NumericQuestion(0, '1-3', 1, 3)
+        s = Survey([q])
+        students = []
+        for i in range(5):
+            student = Student(i, f'S{i}')
+            student.set_answer(q, Answer(1 + i % 3))
+            students.append(student)
+        grouping = Grouping()
+        grouping.add_group(Group(students[0:2]))
+        grouping.add_group(Group(students[2:4]))
+        grouping.add_group(Group(students[4:5]))
+
+        # dropping S0 leaves S1 alone, so it joins the last group which
+        # has room; the full group in the middle is not touched
+        new = regroup(grouping, [], [students[0]], s, 2)
+        members = [g.get_members() for g in new.get_groups()]
+        assert members == [students[2:4], [students[4], students[1]]]
+
+
+class TestOptimalGrouper:
+    def _course(self, n: int) -> tuple:
+        yesno = YesNoQuestion(0, 'True or False')
+        num = NumericQuestion(1, '0-5', 0, 5)
+        survey = Survey([yesno, num])
+        survey.set_criterion(HeterogeneousCriterion(), yesno)
+        survey.set_weight(2, num)
+        students = []
+        for i in range(n):
+            student = Student(i, f'S{i}')
+            student.set_answer(yesno, Answer(i % 3 == 0))
+            student.set_answer(num, Answer((i * 7) % 6))
+            students.append(student)
+        course = Course('Seminar')
+        course.enroll_students(students)
+        return course, survey
+
+    def test_make_grouping_optimal(self) -> None:
+        course, survey = self._course(7)
+        students = list(course.get_students())
+        optimal = OptimalGrouper(3)
+        grouping = optimal.make_grouping(course, survey)
+        assert optimal.proved_optimal
+        assert [len(g) for g in grouping.get_groups()] == [3, 3, 1]
+
+        # compare with every grouping of the 7 students into 3, 3 and 1
+        best = 0.0
+        for single in range(7):
+            rest = [i for i in range(7) if i != single]
+            for first in itertools.combinations(rest[1:], 2):
+                group1 = [rest[0]] + list(first)
+                group2 = [i for i in rest if i not in group1]
+                score = 0.0
+                for group in (group1, group2, [single]):
+                    score += survey.score_students(
+                        [students[i] for i in group])
+                best = max(best, score / 3)
+        assert survey.score_grouping(grouping) == pytest.approx(best)
+        greedy = GreedyGrouper(3).make_grouping(course, survey)
+        assert survey.score_grouping(grouping) >= \
+            survey.score_grouping(greedy)
+
+    def test_node_limit(self) -> None:
+        course, survey = self._course(12)
+        optimal = OptimalGrouper(3, node_limit=10)
+        grouping = optimal.make_grouping(course, survey)
+        assert not optimal.proved_optimal
+        assert optimal.nodes == 10
+        # falls back to the best grouping found, at least as good as greedy
+        greedy = GreedyGrouper(3).make_grouping(course, survey)
+        assert survey.score_grouping(grouping) >= \
+            survey.score_grouping(greedy)
+        assert sorted(s.id for g in grouping.get_groups()
+                      for s in g.get_members()) == list(range(12))
+
+
+class TestClusterGrouper:
+    def test_make_grouping_cluster(self) -> None:
+        mc = MultipleChoiceQuestion(0, 'Pick one', ['a', 'b', 'c'])
+        num = NumericQuestion(1, '0-9', 0, 9)
+        survey = Survey([mc, num])
+        survey.set_weight(3, mc)
+        students = []
+        for i in range(10):
+            student = Student(i, f'S{i}')
+            student.set_answer(mc, Answer('abc'[i % 3]))
+            student.set_answer(num, Answer(i % 3 * 4))
+            students.append(student)
+        course = Course('Clusters')
+        course.enroll_students(students)
+
+        grouping = ClusterGrouper(3).make_grouping(course, survey)
+        groups = grouping.get_groups()
+        assert [len(g) for g in groups] == [3, 3, 3, 1]
+        assert sorted(s.id for g in groups for s in g.get_members()) == \
+            list(range(10))
+        # students with the same answers are clustered together
+        for group in groups[:3]:
+            answers = {s.get_answer(mc).content for s in group.get_members()}
+            assert len(answers) == 1
+        assert survey.score_grouping(grouping) == 2.0
+
+    def test_swaps_improve_clusters(self) -> None:
+        mc = MultipleChoiceQuestion(0, 'Pick one', ['a', 'b', 'c', 'd'])
+        num = NumericQuestion(1, '0-9', 0, 9)
+        survey = Survey([mc, num])
+        survey.set_criterion(HeterogeneousCriterion(), mc)
+        survey.set_criterion(HeterogeneousCriterion(), num)
+        rng = random.Random(5)
+        students = []
+        for i in range(60):
+            student = Student(i, f'S{i}')
+            student.set_answer(mc, Answer(rng.choice('abcd')))
+            student.set_answer(num, Answer(rng.randint(0, 9)))
+            students.append(student)
+        course = Course('Swaps')
+        course.enroll_students(students)
+
+        unswapped = ClusterGrouper(4, swap_passes=0).make_grouping(course,
+                                                                   survey)
+        swapped = ClusterGrouper(4).make_grouping(course, survey)
+        assert [len(g) for g in swapped.get_groups()] == [4] * 15
+        assert sorted(s.id for g in swapped.get_groups()
+                      for s in g.get_members()) == list(range(60))
+        assert survey.score_grouping(swapped) > \
+            survey.score_grouping(unswapped)
+
+    def test_small_course(self) -> None:
+        q = YesNoQuestion(0, 'Yes?')
+        survey = Survey([q])
+        course = Course('Tiny')
+        assert len(ClusterGrouper(3).make_grouping(course, survey)) == 0
+        amy = Student(1, 'Amy')
+        amy.set_answer(q, Answer(True))
+        course.enroll_students([amy])
+        grouping = ClusterGrouper(3).make_grouping(course, survey)
+        assert grouping.get_groups()[0].get_members() == [amy]
+
+
+class TestAnswerEncoding:
+    def test_codes(self) -> None:
+        num = NumericQuestion(0, '1-3', 1, 3)
+        check = CheckboxQuestion(1, 'Pick', ['a', 'b', 'c'])
+        survey = Survey([num, check])
+        survey.set_criterion(HeterogeneousCriterion(), num)
+        students = []
+        for num_answer, check_answer in ((1, ['a', 'b']), (True, ['b', 'a']),
+                                         (3, ['c']), (1, ['a', 'b'])):
+            student = Student(len(students), 'S')
+            student.set_answer(num, Answer(num_answer))
+            student.set_answer(check, Answer(check_answer))
+            students.append(student)
+
+        encoding = AnswerEncoding(students, survey)
+        assert encoding.codes == [[0, 0], [MISSING, 0], [1, 1], [0, 0]]
+        assert encoding.pair_score(0, 0, 1) == 1.0
+        assert encoding.pair_score(1, 0, 1) == 0.0
+        assert encoding.pair_score(0, MISSING, 1) == 0.0
+        assert encoding.affinity(encoding.codes[0], encoding.codes[2]) == 0.5
+        assert encoding.affinity(encoding.codes[0], encoding.codes[3]) == \
+            survey.score_students([students[0], students[3]])
+
+
+class TestPartitionGrouper:
+    def test_make_grouping_partition(self) -> None:
+        mc = MultipleChoiceQuestion(0, 'Pick one', ['a', 'b', 'c'])
+        yesno = YesNoQuestion(1, 'Yes?')
+        survey = Survey([mc, yesno])
+        survey.set_criterion(HeterogeneousCriterion(), yesno)
+        students = []
+        for i in range(26):
+            student = Student(i, f'S{i}')
+            student.set_answer(mc, Answer('abc'[i % 3]))
+            student.set_answer(yesno, Answer(i % 2 == 0))
+            students.append(student)
+        course = Course('Partitions')
+        course.enroll_students(students)
+
+        # a small dense size makes the first splits use the sparse graph
+        grouping = PartitionGrouper(2, dense_size=2).make_grouping(course,
+                                                                  survey)
+        groups = grouping.get_groups()
+        assert [len(g) for g in groups] == [2] * 13
+        assert sorted(s.id for g in groups for s in g.get_members()) == \
+            list(range(26))
+        alpha = AlphaGrouper(2).make_grouping(course, survey)
+        assert survey.score_grouping(grouping) > survey.score_grouping(alpha)
+
+    def test_leftover_group_last(self) -> None:
+        q = NumericQuestion(0, '0-4', 0, 4)
+        survey = Survey([q])
+        students = []
+        for i in range(11):
+            student = Student(i, f'S{i}')
+            student.set_answer(q, Answer(i % 5))
+            students.append(student)
+        course = Course('Leftover')
+        course.enroll_students(students)
+        grouping = PartitionGrouper(3).make_grouping(course, survey)
+        assert [len(g) for g in grouping.get_groups()] == [3, 3, 3, 2]
+
+
+class TestStratifiedGrouper:
+    def test_make_grouping_stratified(self) -> None:
+        mc = MultipleChoiceQuestion(0, 'Pick one', ['a', 'b', 'c'])
+        yesno = YesNoQuestion(1, 'Yes?')
+        survey = Survey([mc, yesno])
+        survey.set_criterion(HeterogeneousCriterion(), mc)
+        survey.set_criterion(HeterogeneousCriterion(), yesno)
+        students = []
+        for i in range(12):
+            student = Student(i, f'S{i}')
+            student.set_answer(mc, Answer('abc'[i % 3]))
+            student.set_answer(yesno, Answer(i < 6))
+            students.append(student)
+        course = Course('Strata')
+        course.enroll_students(students)
+
+        grouping = StratifiedGrouper(3).make_grouping(course, survey)
+        groups = grouping.get_groups()
+        assert [len(g) for g in groups] == [3] * 4
+        for group in groups:
+            answers = {s.get_answer(mc).content for s in group.get_members()}
+            assert answers == {'a', 'b', 'c'}
+        alpha = AlphaGrouper(3).make_grouping(course, survey)
+        assert survey.score_grouping(grouping) > survey.score_grouping(alpha)
+
+    def test_quality(self) -> None:
+        rng = random.Random(1)
+        num = NumericQuestion(0, '0-100', 0, 100)
+        yesno = YesNoQuestion(1, 'Yes?')
+        mc = MultipleChoiceQuestion(2, 'Pick one', list('abcdefgh'))
+        check = CheckboxQuestion(3, 'Pick some', list('abcdefgh'))
+        survey = Survey([num, yesno, mc, check])
+        for question in survey.get_questions():
+            survey.set_criterion(HeterogeneousCriterion(), question)
+        students = []
+        for i in range(400):
+            student = Student(i, f'S{i}')
+            student.set_answer(num, Answer(rng.randint(0, 100)))
+            student.set_answer(yesno, Answer(rng.random() < 0.5))
+            student.set_answer(mc, Answer(rng.choice('abcdefgh')))
+            student.set_answer(check, Answer(rng.sample('abcdefgh',
+                                                        rng.randint(1, 3))))
+            students.append(student)
+        course = Course('Quality')
+        course.enroll_students(students)
+
+        score = survey.score_grouping(
+            StratifiedGrouper(4).make_grouping(course, survey))
+        random_score = survey.score_grouping(
+            RandomGrouper(4).make_grouping(course, survey))
+        greedy_score = survey.score_grouping(
+            GreedyGrouper(4).make_grouping(course, survey))
+        assert score > random_score + 0.04
+        assert score > 0.92 * greedy_score
+
+    def test_leftover_group_last(self) -> None:
+        q = NumericQuestion(0, '0-4', 0, 4)
+        survey = Survey([q])
+        students = []
+        for i in range(11):
+            student = Student(i, f'S{i}')
+            if i != 4:
+                student.set_answer(q, Answer(i % 5))
+            students.append(student)
+        course = Course('Leftover')
+        course.enroll_students(students)
+        grouping = StratifiedGrouper(3).make_grouping(course, survey)
+        groups = grouping.get_groups()
+        assert [len(g) for g in groups] == [3, 3, 3, 2]
+        assert sorted(s.id for g in groups for s in g.get_members()) == \
+            list(range(11))
+
+
+def _checkbox_course(answers: list) -> tuple:
+    """ Return a course and a checkbox question where student i answered
+    answers[i] (no answer if it is None). """
+    q = CheckboxQuestion(0, 'Pick some', list('abcdefgh'))
+    students = []
+    for i, content in enumerate(answers):
+        student = Student(i, f'S{i}')
+        if content is not None:
+            student.set_answer(q, Answer(content))
+        students.append(student)
+    course = Course('Checkboxes')
+    course.enroll_students(students)
+    return course, q
+
+
+class TestMinHashIndex:
+    def test_neighbours(self) -> None:
+        course, q = _checkbox_course([['a', 'b', 'c'], ['c', 'b', 'a'],
+                                      ['f', 'g', 'h'], ['a', 'b', 'c', 'd'],
+                                      None])
+        students = list(course.get_students())
+        index = MinHashIndex(students, q, bands=32, rows=2)
+        assert len(index) == 5
+        assert index.estimate(students[0], students[1]) == 1.0
+        assert index.estimate(students[0], students[4]) == 0.0
+        assert 0.0 < index.estimate(students[0], students[3]) < 1.0
+        found = index.neighbours(students[0])
+        assert found[:2] == [students[1], students[3]]
+        assert students[2] not in found and students[4] not in found
+        assert index.neighbours(students[0], limit=1) == [students[1]]
+        assert index.neighbours(students[4]) == []
+
+    def test_group_neighbours_and_remove(self) -> None:
+        course, q = _checkbox_course([['a'], ['a'], ['b'], ['b'], ['a']])
+        students = list(course.get_students())
+        index = MinHashIndex(students, q)
+        assert index.group_neighbours([students[0], students[2]]) == \
+            [students[1], students[3], students[4]]
+        index.remove(students[1])
+        index.remove(students[1])
+        assert students[1] not in index and len(index) == 4
+        assert index.neighbours(students[0]) == [students[4]]
+
+    def test_seed_is_deterministic(self) -> None:
+        course, q = _checkbox_course([['a', 'b'], ['b', 'c'], ['c', 'd']])
+        students = list(course.get_students())
+        one = MinHashIndex(students, q, seed=3)
+        two = MinHashIndex(students, q, seed=3)
+        assert one.estimate(students[0], students[1]) == \
+            two.estimate(students[0], students[1])
+
+    def test_greedy_shortlist(self) -> None:
+        answers = [['a', 'b'], ['e', 'f'], ['a', 'b', 'c'], ['e', 'f', 'g'],
+                   ['a', 'c'], ['f', 'g'], ['d'], ['h']]
+        course, q = _checkbox_course(answers)
+        survey = Survey([q])
+        grouping = GreedyGrouper(2, lsh_question=q).make_grouping(course,
+                                                                 survey)
+        ids = [[s.id for s in g.get_members()] for g in grouping.get_groups()]
+        assert sorted(sum(ids, [])) == list(range(8))
+        assert ids[0] == [0, 2] and ids[1] == [1, 3]
+        exact = GreedyGrouper(2).make_grouping(course, survey)
+        assert survey.score_grouping(grouping) == \
+            survey.score_grouping(exact)
+
+
+class TestLazyGreedy:
+    def _course(self) -> tuple:
+        mc = MultipleChoiceQuestion(0, 'Pick one', ['a', 'b', 'c'])
+        num = NumericQuestion(1, '0-9', 0, 9)
+        survey = Survey([mc, num])
+        survey.set_weight(2, mc)
+        students = []
+        for i in range(40):
+            student = Student(i, f'S{i}')
+            student.set_answer(mc, Answer('abc'[(i * 5) % 3]))
+            student.set_answer(num, Answer((i * 7) % 10))
+            students.append(student)
+        course = Course('Lazy')
+        course.enroll_students(students)
+        return course, survey
+
+    def test_first_choice_is_exact(self) -> None:
+        course, survey = self._course()
+        exact = GreedyGrouper(4)
+        grouping = GreedyGrouper(4, lazy=True).make_grouping(course, survey)
+        groups = [g.get_members() for g in grouping.get_groups()]
+        assert [len(g) for g in groups] == [4] * 10
+        assert sorted(s.id for g in groups for s in g) == list(range(40))
+
+        # each group starts with the first student left and the student an
+        # exact greedy step would add to it
+        remaining = list(course.get_students())
+        for members in groups[:-1]:
+            assert members[0] is remaining[0]
+            assert exact._best_match(survey, remaining, [remaining[0]]) == \
+                members[:2]
+            remaining = [s for s in remaining if s not in members]
+
+    def test_stale_gains_comparable(self) -> None:
+        from grouper import _LazyCandidates
+
+        class Scores:
+            def score_students(self, students: list) -> float:
+                return {'A': 0.0, 'AB': 0.8, 'AC': 0.7, 'ABC': 0.6,
+                        'ABD': 0.65}[''.join(s.name for s in students)]
+
+        class Bounds:
+            def group_sums(self, ones: list) -> None:
+                return None
+
+            def upper(self, sums: None, ones: list, candidate: Student) \
+                    -> float:
+                return {'B': 1.0, 'C': 0.9, 'D': 0.5}[candidate.name]
+
+        a, b, c, d = [Student(i, name) for i, name in enumerate('ABCD')]
+        lazy = _LazyCandidates(Scores(), [b, c, d], [a], Bounds())
+        assert lazy.pop_best([a]) is b
+        # C was last scored at 0.7 with A alone, D only has a bound of 0.5,
+        # but D raises A and B's score of 0.8 less than C does
+        assert lazy.pop_best([a, b]) is d
+
+    def test_fewer_score_calls(self) -> None:
+        course, survey = self._course()
+        with counting() as exact:
+            GreedyGrouper(4).make_grouping(course, survey)
+        with counting() as lazy:
+            grouping = GreedyGrouper(4, lazy=True).make_grouping(course,
+                                                                 survey)
+        assert lazy.score_students < exact.score_students
+        # a small constant number of scores for each of the 27 steps
+        assert lazy.score_students <= 3 * 27
+        assert survey.score_grouping(grouping) >= 0.9 * survey.score_grouping(
+            GreedyGrouper(4).make_grouping(course, survey))
+
+
+class TestGreedyPruning:
+    def test_pruning_gives_same_grouping(self) -> None:
+        mc = MultipleChoiceQuestion(0, 'Pick one', ['a', 'b', 'c'])
+        yesno = YesNoQuestion(1, 'Yes?')
+        num = NumericQuestion(2, '0-5', 0, 5)
+        survey = Survey([mc, yesno, num])
+        survey.set_criterion(HeterogeneousCriterion(), yesno)
+        survey.set_criterion(LonelyMemberCriterion(), num)
+        survey.set_weight(3, mc)
+        students = []
+        for i in range(30):
+            student = Student(i, f'S{i}')
+            student.set_answer(mc, Answer('abc'[(i * 7) % 3]))
+            student.set_answer(yesno, Answer(i % 4 == 0))
+            student.set_answer(num, Answer((i * 5) % 6))
+            students.append(student)
+        course = Course('Pruning')
+        course.enroll_students(students)
+
+        greedy = GreedyGrouper(4)
+        with counting() as pruned:
+            grouping = greedy.make_grouping(course, survey)
+
+        # scoring every candidate, as _best_match does without bounds
+        remaining = list(course.get_students())
+        expected = []
+        while len(remaining) > 4:
+            ones = [remaining[0]]
+            while len(ones) < 4:
+                ones = greedy._best_match(survey, remaining, ones)
+            expected.append([s.id for s in ones])
+            remaining = [s for s in remaining if s not in ones]
+        expected.append([s.id for s in remaining])
+
+        assert [[s.id for s in g.get_members()]
+                for g in grouping.get_groups()] == expected
+        # scoring every candidate of the 7 full groups takes 336 calls
+        assert pruned.score_students < 336
+
+    def test_no_pairwise_questions(self, monkeypatch) -> None:
+        num = NumericQuestion(0, '0-5', 0, 5)
+        survey = Survey([num])
+        survey.set_criterion(LonelyMemberCriterion(), num)
+        students = []
+        for i in range(12):
+            student = Student(i, f'S{i}')
+            student.set_answer(num, Answer((i * 5) % 6))
+            students.append(student)
+        course = Course('Lonely')
+        course.enroll_students(students)
+        expected = _ids(GreedyGrouper(3).make_grouping(course, survey))
+
+        def fail(*_) -> float:
+            raise AssertionError('a bound that cannot prune was computed')
+        # the bounds of a survey without pair scores never skip a student
+        monkeypatch.setattr('grouper._ScoreBounds.upper', fail)
+        monkeypatch.setattr('grouper._ScoreBounds.group_sums', fail)
+        assert _ids(GreedyGrouper(3).make_grouping(course, survey)) == \
+            expected
+
+
+class TestCourseSortedViews:
+    def test_views_cached_until_enrollment(self) -> None:
+        course = Course('Views')
+        s3 = Student(3, 'Ann')
+        s1 = Student(1, 'Bob')
+        s2 = Student(2, 'Ann')
+        course.enroll_students([s3, s1])
+        assert course.get_students() == (s1, s3)
+        assert course.get_students() is course.get_students()
+        assert course.get_students_by_name() == (s3, s1)
+        assert course.get_students_by_name() is \
+            course.get_students_by_name()
+
+        course.enroll_students([s2])
+        assert course.get_students() == (s1, s2, s3)
+        assert course.get_students_by_name() == (s2, s3, s1)
+
+    def test_failed_enrollment_keeps_views(self) -> None:
+        course = Course('Views')
+        course.enroll_students([Student(1, 'Bob')])
+        before = course.get_students()
+        course.enroll_students([Student(1, 'Dup')])
+        assert course.get_students() is before
+
+    def test_direct_append_noticed(self) -> None:
+        course = Course('Views')
+        s1 = Student(1, 'Bob')
+        s0 = Student(0, 'Cat')
+        course.enroll_students([s1])
+        assert course.get_students() == (s1,)
+        course.students.append(s0)
+        assert course.get_students() == (s0, s1)
+        assert course.get_students_by_name() == (s1, s0)
+
+
+class TestMissingAnswers:
+    def test_missing_answers(self) -> None:
+        mc = MultipleChoiceQuestion(0, 'Pick one', ['a', 'b'])
+        box = CheckboxQuestion(1, 'Pick some', ['a', 'b'])
+        survey = Survey([mc, box])
+        students = []
+        for i in range(5):
+            student = Student(i, f'S{i}')
+            student.set_answer(mc, Answer('a'))
+            student.set_answer(box, Answer(['a', 'b']))
+            students.append(student)
+        students[1].set_answer(mc, Answer('z'))
+        students[3]._answers.pop(box.id)
+        students[4].set_answer(box, Answer(['b', 'b']))
+        course = Course('Report')
+        course.enroll_students(students)
+
+        assert course.missing_answers(survey) == [(1, 0, 'invalid'),
+                                                  (3, 1, 'missing'),
+                                                  (4, 1, 'invalid')]
+        assert not course.all_answered(survey)
+        assert course.missing_answers(Survey([])) == []
+        assert course.all_answered(Survey([]))
+
+    def test_unhashable_answer_is_invalid(self) -> None:
+        q = NumericQuestion(0, '0-5', 0, 5)
+        student = Student(0, 'S0')
+        student.set_answer(q, Answer({'value': 1}))
+        course = Course('Report')
+        course.enroll_students([student])
+        assert course.missing_answers(Survey([q])) == [(0, 0, 'invalid')]
+
+
+class TestSurveyCompile:
+    def test_plan_cached_and_rebuilt(self) -> None:
+        q1 = YesNoQuestion(1, 'Yes?')
+        q2 = NumericQuestion(2, '0-4', 0, 4)
+        other = YesNoQuestion(3, 'Other?')
+        survey = Survey([q1, q2])
+        plan = survey.compile()
+        assert survey.compile() is plan
+        assert [(q, w) for q, _, w in plan] == [(q1, 1), (q2, 1)]
+
+        assert not survey.set_weight(2, other)
+        assert survey.compile() is plan
+        assert survey.set_weight(3, q2)
+        assert [w for _, _, w in survey.compile()] == [1, 3]
+
+        plan = survey.compile()
+        hetero = HeterogeneousCriterion()
+        assert survey.set_criterion(hetero, q1)
+        assert survey.compile() is not plan
+        assert survey.compile()[0][1] == hetero.score_answers
+        # the cached plan cannot be changed by a caller
+        assert isinstance(survey.compile(), tuple)
+
+    def test_scores_follow_changes(self) -> None:
+        q = YesNoQuestion(1, 'Yes?')
+        survey = Survey([q])
+        s1 = Student(1, 'A')
+        s2 = Student(2, 'B')
+        s1.set_answer(q, Answer(True))
+        s2.set_answer(q, Answer(True))
+        assert survey.score_students([s1, s2]) == 1.0
+        survey.set_criterion(HeterogeneousCriterion(), q)
+        assert survey.score_students([s1, s2]) == 0.0
+        survey.set_criterion(HomogeneousCriterion(), q)
+        survey.set_weight(2, q)
+        assert survey.score_students([s1, s2]) == 2.0
+
+
+class TestAnswerPool:
+    def test_intern_shares_equal_answers(self) -> None:
+        pool = AnswerPool()
+        mc = MultipleChoiceQuestion(1, 'Pick one', ['a', 'b'])
+        box = CheckboxQuestion(2, 'Pick some', ['a', 'b'])
+        a = pool.intern(mc, 'a')
+        assert pool.intern(mc, 'a') is a
+        assert pool.intern(mc, 'b') is not a
+        assert pool.intern(box, 'a') is not a
+        assert pool.intern(box, ['a', 'b']) is pool.intern(box, ['b', 'a'])
+        assert len(pool) == 4
+        unshared = pool.intern(box, [['a']])
+        assert unshared is not pool.intern(box, [['a']])
+        assert len(pool) == 4
+
+    def test_shared_answer_is_frozen(self) -> None:
+        pool = AnswerPool()
+        box = CheckboxQuestion(2, 'Pick some', ['a', 'b'])
+        content = ['a']
+        answer = pool.intern(box, content)
+        content.append('b')
+        assert answer.content == ['a']
+        with pytest.raises(AttributeError):
+            answer.content = ['b']
+
+    def test_scores_with_shared_answers(self) -> None:
+        mc = MultipleChoiceQuestion(1, 'Pick one', ['a', 'b'])
+        pool = AnswerPool()
+        a = pool.intern(mc, 'a')
+        b = pool.intern(mc, 'b')
+        assert mc.get_similarity(a, a) == 1.0
+        assert mc.get_similarity(a, b) == 0.0
+        assert mc.get_similarity(a, Answer('a')) == 1.0
+        lonely = LonelyMemberCriterion()
+        assert lonely.score_answers(mc, [a, a, b]) == 0.0
+        assert lonely.score_answers(mc, [a, a, Answer('a')]) == 1.0
+
+    def test_loader_shares_answers(self) -> None:
+        survey = survey_from_record({'questions': [
+            {'id': 1, 'type': 'yes_no', 'text': 'Yes?'}]})
+        course = course_from_record({'name': 'Shared', 'students': [
+            {'id': 0, 'name': 'A', 'answers': {'1': True}},
+            {'id': 1, 'name': 'B', 'answers': {'1': True}},
+            {'id': 2, 'name': 'C', 'answers': {'1': False}}]}, survey)
+        q = survey.get_questions()[0]
+        s0, s1, s2 = course.get_students()
+        assert s0.get_answer(q) is s1.get_answer(q)
+        assert s0.get_answer(q) is not s2.get_answer(q)
+
+
+class TestReadViews:
+    def test_group_and_grouping_views(self) -> None:
+        students = [Student(i, f'S{i}') for i in range(4)]
+        group = Group(students[:2])
+        assert group.members_view() is group.members_view()
+        assert list(group.members_view()) == group.get_members()
+        grouping = Grouping()
+        assert grouping.add_group(group)
+        assert grouping.groups_view() is grouping.groups_view()
+        assert list(grouping.groups_view()) == [group]
+
+    def test_add_group_rejects_duplicates(self) -> None:
+        students = [Student(i, f'S{i}') for i in range(4)]
+        grouping = Grouping()
+        assert grouping.add_group(Group(students[:2]))
+        assert not grouping.add_group(Group([students[2], Student(1, 'X')]))
+        assert not grouping.add_group(Group([students[2], students[2]]))
+        # a rejected group does not reserve its students
+        assert grouping.add_group(Group(students[2:]))
+        assert len(grouping) == 2
+
+    def test_survey_questions_view(self) -> None:
+        q1 = YesNoQuestion(1, 'Yes?')
+        q2 = NumericQuestion(2, '0-4', 0, 4)
+        survey = Survey([q1, q2])
+        assert list(survey.questions_view()) == survey.get_questions()
+        assert len(survey.questions_view()) == 2
+
+
+class TestScoreBreakdown:
+    def test_breakdown_matches_score_grouping(self) -> None:
+        mc = MultipleChoiceQuestion(0, 'Pick one', ['a', 'b', 'c'])
+        num = NumericQuestion(1, '0-4', 0, 4)
+        survey = Survey([mc, num])
+        survey.set_weight(3, num)
+        survey.set_criterion(HeterogeneousCriterion(), mc)
+        pool = AnswerPool()
+        students = []
+        for i in range(10):
+            student = Student(i, f'S{i}')
+            student.set_answer(mc, pool.intern(mc, 'abc'[i % 3]))
+            student.set_answer(num, pool.intern(num, i % 5))
+            students.append(student)
+        students[9].set_answer(mc, Answer('z'))
+        course = Course('Breakdown')
+        course.enroll_students(students)
+        grouping = AlphaGrouper(3).make_grouping(course, survey)
+
+        breakdown = survey.score_breakdown(grouping)
+        assert breakdown.question_ids == [0, 1]
+        assert breakdown.weights == [1, 3]
+        assert breakdown.score() == survey.score_grouping(grouping)
+        groups = grouping.get_groups()
+        for g, group in enumerate(groups):
+            assert breakdown.group_scores[g] == \
+                survey.score_students(group.get_members())
+            assert breakdown.weighted[g][1] == breakdown.unweighted[g][1] * 3
+        invalid = [g for g, group in enumerate(groups)
+                   if students[9] in group]
+        assert breakdown.invalid == invalid
+        assert breakdown.unweighted[invalid[0]][0] == 0.0
+        assert breakdown.worst_groups(1) == invalid
+
+        summary = breakdown.group_summary()
+        assert summary['min'] == 0.0
+        assert summary['max'] == max(breakdown.group_scores)
+        assert summary['variance'] > 0.0
+        assert set(breakdown.question_summary()) == {0, 1}
+
+    def test_empty_grouping(self) -> None:
+        survey = Survey([YesNoQuestion(0, 'Yes?')])
+        breakdown = survey.score_breakdown(Grouping())
+        assert breakdown.score() == 0.0
+        assert breakdown.group_summary()['mean'] == 0.0
+        assert breakdown.question_summary() == {0: breakdown.group_summary()}
+
+
+def _constrained_course(n: int) -> tuple:
+    """ Return a course of <n> students and a survey where students with the
+    same id modulo 3 gave the same answer. """
+    q = MultipleChoiceQuestion(0, 'Pick one', ['a', 'b', 'c'])
+    survey = Survey([q])
+    students = []
+    for i in range(n):
+        student = Student(i, f'S{i:02}')
+        student.set_answer(q, Answer('abc'[i % 3]))
+        students.append(student)
+    course = Course('Constraints')
+    course.enroll_students(students)
+    return course, survey
+
+
+class TestConstraints:
+    def test_blocks_and_conflicts(self) -> None:
+        constraints = Constraints()
+        constraints.must_pair(1, 2)
+        constraints.cannot_pair(3, 4)
+        constraints.cannot_pair(2, 5)
+        constraints.must_pair(2, 6)
+        assert len(constraints) == 6
+        assert constraints.partners(6) == [1, 2, 6]
+        assert constraints.partners(9) == [9]
+        assert constraints.block(1) == constraints.block(6)
+        assert constraints.conflict(5, 1) and constraints.conflict(6, 5)
+        assert not constraints.conflict(1, 3)
+        assert constraints.largest_block() == 3
+        with pytest.raises(ValueError):
+            constraints.must_pair(5, 6)
+        with pytest.raises(ValueError):
+            constraints.cannot_pair(1, 6)
+
+    def test_allows_and_violations(self) -> None:
+        constraints = Constraints()
+        constraints.must_pair(0, 1)
+        constraints.cannot_pair(2, 3)
+        assert constraints.allows([0, 1, 2])
+        assert not constraints.allows([0, 2])
+        assert constraints.allows([0, 2], present={0, 2})
+        assert not constraints.allows([1, 2, 3, 0])
+
+        students = [Student(i, f'S{i}') for i in range(4)]
+        grouping = Grouping()
+        grouping.add_group(Group([students[0], students[2]]))
+        grouping.add_group(Group([students[1], students[3]]))
+        assert constraints.violations(grouping) == [(0, 1, 'must')]
+        grouping = Grouping()
+        grouping.add_group(Group(students))
+        assert constraints.violations(grouping) == [(2, 3, 'cannot')]
+
+    def test_every_grouper_meets_constraints(self) -> None:
+        course, survey = _constrained_course(12)
+        constraints = Constraints()
+        constraints.must_pair(0, 1)
+        constraints.must_pair(1, 11)
+        constraints.cannot_pair(3, 6)
+        constraints.cannot_pair(2, 5)
+        for name in ['alpha', 'random', 'greedy', 'window', 'cluster',
+                     'partition', 'stratified', 'optimal']:
+            grouper = make_grouper(name, 3)
+            grouper.set_constraints(constraints)
+            grouping = grouper.make_grouping(course, survey)
+            assert constraints.violations(grouping) == [], name
+            ids = [s.id for g in grouping.get_groups() for s in g.get_members()]
+            assert sorted(ids) == list(range(12)), name
+            assert max(len(g) for g in grouping.get_groups()) <= 3, name
+
+    def test_small_section_meets_constraints(self) -> None:
+        course, survey = _constrained_course(3)
+        constraints = Constraints()
+        constraints.cannot_pair(0, 1)
+        for name in ['alpha', 'random', 'greedy', 'window', 'cluster',
+                     'partition', 'stratified', 'optimal']:
+            grouper = make_grouper(name, 3)
+            grouper.set_constraints(constraints)
+            grouping = grouper.make_grouping(course, survey)
+            assert constraints.violations(grouping) == [], name
+            ids = [s.id for g in grouping.get_groups() for s in g.get_members()]
+            assert sorted(ids) == [0, 1, 2], name
+
+    def test_displaced_students_swapped_in(self) -> None:
+        course, survey = _constrained_course(6)
+        constraints = Constraints()
+        constraints.cannot_pair(0, 1)
+        grouper = AlphaGrouper(3)
+        grouper.set_constraints(constraints)
+        grouping = grouper.make_grouping(course, survey)
+        # S01 cannot stay with S00, and trades places with S03 rather than
+        # starting a third group
+        assert _ids(grouping) == [[0, 2, 3], [1, 4, 5]]
+
+        course, survey = _constrained_course(12)
+        constraints = Constraints()
+        for i in range(0, 12, 2):
+            constraints.cannot_pair(i, i + 1)
+        constraints.must_pair(2, 7)
+        for name in ['alpha', 'random', 'cluster', 'partition', 'stratified',
+                     'hierarchical']:
+            grouper = make_grouper(name, 3)
+            grouper.set_constraints(constraints)
+            grouping = grouper.make_grouping(course, survey)
+            assert constraints.violations(grouping) == [], name
+            assert [len(g) for g in grouping.get_groups()] == [3] * 4, name
+
+    def test_greedy_filters_before_scoring(self) -> None:
+        course, survey = _constrained_course(9)
+        constraints = Constraints()
+        for other in range(3, 9):
+            constraints.cannot_pair(0, other)
+        greedy = GreedyGrouper(3)
+        greedy.set_constraints(constraints)
+        with counting() as work:
+            grouping = greedy.make_grouping(course, survey)
+        groups = [[s.id for s in g.get_members()]
+                  for g in grouping.get_groups()]
+        # only 1 and 2 can join 0, so the others are never scored with it
+        assert groups[0] == [0, 1, 2]
+        assert constraints.violations(grouping) == []
+        with counting() as free:
+            GreedyGrouper(3).make_grouping(course, survey)
+        assert work.score_students < free.score_students
+
+    def test_window_keeps_partners(self) -> None:
+        course, survey = _constrained_course(6)
+        constraints = Constraints()
+        constraints.must_pair(0, 5)
+        window = WindowGrouper(2)
+        window.set_constraints(constraints)
+        groups = [[s.id for s in g.get_members()]
+                  for g in window.make_grouping(course, survey).get_groups()]
+        assert [0, 5] in groups
+
+    def test_block_larger_than_group(self) -> None:
+        constraints = Constraints()
+        constraints.must_pair(0, 1)
+        constraints.must_pair(1, 2)
+        with pytest.raises(ValueError):
+            AlphaGrouper(2).set_constraints(constraints)
+
+
+class TestHierarchicalGrouper:
+    def _course(self) -> tuple:
+        num = NumericQuestion(0, '0-9', 0, 9)
+        survey = Survey([num])
+        students = []
+        for i in range(22):
+            student = Student(i, f'S{i}')
+            student.set_answer(num, Answer((i * 7) % 10))
+            students.append(student)
+        course = Course('Hierarchy')
+        course.enroll_students(students)
+        return course, survey, num
+
+    def test_blocks_of_similar_students(self) -> None:
+        course, survey, num = self._course()
+        grouper = HierarchicalGrouper(3, block_size=7)
+        grouping = grouper.make_grouping(course, survey)
+        groups = grouping.get_groups()
+        assert [len(g) for g in groups] == [3] * 7 + [1]
+        assert sorted(s.id for g in groups for s in g.get_members()) == \
+            list(range(22))
+        # blocks of 6 students in order of answer: groups never mix blocks
+        values = sorted(s.get_answer(num).content
+                        for s in course.get_students())
+        for b in range(4):
+            block = values[b * 6:(b + 1) * 6]
+            members = [s.get_answer(num).content
+                       for g in groups[b * 2:(b + 1) * 2]
+                       for s in g.get_members()]
+            assert sorted(members) == block
+
+    def test_parallel_matches_serial(self) -> None:
+        course, survey, _ = self._course()
+        serial = HierarchicalGrouper(3, AlphaGrouper(3), 6)
+        parallel = HierarchicalGrouper(3, AlphaGrouper(3), 6, workers=2)
+        one = serial.make_grouping(course, survey)
+        two = parallel.make_grouping(course, survey)
+        assert [[s.id for s in g.get_members()] for g in one.get_groups()] == \
+            [[s.id for s in g.get_members()] for g in two.get_groups()]
+        # the groups hold the course's own students, not copies
+        assert two.get_groups()[0].get_members()[0] in course.get_students()
+
+    def test_compare(self) -> None:
+        course, survey, _ = self._course()
+        report = HierarchicalGrouper(3, block_size=6).compare(course, survey)
+        assert report['loss'] == report['flat_score'] - report['score']
+        assert report['seconds'] >= 0.0 and report['flat_seconds'] >= 0.0
+        whole = HierarchicalGrouper(3, block_size=30).compare(course, survey)
+        assert whole['loss'] == 0.0
+
+
+def _store_survey() -> Survey:
+    return Survey([NumericQuestion(1, '0-9', 0, 9),
+                   CheckboxQuestion(2, 'Pick', ['a', 'b', 'c'])])
+
+
+def _student_records(n: int):
+    for i in range(n):
+        yield {'id': 100 + i, 'name': f'S{i}',
+               'answers': {'1': i % 10, '2': ['a', 'b', 'c'][:1 + i % 3]}}
+
+
+class TestOutOfCore:
+    def test_build_store(self, tmp_path) -> None:
+        survey = _store_survey()
+        records = list(_student_records(9))
+        del records[3]['answers']['1']
+        store = outofcore.build_store(iter(records), survey, str(tmp_path), 4)
+        assert store.question_ids == [1, 2]
+        assert store.chunk_sizes == [4, 4, 1]
+        assert len(store) == 9
+        assert store.contents[1] == [['a'], ['a', 'b'], ['a', 'b', 'c']]
+
+        reopened = outofcore.AnswerStore(str(tmp_path))
+        chunks = list(reopened.chunks())
+        ids = [id_ for chunk in chunks for id_ in chunk[0]]
+        assert ids == list(range(100, 109))
+        assert chunks[0][1] == ['S0', 'S1', 'S2', 'S3']
+        assert list(chunks[0][2]) == [0, 0, 1, 1, 2, 2, MISSING, 0]
+
+        # a limit splits each chunk into slices of at most that many students
+        slices = list(reopened.chunks(3))
+        assert [list(s[0]) for s in slices] == [
+            [100, 101, 102], [103], [104, 105, 106], [107], [108]]
+        assert slices[1][1] == ['S3']
+        assert list(slices[1][2]) == [MISSING, 0]
+
+    def test_old_names_file(self, tmp_path) -> None:
+        survey = _store_survey()
+        outofcore.build_store(_student_records(5), survey, str(tmp_path), 5)
+        with open(tmp_path / '000000.names', 'w') as file:
+            json.dump([f'S{i}' for i in range(5)], file)
+        chunks = list(outofcore.AnswerStore(str(tmp_path)).chunks(2))
+        assert [c[1] for c in chunks] == [['S0', 'S1'], ['S2', 'S3'], ['S4']]
+
+    def test_group_store(self, tmp_path) -> None:
+        survey = _store_survey()
+        store = outofcore.build_store(_student_records(14), survey,
+                                      str(tmp_path / 'store'), 4)
+        # each student is estimated at 1024 + 2 * 128 bytes: 7 students fit,
+        # so blocks have 6 students
+        budget = 7 * 1280
+        assert outofcore.block_size(budget, 3, survey) == 6
+        out = str(tmp_path / 'groups.jsonl')
+        summary = outofcore.group_store(store, survey, AlphaGrouper(3), out,
+                                        budget)
+        groups = list(outofcore.iter_groups(out))
+        assert [len(g) for g in groups] == [3, 3, 3, 3, 2]
+        assert sorted(i for g in groups for i in g) == list(range(100, 114))
+        # blocks are consecutive students of the store
+        assert sorted(groups[0] + groups[1]) == list(range(100, 106))
+        assert summary['students'] == 14
+        assert summary['groups'] == 5
+        assert summary['blocks'] == 3
+
+        course = course_from_record({'name': 'All', 'students': list(
+            _student_records(14))}, survey)
+        by_id = {s.id: s for s in course.get_students()}
+        expected = sum(survey.score_students([by_id[i] for i in g])
+                       for g in groups) / len(groups)
+        assert summary['score'] == pytest.approx(expected)
+
+    def test_invalid_arguments(self, tmp_path) -> None:
+        survey = _store_survey()
+        store = outofcore.build_store(_student_records(4), survey,
+                                      str(tmp_path), 4)
+        out = str(tmp_path / 'groups.jsonl')
+        with pytest.raises(ValueError):
+            outofcore.group_store(store, survey, AlphaGrouper(3), out, 3000)
+        other = Survey([NumericQuestion(1, '0-9', 0, 9)])
+        with pytest.raises(ValueError):
+            outofcore.group_store(store, other, AlphaGrouper(3), out)
+        with pytest.raises(ValueError):
+            outofcore.AnswerStore(str(tmp_path / 'missing'))
+
+    def test_invalid_student(self, tmp_path) -> None:
+        survey = _store_survey()
+        records = list(_student_records(8))
+        records[5]['id'] = records[2]['id']
+        store = outofcore.build_store(iter(records), survey, str(tmp_path), 4)
+        out = str(tmp_path / 'groups.jsonl')
+        with pytest.raises(ValueError, match='student id 102 is repeated'):
+            outofcore.group_store(store, survey, AlphaGrouper(2), out)
+
+    def test_memory_bounded_by_budget(self, tmp_path) -> None:
+        import tracemalloc
+        survey = _store_survey()
+        peaks = []
+        for n in [400, 1600]:
+            store = outofcore.build_store(_student_records(n), survey,
+                                          str(tmp_path / str(n)), 100)
+            out = str(tmp_path / f'{n}.jsonl')
+            tracemalloc.start()
+            outofcore.group_store(store, survey, AlphaGrouper(4), out,
+                                  64 * 1280)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        assert peaks[1] < peaks[0] * 1.5
+
+    def test_memory_bounded_with_large_chunks(self, tmp_path) -> None:
+        import tracemalloc
+        survey = _store_survey()
+        peaks = []
+        for chunk_size in [100, 4000]:
+            store = outofcore.build_store(_student_records(4000), survey,
+                                          str(tmp_path / str(chunk_size)),
+                                          chunk_size)
+            out = str(tmp_path / f'{chunk_size}.jsonl')
+            tracemalloc.start()
+            outofcore.group_store(store, survey, AlphaGrouper(4), out,
+                                  64 * 1280)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        assert peaks[1] < peaks[0] * 1.5
+
+    def test_main(self, tmp_path, capsys) -> None:
+        survey_path = tmp_path / 'survey.json'
+        survey_path.write_text(json.dumps({'questions': [
+            {'type': 'numeric', 'id': 1, 'text': '0-9', 'min': 0, 'max': 9},
+            {'type': 'checkbox', 'id': 2, 'text': 'Pick',
+             'options': ['a', 'b', 'c']}]}))
+        students_path = tmp_path / 'students.jsonl'
+        students_path.write_text('\n'.join(
+            json.dumps(r) for r in _student_records(10)) + '\n')
+        store_dir = str(tmp_path / 'store')
+        assert outofcore.main(['build', str(survey_path), str(students_path),
+                               store_dir, '--chunk-size', '3']) == 0
+        out = str(tmp_path / 'groups.jsonl')
+        assert outofcore.main(['group', store_dir, str(survey_path), out,
+                               '--grouper', 'alpha', '--group-size',
+                               '5']) == 0
+        printed = capsys.readouterr().out
+        assert 'stored 10 students in 4 chunks' in printed
+        assert '10 students, 2 groups in 1 blocks' in printed
+        assert sorted(i for g in outofcore.iter_groups(out) for i in g) == \
+            list(range(100, 110))
+
+
+class _DyingGrouper(AlphaGrouper):
+    """ An AlphaGrouper that kills the first process that uses it """
+
+    def __init__(self, group_size: int, marker: str) -> None:
+        AlphaGrouper.__init__(self, group_size)
+        self.marker = marker
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        if not os.path.exists(self.marker):
+            open(self.marker, 'w').close()
+            os._exit(1)
+        return AlphaGrouper.make_grouping(self, course, survey)
+
+
+class _FailingGrouper(AlphaGrouper):
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        raise ValueError('no groups today')
+
+
+class _KillingGrouper(AlphaGrouper):
+    """ An AlphaGrouper that kills every process that uses it """
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        os._exit(1)
+
+
+def _ids(grouping: Grouping) -> list:
+    """ Return the sorted ids of the members of each group, in order """
+    return [sorted(s.id for s in g.get_members())
+            for g in grouping.get_groups()]
+
+
+class TestDistributed:
+    @pytest.fixture
+    def coordinator(self):
+        coordinator = distributed.Coordinator(b'test')
+        workers = distributed.start_workers(coordinator.address, b'test', 2)
+        coordinator.wait_for_workers(2, timeout=30)
+        yield coordinator
+        coordinator.close()
+        for worker in workers:
+            worker.join(timeout=10)
+
+    def test_group_courses(self, coordinator) -> None:
+        courses = [_constrained_course(n)[0] for n in [5, 9, 12]]
+        survey = _constrained_course(1)[1]
+        grouper = GreedyGrouper(3)
+        groupings = coordinator.group_courses(courses, survey, grouper,
+                                              timeout=60)
+        for course, grouping in zip(courses, groupings):
+            assert _ids(grouping) == \
+                _ids(grouper.make_grouping(course, survey))
+            # the groups hold the course's own students
+            assert grouping.get_groups()[0].get_members()[0] in \
+                course.get_students()
+
+    def test_assignment_arrays(self, coordinator) -> None:
+        course, survey = _constrained_course(7)
+        students = list(course.get_students())
+        assignments = coordinator.run([(AlphaGrouper(3), students, survey)],
+                                      timeout=60)
+        assert assignments[0].typecode == 'i'
+        assert len(assignments[0]) == 7
+        groups = distributed.assignment_groups(students, assignments[0])
+        assert [len(g) for g in groups] == [3, 3, 1]
+
+    def test_hierarchical_on_workers(self, coordinator) -> None:
+        course, survey = _constrained_course(20)
+        grouper = HierarchicalGrouper(3, AlphaGrouper(3), 6)
+        local = grouper.make_grouping(course, survey)
+        grouper.set_coordinator(coordinator)
+        remote = grouper.make_grouping(course, survey)
+        assert _ids(remote) == _ids(local)
+
+    def test_dead_worker_shard_redispatched(self, coordinator,
+                                            tmp_path) -> None:
+        course, survey = _constrained_course(8)
+        grouper = _DyingGrouper(4, str(tmp_path / 'died'))
+        groupings = coordinator.group_courses([course], survey, grouper,
+                                              timeout=60)
+        assert _ids(groupings[0]) == \
+            _ids(AlphaGrouper(4).make_grouping(course, survey))
+        assert os.path.exists(tmp_path / 'died')
+        assert coordinator.workers() == 1
+
+    def test_errors(self, coordinator) -> None:
+        course, survey = _constrained_course(4)
+        with pytest.raises(RuntimeError):
+            coordinator.group_courses([course], survey, _FailingGrouper(2),
+                                      timeout=60)
+        # the workers survive a failing grouper
+        assert coordinator.workers() == 2
+
+        lonely = distributed.Coordinator(b'test')
+        with pytest.raises(TimeoutError):
+            lonely.group_courses([course], survey, AlphaGrouper(2),
+                                 timeout=0.2)
+        lonely.close()
+
+    def test_every_worker_lost(self, coordinator) -> None:
+        course, survey = _constrained_course(4)
+        with pytest.raises(RuntimeError, match='every worker was lost'):
+            coordinator.group_courses([course], survey, _KillingGrouper(2))
+        assert coordinator.workers() == 0
+
+    def test_invalid_shard(self, coordinator) -> None:
+        students = [Student(1, 'A'), Student(2, 'B'), Student(1, 'C')]
+        with pytest.raises(RuntimeError, match='cannot all be enrolled'):
+            coordinator.run([(AlphaGrouper(2), students, Survey([]))],
+                            timeout=60)
+
+    def test_wrong_authkey(self) -> None:
+        coordinator = distributed.Coordinator(b'test')
+        try:
+            with pytest.raises(distributed.AuthenticationError):
+                distributed.Client(coordinator.address, authkey=b'wrong')
+            # the coordinator still accepts workers with the right key
+            workers = distributed.start_workers(coordinator.address,
+                                                b'test', 1)
+            coordinator.wait_for_workers(1, timeout=30)
+            course, survey = _constrained_course(5)
+            groupings = coordinator.group_courses([course], survey,
+                                                  AlphaGrouper(2), timeout=60)
+            assert _ids(groupings[0]) == \
+                _ids(AlphaGrouper(2).make_grouping(course, survey))
+        finally:
+            coordinator.close()
+        for worker in workers:
+            worker.join(timeout=10)
+
+
+class _Killed(Exception):
+    pass
+
+
+class _KilledCheckpoint(Checkpoint):
+    """ A checkpoint that saves at every safe point and then stops the run
+    after <saves> saves, as if the process had been killed. """
+
+    def __init__(self, path: str, saves: int) -> None:
+        Checkpoint.__init__(self, path, 0.0)
+        self.saves = saves
+
+    def save(self, key: str, state: dict) -> None:
+        Checkpoint.save(self, key, state)
+        self.saves -= 1
+        if self.saves == 0:
+            raise _Killed
+
+
+def _checkpoint_course(n: int = 30) -> tuple:
+    rng = random.Random(3)
+    q = CheckboxQuestion(0, 'Pick some', list('abcdefgh'))
+    num = NumericQuestion(1, '0-9', 0, 9)
+    students = []
+    for i in range(n):
+        student = Student(i, f'S{i:02}')
+        student.set_answer(q, Answer(rng.sample('abcdefgh', rng.randint(1, 4))))
+        student.set_answer(num, Answer(rng.randint(0, 9)))
+        students.append(student)
+    course = Course('Checkpoints')
+    course.enroll_students(students)
+    return course, Survey([q, num])
+
+
+def _grouping_of_ids(course: Course, ids: list) -> Grouping:
+    """ Return a grouping of the students of <course> with the <ids> """
+    by_id = {student.id: student for student in course.get_students()}
+    grouping = Grouping()
+    for members in ids:
+        grouping.add_group(Group([by_id[i] for i in members]))
+    return grouping
+
+
+class TestCheckpoint:
+    def _resumed(self, make, course, survey, path, saves) -> list:
+        """ Return the ids of the grouping made by a grouper from make() that
+        is killed after <saves> saves and then resumed by a new grouper. """
+        grouper = make()
+        grouper.set_checkpoint(_KilledCheckpoint(path, saves))
+        with pytest.raises(_Killed):
+            grouper.make_grouping(course, survey)
+        assert os.path.exists(path)
+        grouper = make()
+        grouper.set_checkpoint(Checkpoint(path, 0.0))
+        grouping = grouper.make_grouping(course, survey)
+        # a finished run clears its checkpoint
+        assert not os.path.exists(path)
+        return [[s.id for s in g.get_members()] for g in grouping.get_groups()]
+
+    def test_greedy_resumes(self, tmp_path) -> None:
+        course, survey = _checkpoint_course()
+        expected = GreedyGrouper(4).make_grouping(course, survey)
+        path = str(tmp_path / 'greedy.ckpt')
+        assert self._resumed(lambda: GreedyGrouper(4), course, survey, path,
+                             3) == \
+            [[s.id for s in g.get_members()] for g in expected.get_groups()]
+
+        # the resumed run only forms the groups that were not saved
+        grouper = GreedyGrouper(4)
+        grouper.set_checkpoint(_KilledCheckpoint(path, 6))
+        with pytest.raises(_Killed):
+            grouper.make_grouping(course, survey)
+        with counting() as resumed:
+            grouper.set_checkpoint(Checkpoint(path, 0.0))
+            grouper.make_grouping(course, survey)
+        with counting() as full:
+            GreedyGrouper(4).make_grouping(course, survey)
+        assert resumed.score_students < full.score_students / 2
+
+    def test_constrained_greedy_resumes(self, tmp_path) -> None:
+        course, survey = _checkpoint_course()
+
+        def make() -> GreedyGrouper:
+            grouper = GreedyGrouper(4)
+            constraints = Constraints()
+            constraints.must_pair(3, 17)
+            constraints.cannot_pair(0, 5)
+            grouper.set_constraints(constraints)
+            return grouper
+        expected = make().make_grouping(course, survey)
+        assert self._resumed(make, course, survey, str(tmp_path / 'c'), 2) \
+            == [[s.id for s in g.get_members()] for g in expected.get_groups()]
+
+    def test_cheap_groupers_ignore_checkpoint(self, tmp_path) -> None:
+        course, survey = _checkpoint_course()
+        for grouper in [AlphaGrouper(4), RandomGrouper(4),
+                        StratifiedGrouper(4)]:
+            grouper.set_checkpoint(_KilledCheckpoint(str(tmp_path / 'c'), 1))
+            assert len(grouper.make_grouping(course, survey)) == 8
+            assert not os.path.exists(tmp_path / 'c')
+
+    def test_other_groupers_resume(self, tmp_path) -> None:
+        course, survey = _checkpoint_course()
+        for n, make in enumerate([lambda: WindowGrouper(4),
+                                  lambda: ClusterGrouper(4, shortlist=2),
+                                  lambda: PartitionGrouper(4, dense_size=2),
+                                  lambda: HierarchicalGrouper(4,
+                                                              block_size=8)]):
+            expected = make().make_grouping(course, survey)
+            assert self._resumed(make, course, survey,
+                                 str(tmp_path / f'{n}.ckpt'), 1) == \
+                [[s.id for s in g.get_members()]
+                 for g in expected.get_groups()]
+
+    def test_optimal_resumes_from_best(self, tmp_path) -> None:
+        course, survey = _checkpoint_course(9)
+
+        def make() -> OptimalGrouper:
+            return OptimalGrouper(3)
+        expected = make().make_grouping(course, survey)
+        assert self._resumed(make, course, survey, str(tmp_path / 'o'),
+                             1) == _ids(expected)
+
+        # the saved grouping is the best found before the run was killed
+        path = str(tmp_path / 'best')
+        grouper = make()
+        grouper.set_checkpoint(_KilledCheckpoint(path, 1))
+        with pytest.raises(_Killed):
+            grouper.make_grouping(course, survey)
+        saved = Checkpoint(path).load(run_key(make(),
+                                              list(course.get_students()),
+                                              survey))['best']
+        greedy = GreedyGrouper(3).make_grouping(course, survey)
+        assert sorted(i for group in saved for i in group) == list(range(9))
+        assert survey.score_grouping(_grouping_of_ids(course, saved)) > \
+            survey.score_grouping(greedy)
+
+    def test_other_runs_not_resumed(self, tmp_path) -> None:
+        course, survey = _checkpoint_course()
+        path = str(tmp_path / 'greedy.ckpt')
+        grouper = GreedyGrouper(4)
+        grouper.set_checkpoint(_KilledCheckpoint(path, 3))
+        with pytest.raises(_Killed):
+            grouper.make_grouping(course, survey)
+
+        # a different group size is a different run
+        other = GreedyGrouper(3)
+        other.set_checkpoint(Checkpoint(path, 0.0))
+        expected = GreedyGrouper(3).make_grouping(course, survey)
+        assert [[s.id for s in g.get_members()]
+                for g in other.make_grouping(course, survey).get_groups()] \
+            == [[s.id for s in g.get_members()]
+                for g in expected.get_groups()]
+        assert Checkpoint(path).load('another run') is None
+
+    def test_changed_answer_not_resumed(self, tmp_path) -> None:
+        course, survey = _checkpoint_course()
+        path = str(tmp_path / 'greedy.ckpt')
+        grouper = GreedyGrouper(4)
+        grouper.set_checkpoint(_KilledCheckpoint(path, 3))
+        with pytest.raises(_Killed):
+            grouper.make_grouping(course, survey)
+
+        # student 29 changes their answer before the run is started again
+        num = survey.get_questions()[1]
+        student = course.get_students()[29]
+        student.set_answer(num, Answer(9 - student.get_answer(num).content))
+        expected = GreedyGrouper(4).make_grouping(course, survey)
+        grouper = GreedyGrouper(4)
+        grouper.set_checkpoint(Checkpoint(path, 0.0))
+        assert _ids(grouper.make_grouping(course, survey)) == _ids(expected)
+
+    def test_run_key(self) -> None:
+        course, survey = _checkpoint_course()
+        students = list(course.get_students())
+        grouper = GreedyGrouper(4)
+        key = run_key(grouper, students, survey)
+
+        # watching a run does not make it a different run
+        grouper.set_progress(Progress())
+        grouper.set_checkpoint(Checkpoint('unused'))
+        assert run_key(grouper, students, survey) == key
+
+        constraints = Constraints()
+        constraints.cannot_pair(0, 1)
+        grouper.set_constraints(constraints)
+        constrained = run_key(grouper, students, survey)
+        assert constrained != key
+        constraints.cannot_pair(0, 2)
+        assert run_key(grouper, students, survey) != constrained
+
+        # the same question ids with other options
+        other = Survey([CheckboxQuestion(0, 'Pick some', list('abcdefghi')),
+                        NumericQuestion(1, '0-9', 0, 9)])
+        assert run_key(GreedyGrouper(4), students, other) != key
+
+    def test_interval(self, tmp_path) -> None:
+        course, survey = _checkpoint_course()
+        checkpoint = Checkpoint(str(tmp_path / 'slow.ckpt'), 3600.0)
+        assert not checkpoint.due()
+        grouper = GreedyGrouper(4)
+        grouper.set_checkpoint(checkpoint)
+        grouper.make_grouping(course, survey)
+        assert not os.path.exists(checkpoint.path)
+
+
+class _StoppingProgress(Progress):
+    """ A progress that asks the grouper to stop after <checks> checks """
+
+    def __init__(self, checks: int, fallback: bool = True) -> None:
+        Progress.__init__(self, fallback=fallback)
+        self.checks = checks
+
+    def should_stop(self) -> bool:
+        self.checks -= 1
+        return self.checks < 0
+
+
+class TestProgress:
+    def test_reports(self) -> None:
+        course, survey = _checkpoint_course()
+        reports = []
+        progress = Progress(lambda *report: reports.append(report), 0.0)
+        grouper = GreedyGrouper(4)
+        grouper.set_progress(progress)
+        grouping = grouper.make_grouping(course, survey)
+        assert [r[:2] for r in reports] == \
+            [(i * 4, i) for i in range(7)] + [(30, 8)]
+        assert all(r[2] >= 0.0 for r in reports)
+        assert not progress.stopped
+        # reporting does not change the grouping
+        assert _ids(grouping) == \
+            _ids(GreedyGrouper(4).make_grouping(course, survey))
+
+    def test_cancel_with_fallback(self) -> None:
+        course, survey = _checkpoint_course()
+        reports = []
+
+        def cancel_after_two(placed: int, groups: int, _: float) -> None:
+            reports.append((placed, groups))
+            if groups == 2:
+                progress.cancel()
+        progress = Progress(cancel_after_two, 0.0)
+        grouper = GreedyGrouper(4)
+        grouper.set_progress(progress)
+        grouping = grouper.make_grouping(course, survey)
+        assert progress.stopped
+        full = GreedyGrouper(4).make_grouping(course, survey)
+        groups = [[s.id for s in g.get_members()]
+                  for g in grouping.get_groups()]
+        # the first two groups are greedy, the rest are in order
+        assert groups[:2] == \
+            [[s.id for s in g.get_members()] for g in full.get_groups()[:2]]
+        rest = sorted(set(range(30)) - set(groups[0] + groups[1]))
+        assert groups[2:] == [rest[i:i + 4] for i in range(0, 22, 4)]
+        assert reports[-1] == (30, 8)
+
+    def test_cancel_without_fallback(self) -> None:
+        course, survey = _checkpoint_course()
+        progress = Progress(fallback=False)
+        progress.cancel()
+        grouper = GreedyGrouper(4)
+        grouper.set_progress(progress)
+        with pytest.raises(GroupingCancelled):
+            grouper.make_grouping(course, survey)
+        assert progress.stopped
+
+    def test_every_grouper_meets_deadline(self) -> None:
+        course, survey = _checkpoint_course()
+        for grouper in [RandomGrouper(4), GreedyGrouper(4), WindowGrouper(4),
+                        ClusterGrouper(4), PartitionGrouper(4),
+                        StratifiedGrouper(4), OptimalGrouper(4),
+                        HierarchicalGrouper(4, block_size=8)]:
+            progress = Progress(time_limit=0.0)
+            grouper.set_progress(progress)
+            grouping = grouper.make_grouping(course, survey)
+            assert progress.stopped, type(grouper).__name__
+            assert sorted(s.id for g in grouping.get_groups()
+                          for s in g.get_members()) == list(range(30))
+            assert [len(g) for g in grouping.get_groups()] == [4] * 7 + [2]
+
+    def test_partition_stops_between_passes(self) -> None:
+        course, survey = _checkpoint_course()
+        progress = _StoppingProgress(2)
+        grouper = PartitionGrouper(4)
+        grouper.set_progress(progress)
+        grouping = grouper.make_grouping(course, survey)
+        assert progress.stopped
+        assert sorted(s.id for g in grouping.get_groups()
+                      for s in g.get_members()) == list(range(30))
+        assert [len(g) for g in grouping.get_groups()] == [4] * 7 + [2]
+
+    def test_optimal_keeps_finished_search(self) -> None:
+        course, survey = _checkpoint_course()
+        # the check before the search passes, the search is then stopped
+        progress = _StoppingProgress(1, fallback=False)
+        grouper = OptimalGrouper(4)
+        grouper.set_progress(progress)
+        grouping = grouper.make_grouping(course, survey)
+        assert progress.stopped
+        assert not grouper.proved_optimal
+        assert sorted(s.id for g in grouping.get_groups()
+                      for s in g.get_members()) == list(range(30))
+
+    def test_deadline_in_service(self) -> None:
+        survey = {'questions': [{'type': 'numeric', 'id': 1, 'text': '0-9',
+                                 'min': 0, 'max': 9}]}
+        course = {'name': 'SLA', 'students': [
+            {'id': i, 'name': f'S{i}', 'answers': {'1': i % 10}}
+            for i in range(12)]}
+        payload = {'survey': survey, 'course': course, 'group_size': 3}
+        assert run_request(payload)['complete']
+        reply = run_request(dict(payload, deadline=0))
+        assert not reply['complete']
+        assert reply['groups'] == [[0, 1, 2], [3, 4, 5], [6, 7, 8],
+                                   [9, 10, 11]]
+        with pytest.raises(ValueError):
+            run_request(dict(payload, deadline=-1))
+
+
 if __name__ == '__main__':
     pytest.main(['tests.py'])